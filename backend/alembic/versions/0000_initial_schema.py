@@ -0,0 +1,192 @@
+"""initial schema
+
+Revision ID: initial
+Revises:
+Create Date: 2026-10-18 08:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "initial"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    "valuation_overrides", "extractions", "valuations", "scenarios", "financial_metrics",
+    "documents", "companies", "reports", "funds", "audit_logs",
+)
+ENUMS = (
+    "valuationstatus", "valuationmethod", "extractionmethod", "metricsource", "metrictype",
+    "processingstatus", "documenttype", "companystatus", "sector", "reportstatus", "reporttype",
+    "fundstatus", "fundstrategy",
+)
+
+
+def upgrade() -> None:
+    # Databases created by Base.metadata.create_all before migrations existed already have this schema
+    if sa.inspect(op.get_bind()).has_table("funds"):
+        return
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("entity_type", sa.String(length=50), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=False),
+        sa.Column("action", sa.String(length=50), nullable=False),
+        sa.Column("changes", sa.JSON(), nullable=False),
+        sa.Column("user_id", sa.String(length=255), nullable=False),
+        sa.Column("ip_address", sa.String(length=45), nullable=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_audit_logs_entity_id", "audit_logs", ["entity_id"])
+    op.create_index("ix_audit_logs_entity_type", "audit_logs", ["entity_type"])
+    op.create_index("ix_audit_logs_timestamp", "audit_logs", ["timestamp"])
+    op.create_table(
+        "funds",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("vintage_year", sa.Integer(), nullable=False),
+        sa.Column("strategy", sa.Enum("buyout", "growth_equity", "venture_capital", "credit", "real_assets", "secondaries", name="fundstrategy"), nullable=False),
+        sa.Column("aum", sa.Float(), nullable=True),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("status", sa.Enum("active", "closed", "fundraising", name="fundstatus"), nullable=False),
+        sa.Column("description", sa.String(length=1000), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_funds_name", "funds", ["name"])
+    op.create_table(
+        "reports",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("report_type", sa.Enum("portfolio_summary", "company_tearsheet", "valuation_report", "quarterly_review", "custom", name="reporttype"), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=True),
+        sa.Column("entity_type", sa.String(length=50), nullable=True),
+        sa.Column("parameters", sa.JSON(), nullable=False),
+        sa.Column("output_path", sa.String(length=1000), nullable=True),
+        sa.Column("output_format", sa.String(length=10), nullable=False),
+        sa.Column("status", sa.Enum("pending", "generating", "completed", "failed", name="reportstatus"), nullable=False),
+        sa.Column("error_message", sa.String(length=2000), nullable=True),
+        sa.Column("created_by", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "companies",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("fund_id", sa.String(length=36), sa.ForeignKey("funds.id"), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("sector", sa.Enum("technology", "healthcare", "financials", "industrials", "consumer", "energy", "real_estate", "materials", "telecom", "utilities", name="sector"), nullable=False),
+        sa.Column("geography", sa.String(length=100), nullable=False),
+        sa.Column("investment_date", sa.Date(), nullable=False),
+        sa.Column("exit_date", sa.Date(), nullable=True),
+        sa.Column("initial_investment", sa.Float(), nullable=False),
+        sa.Column("current_valuation", sa.Float(), nullable=False),
+        sa.Column("ownership_pct", sa.Float(), nullable=False),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("status", sa.Enum("active", "exited", "written_off", "marked_up", name="companystatus"), nullable=False),
+        sa.Column("description", sa.String(length=2000), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_companies_fund_id", "companies", ["fund_id"])
+    op.create_index("ix_companies_name", "companies", ["name"])
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("company_id", sa.String(length=36), sa.ForeignKey("companies.id"), nullable=True),
+        sa.Column("filename", sa.String(length=500), nullable=False),
+        sa.Column("file_type", sa.String(length=50), nullable=False),
+        sa.Column("file_path", sa.String(length=1000), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("document_type", sa.Enum("financial_statement", "investor_report", "valuation_memo", "capital_call", "distribution_notice", "board_deck", "due_diligence", "legal", "other", name="documenttype"), nullable=True),
+        sa.Column("processing_status", sa.Enum("pending", "parsing", "extracting", "validating", "completed", "failed", name="processingstatus"), nullable=False),
+        sa.Column("extracted_data", sa.JSON(), nullable=True),
+        sa.Column("raw_text", sa.Text(), nullable=True),
+        sa.Column("page_count", sa.Integer(), nullable=True),
+        sa.Column("error_message", sa.String(length=2000), nullable=True),
+        sa.Column("upload_date", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_documents_company_id", "documents", ["company_id"])
+    op.create_table(
+        "financial_metrics",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("company_id", sa.String(length=36), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("period_date", sa.Date(), nullable=False),
+        sa.Column("metric_type", sa.Enum("revenue", "ebitda", "net_income", "gross_profit", "free_cash_flow", "total_debt", "cash", "enterprise_value", "equity_value", "revenue_growth", "ebitda_margin", "net_debt", "capex", "working_capital", "employees", "arr", "mrr", "customer_count", "churn_rate", "ltv", "cac", name="metrictype"), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("source", sa.Enum("reported", "extracted", "calculated", "estimated", "manual", name="metricsource"), nullable=False),
+        sa.Column("notes", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_financial_metrics_company_id", "financial_metrics", ["company_id"])
+    op.create_table(
+        "scenarios",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("company_id", sa.String(length=36), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("description", sa.String(length=1000), nullable=True),
+        sa.Column("assumptions", sa.JSON(), nullable=False),
+        sa.Column("results", sa.JSON(), nullable=False),
+        sa.Column("created_by", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_scenarios_company_id", "scenarios", ["company_id"])
+    op.create_table(
+        "valuations",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("company_id", sa.String(length=36), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("valuation_date", sa.Date(), nullable=False),
+        sa.Column("method", sa.Enum("dcf", "comparable_companies", "comparable_transactions", "sensitivity", "weighted_blend", name="valuationmethod"), nullable=False),
+        sa.Column("inputs", sa.JSON(), nullable=False),
+        sa.Column("outputs", sa.JSON(), nullable=False),
+        sa.Column("enterprise_value", sa.Float(), nullable=True),
+        sa.Column("equity_value", sa.Float(), nullable=True),
+        sa.Column("implied_multiple", sa.Float(), nullable=True),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("status", sa.Enum("draft", "in_review", "approved", "superseded", name="valuationstatus"), nullable=False),
+        sa.Column("notes", sa.String(length=2000), nullable=True),
+        sa.Column("created_by", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_valuations_company_id", "valuations", ["company_id"])
+    op.create_table(
+        "extractions",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("document_id", sa.String(length=36), sa.ForeignKey("documents.id"), nullable=False),
+        sa.Column("field_name", sa.String(length=255), nullable=False),
+        sa.Column("field_value", sa.String(length=2000), nullable=False),
+        sa.Column("field_type", sa.String(length=50), nullable=False),
+        sa.Column("confidence_score", sa.Float(), nullable=False),
+        sa.Column("extraction_method", sa.Enum("llm", "regex", "table_parse", "manual", name="extractionmethod"), nullable=False),
+        sa.Column("page_number", sa.Integer(), nullable=True),
+        sa.Column("context_snippet", sa.String(length=1000), nullable=True),
+        sa.Column("validated", sa.Boolean(), nullable=False),
+        sa.Column("validated_by", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_extractions_document_id", "extractions", ["document_id"])
+    op.create_table(
+        "valuation_overrides",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("valuation_id", sa.String(length=36), sa.ForeignKey("valuations.id"), nullable=False),
+        sa.Column("field_name", sa.String(length=255), nullable=False),
+        sa.Column("original_value", sa.Float(), nullable=False),
+        sa.Column("override_value", sa.Float(), nullable=False),
+        sa.Column("reason", sa.String(length=1000), nullable=False),
+        sa.Column("created_by", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_valuation_overrides_valuation_id", "valuation_overrides", ["valuation_id"])
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_table(table)
+    if op.get_bind().dialect.name == "postgresql":
+        for name in ENUMS:
+            op.execute(f"DROP TYPE IF EXISTS {name}")
@@ -0,0 +1,25 @@
+"""add monte_carlo valuation method
+
+Revision ID: 0000
+Revises: initial
+Create Date: 2026-10-18 08:30:00
+"""
+from typing import Sequence, Union
+from alembic import op
+
+
+revision: str = "0000"
+down_revision: Union[str, None] = "initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Postgres cannot use a new enum value in the transaction that adds it
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE valuationmethod ADD VALUE IF NOT EXISTS 'monte_carlo'")
+
+
+def downgrade() -> None:
+    # Enum values cannot be dropped; the unused label is left in place
+    pass
@@ -0,0 +1,25 @@
+"""add valuation input hash
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18 09:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = "0000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("valuations", sa.Column("input_hash", sa.String(length=64), nullable=True))
+    op.create_index("ix_valuations_input_hash", "valuations", ["input_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_valuations_input_hash", table_name="valuations")
+    op.drop_column("valuations", "input_hash")
@@ -0,0 +1,28 @@
+"""add latest-metric covering index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_financial_metrics_company_type_period",
+        "financial_metrics",
+        ["company_id", "metric_type", sa.text("period_date DESC")],
+        postgresql_include=["value"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_financial_metrics_company_type_period", table_name="financial_metrics")
@@ -0,0 +1,33 @@
+"""add portfolio rollup table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_rollups",
+        sa.Column("dimension", sa.String(length=20), primary_key=True),
+        sa.Column("key", sa.String(length=100), primary_key=True),
+        sa.Column("company_count", sa.Integer(), nullable=False),
+        sa.Column("active_count", sa.Integer(), nullable=False),
+        sa.Column("total_invested", sa.Float(), nullable=False),
+        sa.Column("total_value", sa.Float(), nullable=False),
+        sa.Column("active_value", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_rollups")
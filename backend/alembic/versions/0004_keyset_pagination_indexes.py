@@ -0,0 +1,35 @@
+"""add keyset pagination indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_funds_created_at_id", "funds", ["created_at", "id"]),
+    ("ix_companies_created_at_id", "companies", ["created_at", "id"]),
+    ("ix_documents_created_at_id", "documents", ["created_at", "id"]),
+    ("ix_valuations_created_at_id", "valuations", ["created_at", "id"]),
+    ("ix_reports_created_at_id", "reports", ["created_at", "id"]),
+    ("ix_audit_logs_timestamp_id", "audit_logs", ["timestamp", "id"]),
+    ("ix_financial_metrics_company_period_id", "financial_metrics", ["company_id", "period_date", "id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,45 @@
+"""add extraction jobs table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "extraction_jobs",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("document_id", sa.String(length=36), sa.ForeignKey("documents.id"), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="processingstatus", create_type=False),
+            nullable=True,
+        ),
+        sa.Column("progress", sa.Float(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("max_attempts", sa.Integer(), nullable=True),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=True),
+        sa.Column("error_message", sa.String(length=2000), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_extraction_jobs_document_id", "extraction_jobs", ["document_id"])
+    op.create_index("ix_extraction_jobs_status_created_at", "extraction_jobs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extraction_jobs_status_created_at", table_name="extraction_jobs")
+    op.drop_index("ix_extraction_jobs_document_id", table_name="extraction_jobs")
+    op.drop_table("extraction_jobs")
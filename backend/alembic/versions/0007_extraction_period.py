@@ -0,0 +1,23 @@
+"""add extraction period
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 15:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("extractions", sa.Column("period", sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("extractions", "period")
@@ -0,0 +1,25 @@
+"""add extraction promoted_at
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("extractions", sa.Column("promoted_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_extractions_validated_promoted_at", "extractions", ["validated", "promoted_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extractions_validated_promoted_at", table_name="extractions")
+    op.drop_column("extractions", "promoted_at")
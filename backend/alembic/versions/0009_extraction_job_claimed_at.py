@@ -0,0 +1,25 @@
+"""add extraction job claimed_at
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 17:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("extraction_jobs", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+    # Jobs already running become reclaimable once they go stale
+    op.execute("UPDATE extraction_jobs SET claimed_at = started_at")
+
+
+def downgrade() -> None:
+    op.drop_column("extraction_jobs", "claimed_at")
@@ -0,0 +1,58 @@
+"""make financial metric keys unique
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 18:00:00
+"""
+import logging
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Rows removed by the upgrade are kept here so the downgrade can restore them
+DUPLICATES_TABLE = "financial_metrics_duplicates_0010"
+
+
+def upgrade() -> None:
+    # Every row of a duplicated (company, metric, period) but the most recently created one
+    op.execute(
+        f"CREATE TABLE {DUPLICATES_TABLE} AS SELECT * FROM financial_metrics WHERE id IN ("
+        " SELECT id FROM ("
+        "  SELECT id, ROW_NUMBER() OVER ("
+        "   PARTITION BY company_id, metric_type, period_date ORDER BY created_at DESC, id DESC"
+        "  ) AS row_rank FROM financial_metrics"
+        " ) ranked WHERE row_rank > 1"
+        ")"
+    )
+    moved = op.get_bind().execute(sa.text(f"SELECT COUNT(*) FROM {DUPLICATES_TABLE}")).scalar()
+    if moved:
+        logger.warning("Moved %d duplicate financial metrics to %s", moved, DUPLICATES_TABLE)
+    op.execute(f"DELETE FROM financial_metrics WHERE id IN (SELECT id FROM {DUPLICATES_TABLE})")
+    op.drop_index("ix_financial_metrics_company_type_period", table_name="financial_metrics")
+    op.create_index(
+        "ix_financial_metrics_company_type_period",
+        "financial_metrics",
+        ["company_id", "metric_type", sa.text("period_date DESC")],
+        unique=True,
+        postgresql_include=["value"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_financial_metrics_company_type_period", table_name="financial_metrics")
+    op.create_index(
+        "ix_financial_metrics_company_type_period",
+        "financial_metrics",
+        ["company_id", "metric_type", sa.text("period_date DESC")],
+        postgresql_include=["value"],
+    )
+    op.execute(f"INSERT INTO financial_metrics SELECT * FROM {DUPLICATES_TABLE}")
+    op.drop_table(DUPLICATES_TABLE)
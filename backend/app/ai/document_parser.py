@@ -1,9 +1,90 @@
+import asyncio
+import bisect
 import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, NamedTuple
+
+from app.config import get_settings
+from app.process_pools import get_process_pool
+
+settings = get_settings()
+
+PAGE_BREAK = "\n\n---PAGE BREAK---\n\n"
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    return get_process_pool("parser", settings.parse_workers)
+
+
+async def run_in_parser_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), fn, *args)
+
+
+@dataclass
+class ParsedDocument:
+    raw_text: str
+    page_count: int
+    pages: list[str] | None = None
+
+    def page_number(self, text: str | None) -> int | None:
+        """1-based page on which the first occurrence of ``text`` starts."""
+        if not self.pages or not text:
+            return None
+        offset = self.raw_text.find(text)
+        if offset < 0:
+            return None
+        starts, position = [], 0
+        for page in self.pages:
+            starts.append(position)
+            position += len(page) + len(PAGE_BREAK)
+        return bisect.bisect_right(starts, offset)
 
 
 async def parse_document(file_path: str, file_type: str) -> tuple[str, int]:
-    """Parse a document and return (raw_text, page_count)."""
+    """Parse a document in the parser process pool and return (raw_text, page_count)."""
+    parsed = await parse_document_pages(file_path, file_type)
+    return parsed.raw_text, parsed.page_count
+
+
+async def parse_document_pages(
+    file_path: str,
+    file_type: str,
+    on_progress: Callable[[int, int], Awaitable[None]] | None = None,
+) -> ParsedDocument:
+    """Parse a document off the event loop, keeping per-page text for PDFs.
+
+    PDF page ranges are spread across the process pool and ``on_progress`` is
+    awaited with (pages_done, page_count) as each range finishes.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    if file_type != "pdf":
+        raw_text, page_count = await loop.run_in_executor(pool, parse_document_sync, file_path, file_type)
+        return ParsedDocument(raw_text, page_count)
+
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+    page_count = await loop.run_in_executor(pool, _count_pdf_pages, file_path)
+    step = settings.pdf_pages_per_task
+    futures = [
+        loop.run_in_executor(pool, _parse_pdf_range, file_path, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+
+    done = 0
+    for future in asyncio.as_completed(futures):
+        done += len(await future)
+        if on_progress:
+            await on_progress(done, page_count)
+
+    pages = [page for future in futures for page in future.result()]
+    return ParsedDocument(PAGE_BREAK.join(pages), page_count, pages)
+
+
+def parse_document_sync(file_path: str, file_type: str) -> tuple[str, int]:
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -20,18 +101,26 @@ async def parse_document(file_path: str, file_type: str) -> tuple[str, int]:
         raise ValueError(f"Unsupported file type: {file_type}")
 
 
-def _parse_pdf(path: Path) -> tuple[str, int]:
+def _pdf_reader(path: str):
     try:
         from pypdf import PdfReader
-
-        reader = PdfReader(str(path))
-        pages = []
-        for page in reader.pages:
-            text = page.extract_text() or ""
-            pages.append(text)
-        return "\n\n---PAGE BREAK---\n\n".join(pages), len(reader.pages)
     except ImportError:
         raise RuntimeError("pypdf is required for PDF parsing. Install with: pip install pypdf")
+    return PdfReader(path)
+
+
+def _count_pdf_pages(path: str) -> int:
+    return len(_pdf_reader(path).pages)
+
+
+def _parse_pdf_range(path: str, start: int, stop: int) -> list[str]:
+    reader = _pdf_reader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _parse_pdf(path: Path) -> tuple[str, int]:
+    pages = _parse_pdf_range(str(path), 0, _count_pdf_pages(str(path)))
+    return PAGE_BREAK.join(pages), len(pages)
 
 
 def _parse_docx(path: Path) -> tuple[str, int]:
@@ -47,24 +136,66 @@ def _parse_docx(path: Path) -> tuple[str, int]:
         raise RuntimeError("python-docx is required for DOCX parsing. Install with: pip install python-docx")
 
 
-def _parse_excel(path: Path) -> tuple[str, int]:
+class ExcelCell(NamedTuple):
+    sheet: str
+    row: int
+    col: int
+    value: Any
+
+
+def _open_workbook(path: Path):
     try:
         import openpyxl
+    except ImportError:
+        raise RuntimeError("openpyxl is required for Excel parsing. Install with: pip install openpyxl")
+    return openpyxl.load_workbook(str(path), read_only=True, data_only=True)
+
+
+def _iter_sheet_rows(ws) -> Iterator[tuple[int, tuple]]:
+    for row_number, row in enumerate(ws.iter_rows(values_only=True), start=1):
+        end = len(row)
+        while end and (row[end - 1] is None or row[end - 1] == ""):
+            end -= 1
+        if end:
+            yield row_number, row[:end]
 
-        wb = openpyxl.load_workbook(str(path), data_only=True)
+
+def iter_excel_rows(path: Path) -> Iterator[tuple[str, int, tuple]]:
+    """Stream non-empty rows as (sheet, row_number, values) in read-only mode.
+
+    Trailing empty cells are trimmed; the workbook is never fully loaded.
+    """
+    wb = _open_workbook(path)
+    try:
+        for ws in wb.worksheets:
+            for row_number, values in _iter_sheet_rows(ws):
+                yield ws.title, row_number, values
+    finally:
+        wb.close()
+
+
+def iter_excel_cells(path: Path) -> Iterator[ExcelCell]:
+    """Stream non-empty cells as (sheet, row, col, value) with 1-based coordinates."""
+    for sheet, row_number, values in iter_excel_rows(path):
+        for col, value in enumerate(values, start=1):
+            if value is not None and value != "":
+                yield ExcelCell(sheet, row_number, col, value)
+
+
+def _parse_excel(path: Path) -> tuple[str, int]:
+    wb = _open_workbook(path)
+    try:
         sheets_text = []
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            rows = []
-            for row in ws.iter_rows(values_only=True):
-                cells = [str(c) if c is not None else "" for c in row]
-                if any(cells):
-                    rows.append("\t".join(cells))
+        for ws in wb.worksheets:
+            rows = [
+                "\t".join(str(c) if c is not None else "" for c in values)
+                for _, values in _iter_sheet_rows(ws)
+            ]
             if rows:
-                sheets_text.append(f"=== Sheet: {sheet_name} ===\n" + "\n".join(rows))
+                sheets_text.append(f"=== Sheet: {ws.title} ===\n" + "\n".join(rows))
         return "\n\n".join(sheets_text), len(wb.sheetnames)
-    except ImportError:
-        raise RuntimeError("openpyxl is required for Excel parsing. Install with: pip install openpyxl")
+    finally:
+        wb.close()
 
 
 def _parse_text(path: Path) -> tuple[str, int]:
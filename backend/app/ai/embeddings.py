@@ -1,72 +1,291 @@
+"""Chunking, embedding and vector search over document text in ChromaDB.
+
+Text is chunked along page, paragraph and line boundaries so numbers and
+table rows stay whole, and every chunk keeps its page number. Embeddings
+are computed in ``embedding_batch_size`` batches by the function that
+``settings.embedding_model`` resolves to, and upserted batch by batch.
+
+Chroma and the embedding model are synchronous, so every call runs on a
+dedicated pool of ``chroma_workers`` threads, and searches issued in the
+same event-loop tick are answered by one multi-query ``collection.query``.
+"""
+import asyncio
+import functools
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from app.ai.document_parser import PAGE_BREAK
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EmbeddingFunction = Callable[[list[str]], list[list[float]]]
+
+DEFAULT_MODEL = "default"
+_SEPARATORS = ("\n\n", "\n", " ")
+_PARAGRAPH = re.compile(r"\n[ \t]*\n")
+
+_embedding_factories: dict[str, Callable[[str], EmbeddingFunction]] = {}
+
+
+class TextChunk(NamedTuple):
+    text: str
+    page: int | None
+
+
+def register_embedding_function(model: str, factory: Callable[[str], EmbeddingFunction]):
+    """Use ``factory(model)`` whenever ``settings.embedding_model`` is ``model``."""
+    _embedding_factories[model] = factory
+
+
+def resolve_embedding_model(model: str | None = None) -> str:
+    """The model that will actually be used; OpenAI models need an API key."""
+    model = model or settings.embedding_model or DEFAULT_MODEL
+    if model not in _embedding_factories and model.startswith("text-embedding-") and not settings.openai_api_key:
+        logger.warning("No OpenAI API key; embedding with the local default model instead of %s", model)
+        return DEFAULT_MODEL
+    return model
+
+
+def load_embedding_function(model: str) -> EmbeddingFunction:
+    """Registered functions first, then OpenAI, Chroma's bundled model or sentence-transformers."""
+    if model in _embedding_factories:
+        return _embedding_factories[model](model)
+
+    from chromadb.utils import embedding_functions
+
+    if model.startswith("text-embedding-"):
+        return embedding_functions.OpenAIEmbeddingFunction(
+            api_key=settings.openai_api_key,
+            model_name=model,
+            api_base=settings.openai_base_url or None,
+        )
+    if model in (DEFAULT_MODEL, "all-MiniLM-L6-v2"):
+        return embedding_functions.DefaultEmbeddingFunction()
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model)
+
+
+def _iter_pages(text: str | Iterable[str]) -> Iterator[tuple[str, int | None]]:
+    """Pages of ``text`` without splitting it up front; unpaged text has page None."""
+    if not isinstance(text, str):
+        for number, page in enumerate(text, start=1):
+            yield page, number
+        return
+    if PAGE_BREAK not in text:
+        yield text, None
+        return
+    start, number = 0, 1
+    while (end := text.find(PAGE_BREAK, start)) != -1:
+        yield text[start:end], number
+        start, number = end + len(PAGE_BREAK), number + 1
+    yield text[start:], number
+
+
+def _split(text: str, max_chars: int, separators: tuple[str, ...] = _SEPARATORS) -> list[str]:
+    """Greedily pack ``text`` into pieces of at most ``max_chars``, breaking at the coarsest separator."""
+    if len(text) <= max_chars:
+        return [text]
+    if not separators:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    separator, finer = separators[0], separators[1:]
+    parts = _PARAGRAPH.split(text) if separator == "\n\n" else text.split(separator)
+    pieces, current = [], ""
+    for part in parts:
+        if len(part) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.extend(_split(part, max_chars, finer))
+            continue
+        candidate = f"{current}{separator}{part}" if current else part
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _overlap_tail(text: str, overlap: int) -> str:
+    """The trailing whole lines of ``text`` that fit in ``overlap`` characters."""
+    lines = text.splitlines()
+    tail: list[str] = []
+    size = 0
+    while lines and size + len(lines[-1]) + 1 <= overlap:
+        size += len(lines[-1]) + 1
+        tail.insert(0, lines.pop())
+    return "\n".join(tail)
+
+
+def iter_chunks(
+    text: str | Iterable[str],
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+) -> Iterator[TextChunk]:
+    """Yield chunks of about ``chunk_size`` characters that never span a page.
+
+    ``text`` is either raw text (pages separated by ``PAGE_BREAK``) or an
+    iterable of page texts. Each chunk after the first on a page starts with
+    up to ``overlap`` characters of whole lines from the chunk before it.
+    """
+    chunk_size = chunk_size or settings.embedding_chunk_chars
+    overlap = settings.embedding_chunk_overlap if overlap is None else overlap
+    for page_text, page in _iter_pages(text):
+        previous = ""
+        for piece in _split(page_text.strip(), chunk_size):
+            piece = piece.strip()
+            if not piece:
+                continue
+            tail = _overlap_tail(previous, overlap) if previous else ""
+            previous = piece
+            yield TextChunk(f"{tail}\n{piece}" if tail else piece, page)
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 class EmbeddingService:
     def __init__(self):
         self._collection = None
+        self._embed: EmbeddingFunction | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._init_lock: asyncio.Lock | None = None
+        self._pending_searches: dict[tuple, list[tuple[str, asyncio.Future]]] = {}
+        self._flush_tasks: set[asyncio.Task] = set()
 
-    def _get_collection(self):
-        if self._collection is None:
-            import chromadb
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking Chroma or embedding call on the service's bounded thread pool."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.chroma_workers, thread_name_prefix="chroma")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
 
-            client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
-            self._collection = client.get_or_create_collection(
-                name="documents",
-                metadata={"hnsw:space": "cosine"},
-            )
-        return self._collection
+    def _open_collection(self):
+        import chromadb
 
-    async def index_document(self, document_id: str, text: str, metadata: dict | None = None):
-        collection = self._get_collection()
-        chunks = self._chunk_text(text, chunk_size=1000, overlap=200)
+        model = resolve_embedding_model()
+        client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
+        # Vectors from different models are not comparable, so each model gets its own collection
+        name = "documents" if model == DEFAULT_MODEL else f"documents-{re.sub(r'[^a-zA-Z0-9_-]+', '-', model)}"
+        return client.get_or_create_collection(
+            name=name[:63].strip("-_"),
+            metadata={"hnsw:space": "cosine", "embedding_model": model},
+            embedding_function=None,
+        )
 
-        ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-        metadatas = [{"document_id": document_id, "chunk_index": i, **(metadata or {})} for i in range(len(chunks))]
+    async def _ensure_ready(self):
+        """Open the collection and load the embedding model once, off the event loop."""
+        if self._collection is not None and self._embed is not None:
+            return
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self._embed is None:
+                self._embed = await self._run(load_embedding_function, resolve_embedding_model())
+            if self._collection is None:
+                self._collection = await self._run(self._open_collection)
 
-        collection.upsert(
-            ids=ids,
-            documents=chunks,
-            metadatas=metadatas,
-        )
+    async def index_document(self, document_id: str, text: str | Iterable[str], metadata: dict | None = None) -> int:
+        """Replace the document's chunks, embedding and upserting one batch at a time.
+
+        ``text`` may be an iterable of pages so large documents are never held
+        in memory whole. Returns the number of chunks indexed.
+        """
+        await self._ensure_ready()
+        await self._run(self._collection.delete, where={"document_id": document_id})
+
+        count = 0
+        for batch in _batched(iter_chunks(text), settings.embedding_batch_size):
+            documents = [chunk.text for chunk in batch]
+            metadatas = []
+            for i, chunk in enumerate(batch, start=count):
+                meta = {"document_id": document_id, "chunk_index": i, **(metadata or {})}
+                if chunk.page is not None:
+                    meta["page_number"] = chunk.page
+                metadatas.append(meta)
+            embeddings = await self._run(self._embed, documents)
+            await self._run(
+                self._collection.upsert,
+                ids=[f"{document_id}_chunk_{i}" for i in range(count, count + len(batch))],
+                documents=documents,
+                embeddings=[list(e) for e in embeddings],
+                metadatas=metadatas,
+            )
+            count += len(batch)
+        return count
 
     async def search(self, query: str, n_results: int = 5, where: dict | None = None) -> list[dict]:
-        collection = self._get_collection()
-        kwargs = {"query_texts": [query], "n_results": n_results}
-        if where:
-            kwargs["where"] = where
-
-        results = collection.query(**kwargs)
-
-        output = []
-        if results["documents"]:
-            for i, doc in enumerate(results["documents"][0]):
-                output.append({
-                    "text": doc,
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "distance": results["distances"][0][i] if results["distances"] else None,
-                })
-        return output
+        """Queue ``query`` to be answered with any other searches made in the same tick."""
+        key = (n_results, json.dumps(where, sort_keys=True) if where else None)
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending_searches.setdefault(key, [])
+        pending.append((query, future))
+        if len(pending) == 1:
+            # The flush task first runs on the next loop iteration, after every search queued in this one
+            task = asyncio.create_task(self._flush_searches(key, n_results, where))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        return await future
+
+    async def _flush_searches(self, key: tuple, n_results: int, where: dict | None):
+        pending = self._pending_searches.pop(key, [])
+        try:
+            await self._ensure_ready()
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for batch in _batched(pending, settings.vector_search_batch_size):
+            queries = [query for query, _ in batch]
+            try:
+                vectors = await self._run(self._embed, queries)
+                kwargs = {"query_embeddings": [list(v) for v in vectors], "n_results": n_results}
+                if where:
+                    kwargs["where"] = where
+                results = await self._run(self._collection.query, **kwargs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(_query_hits(results, i))
 
     async def delete_document(self, document_id: str):
-        collection = self._get_collection()
-        collection.delete(where={"document_id": document_id})
-
-    @staticmethod
-    def _chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
-        if len(text) <= chunk_size:
-            return [text]
-
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            if chunk.strip():
-                chunks.append(chunk.strip())
-            start += chunk_size - overlap
-        return chunks
+        await self._ensure_ready()
+        await self._run(self._collection.delete, where={"document_id": document_id})
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _query_hits(results: dict, i: int) -> list[dict]:
+    """Hits for the ``i``-th query of a multi-query ``collection.query`` result."""
+    if not results["documents"]:
+        return []
+    return [
+        {
+            "text": doc,
+            "metadata": results["metadatas"][i][j] if results["metadatas"] else {},
+            "distance": results["distances"][i][j] if results["distances"] else None,
+        }
+        for j, doc in enumerate(results["documents"][i])
+    ]
 
 
 embedding_service = EmbeddingService()
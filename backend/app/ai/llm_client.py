@@ -0,0 +1,235 @@
+"""Shared OpenAI client with request/token rate limiting, retries and metrics.
+
+One ``AsyncOpenAI`` instance (and so one HTTP connection pool) is reused for
+the life of the process. Every attempt waits on token buckets sized from the
+configured requests- and tokens-per-minute; 429 and 5xx responses are
+retried with jittered exponential backoff.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_client = None
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to ``capacity``."""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # Requests larger than the bucket would never fit; let them through at a full bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+
+@dataclass
+class LLMMetrics:
+    calls: int = 0
+    retries: int = 0
+    failures: int = 0
+    queue_wait_seconds: float = 0.0
+    max_queue_wait_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+
+    def snapshot(self) -> dict:
+        data = asdict(self)
+        data["avg_queue_wait_seconds"] = self.queue_wait_seconds / self.calls if self.calls else 0.0
+        data["avg_latency_seconds"] = self.latency_seconds / self.calls if self.calls else 0.0
+        return data
+
+
+metrics = LLMMetrics()
+_request_bucket: TokenBucket | None = None
+_token_bucket: TokenBucket | None = None
+
+
+def get_llm_client():
+    """The process-wide ``AsyncOpenAI`` client; SDK retries are off, ours apply."""
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+            max_retries=0,
+            timeout=settings.llm_timeout_seconds,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_connections,
+                ),
+            ),
+        )
+    return _client
+
+
+def _buckets() -> tuple[TokenBucket, TokenBucket]:
+    global _request_bucket, _token_bucket
+    if _request_bucket is None:
+        _request_bucket = TokenBucket(settings.llm_requests_per_minute)
+        _token_bucket = TokenBucket(settings.llm_tokens_per_minute)
+    return _request_bucket, _token_bucket
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_metrics() -> dict:
+    return metrics.snapshot()
+
+
+def reset_llm_client():
+    """Drop the shared client, limiter state and metrics (used after settings change and in tests)."""
+    global _client, _request_bucket, _token_bucket
+    _client = _request_bucket = _token_bucket = None
+    for name, value in asdict(LLMMetrics()).items():
+        setattr(metrics, name, value)
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int | None = None) -> int:
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    return chars // 4 + (max_tokens or 0)
+
+
+def _retry_delay(attempt: int, retry_after: str | None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.llm_backoff_max_seconds)
+        except ValueError:
+            pass
+    ceiling = min(settings.llm_backoff_max_seconds, settings.llm_backoff_base_seconds * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _retryable(exc: Exception) -> tuple[bool, str | None]:
+    from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS, exc.response.headers.get("retry-after")
+    return isinstance(exc, (APIConnectionError, APITimeoutError)), None
+
+
+async def chat_completion(**kwargs):
+    """``chat.completions.create`` behind the rate limiter, with retries and metrics.
+
+    Every attempt, retries included, takes its request and tokens from the buckets.
+    """
+    request_bucket, token_bucket = _buckets()
+    tokens = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    client = get_llm_client()
+    started = time.monotonic()
+    try:
+        for attempt in range(settings.llm_max_retries + 1):
+            waited_from = time.monotonic()
+            await request_bucket.acquire()
+            await token_bucket.acquire(tokens)
+            wait = time.monotonic() - waited_from
+            metrics.queue_wait_seconds += wait
+            metrics.max_queue_wait_seconds = max(metrics.max_queue_wait_seconds, wait)
+            try:
+                return await client.chat.completions.create(**kwargs)
+            except Exception as exc:
+                retryable, retry_after = _retryable(exc)
+                if not retryable or attempt == settings.llm_max_retries:
+                    metrics.failures += 1
+                    raise
+                delay = _retry_delay(attempt, retry_after)
+                metrics.retries += 1
+                logger.warning("LLM call failed (%s); retrying in %.2fs", exc, delay)
+                await asyncio.sleep(delay)
+    finally:
+        latency = time.monotonic() - started
+        metrics.calls += 1
+        metrics.latency_seconds += latency
+        metrics.max_latency_seconds = max(metrics.max_latency_seconds, latency)
+
+
+BATCH_TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+async def submit_batch(requests: list[dict], endpoint: str = "/v1/chat/completions") -> dict:
+    """Upload ``requests`` as a JSONL file and create a batch over them.
+
+    Each request is ``{"custom_id", "method", "url", "body"}``. The batch
+    endpoints go through the client's generic HTTP methods so they work with
+    SDK versions that predate ``client.batches``.
+    """
+    import httpx
+
+    client = get_llm_client()
+    data = "\n".join(json.dumps(r) for r in requests).encode()
+    uploaded = await client.files.create(file=("batch.jsonl", data), purpose="batch")
+    response = await client.post(
+        "/batches",
+        cast_to=httpx.Response,
+        body={"input_file_id": uploaded.id, "endpoint": endpoint, "completion_window": "24h"},
+    )
+    return response.json()
+
+
+async def get_batch(batch_id: str) -> dict:
+    import httpx
+
+    response = await get_llm_client().get(f"/batches/{batch_id}", cast_to=httpx.Response)
+    return response.json()
+
+
+async def wait_for_batch(
+    batch_id: str,
+    poll_seconds: float | None = None,
+    on_poll: Callable[[dict], Awaitable[None]] | None = None,
+) -> dict:
+    """Poll until the batch finishes, awaiting ``on_poll`` with each unfinished status."""
+    poll_seconds = poll_seconds if poll_seconds is not None else settings.llm_batch_poll_seconds
+    while True:
+        batch = await get_batch(batch_id)
+        if batch["status"] in BATCH_TERMINAL_STATES:
+            return batch
+        if on_poll:
+            await on_poll(batch)
+        await asyncio.sleep(poll_seconds)
+
+
+async def batch_results(batch: dict) -> list[dict]:
+    """Output and error lines of a finished batch, keyed by ``custom_id``."""
+    client = get_llm_client()
+    lines = []
+    for file_key in ("output_file_id", "error_file_id"):
+        if batch.get(file_key):
+            content = await client.files.content(batch[file_key])
+            lines.extend(json.loads(line) for line in content.text.splitlines() if line.strip())
+    return lines
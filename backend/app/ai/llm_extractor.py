@@ -1,7 +1,21 @@
+import asyncio
+import bisect
+import hashlib
 import json
+import logging
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import NamedTuple
+
+from app.ai.document_parser import PAGE_BREAK
+from app.ai.llm_client import chat_completion
+from app.ai.structured_output import coerce_numeric
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 EXTRACTION_SCHEMAS = {
     "financial_statement": {
@@ -47,110 +61,364 @@ EXTRACTION_SCHEMAS = {
 }
 
 
-async def extract_fields(raw_text: str, document_type: str | None = None) -> list[dict]:
+async def extract_fields(
+    raw_text: str,
+    document_type: str | None = None,
+    table_fields: list[dict] | None = None,
+    use_cache: bool = True,
+) -> list[dict]:
     """
     Extract structured fields from document text using LLM.
     Falls back to rule-based extraction if no API key is configured.
+    Fields already found by the table extractor take precedence, and the LLM
+    is skipped once they cover ``table_extraction_min_fields`` fields.
+    ``use_cache=False`` bypasses the LLM response cache.
     """
-    if settings.openai_api_key:
-        return await _llm_extract(raw_text, document_type)
-    return _rule_based_extract(raw_text, document_type)
+    table_fields = table_fields or []
+    if needs_llm(table_fields):
+        extracted = await _llm_extract(raw_text, document_type, use_cache)
+    else:
+        extracted = _rule_based_extract(raw_text, document_type)
+    return combine_with_tables(table_fields, extracted)
 
 
-async def _llm_extract(raw_text: str, document_type: str | None) -> list[dict]:
-    try:
-        from openai import AsyncOpenAI
+def needs_llm(table_fields: list[dict]) -> bool:
+    covered = {f["field_name"] for f in table_fields}
+    return bool(settings.openai_api_key) and len(covered) < settings.table_extraction_min_fields
+
+
+def combine_with_tables(table_fields: list[dict], extracted: list[dict]) -> list[dict]:
+    covered = {f["field_name"] for f in table_fields}
+    return table_fields + [e for e in extracted if e.get("field_name") not in covered]
 
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
-        schema = EXTRACTION_SCHEMAS.get(document_type or "", EXTRACTION_SCHEMAS["default"])
-        field_descriptions = "\n".join(
-            f"- {f['name']} ({f['type']}): {f['description']}" for f in schema["fields"]
-        )
 
-        truncated = raw_text[:12000]
-
-        response = await client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a financial document extraction specialist. "
-                        "Extract structured data from the document text. "
-                        "Return a JSON array of objects with keys: field_name, field_value, "
-                        "field_type, confidence_score (0-1), context_snippet. "
-                        "Only extract fields you find evidence for."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Extract the following fields from this document:\n\n"
-                        f"{field_descriptions}\n\n"
-                        f"Document text:\n{truncated}"
-                    ),
-                },
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.0,
+class Chunk(NamedTuple):
+    text: str
+    first_page: int | None
+    last_page: int | None
+
+
+def chunk_document(raw_text: str, max_chars: int | None = None) -> list[Chunk]:
+    """Split text into chunks of whole pages (or paragraphs) up to ``max_chars``.
+
+    Chunks record their first and last page when the text carries page breaks.
+    """
+    max_chars = max_chars or settings.llm_chunk_chars
+    pages = raw_text.split(PAGE_BREAK)
+    paged = len(pages) > 1
+
+    pieces: list[tuple[str, int | None]] = []
+    for number, page in enumerate(pages, start=1):
+        page_ref = number if paged else None
+        if len(page) <= max_chars:
+            pieces.append((page, page_ref))
+            continue
+        for paragraph in page.split("\n\n"):
+            for start in range(0, len(paragraph), max_chars):
+                pieces.append((paragraph[start:start + max_chars], page_ref))
+
+    chunks: list[Chunk] = []
+    text, first_page, last_page = "", None, None
+    for piece, piece_page in pieces:
+        if text and len(text) + len(piece) + 2 > max_chars:
+            chunks.append(Chunk(text, first_page, last_page))
+            text = ""
+        if not text:
+            first_page = piece_page
+        last_page = piece_page
+        text = f"{text}\n\n{piece}" if text else piece
+    if text.strip():
+        chunks.append(Chunk(text, first_page, last_page))
+    return chunks
+
+
+def _field_keywords(schema: dict) -> set[str]:
+    keywords = set()
+    for field in schema["fields"]:
+        keywords.update(field["name"].split("_"))
+        keywords.update(w.strip("()/,.").lower() for w in field["description"].split())
+    return {k for k in keywords if len(k) > 3}
+
+
+def select_chunks(chunks: list[Chunk], schema: dict, limit: int | None = None) -> list[Chunk]:
+    """Keyword prefilter: the ``limit`` chunks mentioning the most schema terms, in document order.
+
+    When no chunk mentions any term the leading ``limit`` chunks are used, so
+    documents worded differently from the schema still reach the model.
+    """
+    limit = limit or settings.llm_max_chunks
+    keywords = _field_keywords(schema)
+    scored = []
+    for index, chunk in enumerate(chunks):
+        words = re.findall(r"[a-z]+", chunk.text.lower())
+        score = sum(1 for w in words if w in keywords)
+        if score:
+            scored.append((score, index))
+    if not scored:
+        return chunks[:limit]
+    if len(scored) > limit:
+        logger.warning(
+            "Extraction limited to %d of %d relevant chunks (llm_max_chunks)", limit, len(scored),
         )
+    best = sorted(scored, key=lambda s: (-s[0], s[1]))[:limit]
+    return [chunks[index] for _, index in sorted(best, key=lambda s: s[1])]
+
+
+def merge_candidates(candidates: list[dict]) -> list[dict]:
+    """Keep the highest-confidence value per field; earlier chunks win ties."""
+    best: dict[str, dict] = {}
+    for candidate in candidates:
+        name = candidate.get("field_name")
+        if not name:
+            continue
+        current = best.get(name)
+        if current is None or float(candidate.get("confidence_score", 0)) > float(current.get("confidence_score", 0)):
+            best[name] = candidate
+    return list(best.values())
+
+
+EXTRACTION_SYSTEM_PROMPT = (
+    "You are a financial document extraction specialist. "
+    "Extract structured data from the document text. "
+    "Return a JSON array of objects with keys: field_name, field_value, "
+    "field_type, confidence_score (0-1), context_snippet. "
+    "Only extract fields you find evidence for."
+)
+
+
+class LLMResponseCache:
+    """SQLite-backed cache of parsed chunk extractions with TTL and LRU size eviction.
+
+    Path, TTL and size are read from settings on each call so they can be
+    changed at runtime; counters are per process.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._initialised: set[str] = set()
+
+    @staticmethod
+    def key(model: str, schema: dict, messages: list[dict]) -> str:
+        payload = json.dumps([model, schema, messages], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        path = settings.llm_cache_path
+        conn = sqlite3.connect(path, timeout=30)
+        if path not in self._initialised:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)")
+            self._initialised.add(path)
+        return conn
+
+    def _get(self, key: str) -> list[dict] | None:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > settings.llm_cache_ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def _put(self, key: str, value: list[dict]):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (settings.llm_cache_max_entries,),
+            )
+
+    async def get(self, key: str) -> list[dict] | None:
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def put(self, key: str, value: list[dict]):
+        await asyncio.to_thread(self._put, key, value)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
 
-        content = response.choices[0].message.content
-        parsed = json.loads(content)
-        extractions = parsed.get("extractions", parsed.get("fields", []))
-        if isinstance(extractions, dict):
-            extractions = [
-                {"field_name": k, "field_value": v, "field_type": "string", "confidence_score": 0.8}
-                for k, v in extractions.items()
-            ]
-        return extractions
-
-    except Exception as e:
+response_cache = LLMResponseCache()
+
+
+class ChunkRequest(NamedTuple):
+    chunk: Chunk
+    messages: list[dict]
+    cache_key: str
+
+
+def plan_chunk_requests(raw_text: str, document_type: str | None) -> list[ChunkRequest]:
+    """The prompt and cache key for every relevant chunk of a document."""
+    schema = EXTRACTION_SCHEMAS.get(document_type or "", EXTRACTION_SCHEMAS["default"])
+    field_descriptions = "\n".join(
+        f"- {f['name']} ({f['type']}): {f['description']}" for f in schema["fields"]
+    )
+    requests = []
+    for chunk in select_chunks(chunk_document(raw_text), schema):
+        messages = _chunk_messages(chunk.text, field_descriptions)
+        requests.append(ChunkRequest(chunk, messages, LLMResponseCache.key(settings.openai_model, schema, messages)))
+    return requests
+
+
+def tag_chunk_page(chunk: Chunk, extractions: list[dict]) -> list[dict]:
+    if chunk.first_page == chunk.last_page:
+        for e in extractions:
+            e.setdefault("page_number", chunk.first_page)
+    return extractions
+
+
+async def _llm_extract(raw_text: str, document_type: str | None, use_cache: bool = True) -> list[dict]:
+    """Map the schema prompt over relevant chunks concurrently, then reduce by confidence."""
+    try:
+        semaphore = asyncio.Semaphore(settings.llm_concurrency)
+        cached = use_cache and settings.llm_cache_enabled
+
+        async def run(request: ChunkRequest) -> list[dict]:
+            extractions = await response_cache.get(request.cache_key) if cached else None
+            if extractions is None:
+                async with semaphore:
+                    extractions = await _llm_extract_chunk(request.messages)
+                if cached:
+                    await response_cache.put(request.cache_key, extractions)
+            return tag_chunk_page(request.chunk, extractions)
+
+        requests = plan_chunk_requests(raw_text, document_type)
+        results = await asyncio.gather(*(run(r) for r in requests), return_exceptions=True)
+        if results and all(isinstance(r, BaseException) for r in results):
+            raise results[0]
+        return merge_candidates([e for r in results if not isinstance(r, BaseException) for e in r])
+
+    except Exception:
+        logger.warning("LLM extraction failed; using rule-based fallback", exc_info=True)
         return _rule_based_extract(raw_text, document_type)
 
 
-def _rule_based_extract(raw_text: str, document_type: str | None) -> list[dict]:
-    """Fallback rule-based extraction using pattern matching."""
-    import re
-
-    extractions = []
-    text_lower = raw_text.lower()
-
-    patterns = {
-        "revenue": [
-            r"(?:revenue|net\s+sales|total\s+revenue)[:\s]*\$?([\d,]+\.?\d*)\s*(?:million|m|bn|billion)?",
-        ],
-        "ebitda": [
-            r"ebitda[:\s]*\$?([\d,]+\.?\d*)\s*(?:million|m|bn|billion)?",
-        ],
-        "net_income": [
-            r"(?:net\s+income|net\s+profit|net\s+earnings)[:\s]*\$?([\d,]+\.?\d*)\s*(?:million|m|bn|billion)?",
-        ],
-        "total_debt": [
-            r"(?:total\s+debt)[:\s]*\$?([\d,]+\.?\d*)\s*(?:million|m|bn|billion)?",
-        ],
-        "cash_and_equivalents": [
-            r"(?:cash\s+and\s+(?:cash\s+)?equivalents)[:\s]*\$?([\d,]+\.?\d*)\s*(?:million|m|bn|billion)?",
-        ],
+def _chunk_messages(text: str, field_descriptions: str) -> list[dict]:
+    return [
+        {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"Extract the following fields from this document:\n\n"
+                f"{field_descriptions}\n\n"
+                f"Document text:\n{text}"
+            ),
+        },
+    ]
+
+
+def chunk_request_body(messages: list[dict]) -> dict:
+    return {
+        "model": settings.openai_model,
+        "messages": messages,
+        "response_format": {"type": "json_object"},
+        "temperature": 0.0,
     }
 
-    for field_name, field_patterns in patterns.items():
-        for pattern in field_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                value = match.group(1).replace(",", "")
-                start = max(0, match.start() - 50)
-                end = min(len(raw_text), match.end() + 50)
-                snippet = raw_text[start:end].strip()
-
-                extractions.append({
-                    "field_name": field_name,
-                    "field_value": value,
-                    "field_type": "number",
-                    "confidence_score": 0.6,
-                    "extraction_method": "regex",
-                    "context_snippet": snippet,
-                })
-                break
 
+async def _llm_extract_chunk(messages: list[dict]) -> list[dict]:
+    response = await chat_completion(**chunk_request_body(messages))
+    return parse_completion_content(response.choices[0].message.content)
+
+
+def parse_completion_content(content: str) -> list[dict]:
+    parsed = json.loads(content)
+    extractions = parsed.get("extractions", parsed.get("fields", []))
+    if isinstance(extractions, dict):
+        extractions = [
+            {"field_name": k, "field_value": v, "field_type": "string", "confidence_score": 0.8}
+            for k, v in extractions.items()
+        ]
     return extractions
+
+
+RULE_LABELS = {
+    "revenue": ["revenue", "revenues", "total revenue", "total revenues", "net sales"],
+    "ebitda": ["ebitda", "adjusted ebitda"],
+    "net_income": ["net income", "net profit", "net earnings"],
+    "total_debt": ["total debt"],
+    "cash_and_equivalents": ["cash and equivalents", "cash and cash equivalents"],
+}
+
+_UNIT_SUFFIX = {"billion": "B", "bn": "B", "million": "M", "mm": "M", "m": "M", "thousand": "K", "k": "K"}
+
+
+def _label_alternation(labels: list[str]) -> str:
+    return "|".join(r"\s+".join(map(re.escape, label.split())) for label in sorted(labels, key=len, reverse=True))
+
+
+# One alternation over every field label, compiled once and scanned in a single pass.
+# The leading lookahead on the labels' first letters lets most positions fail fast.
+_RULE_PATTERN = re.compile(
+    "(?=[" + "".join(sorted({label[0] for labels in RULE_LABELS.values() for label in labels})) + r"])\b"
+    + "(?:" + "|".join(f"(?P<{field}>{_label_alternation(labels)})" for field, labels in RULE_LABELS.items()) + ")"
+    + r"(?P<sep>\s*:)?(?:\s+(?:of|was|were|is|at|totall?ed|reached))?[:\s]*"
+    + r"(?P<currency>\$)?\s?(?P<value>\d[\d,]*(?:\.\d+)?)"
+    + r"(?:\s*(?P<unit>billion|bn|million|mm|m|thousand|k)\b)?(?![\d,.]*\s*%)",
+    re.IGNORECASE,
+)
+_PAGE_BREAK_PATTERN = re.compile(re.escape(PAGE_BREAK))
+
+
+def _score_candidate(match: re.Match) -> float:
+    score = 0.6
+    if match.group("sep"):
+        score += 0.1
+    if match.group("currency"):
+        score += 0.05
+    if match.group("unit"):
+        score += 0.05
+    if match.group(0).lower().startswith("total"):
+        score += 0.05
+    return round(score, 2)
+
+
+def scan_rule_candidates(raw_text: str) -> list[dict]:
+    """Every labelled numeric value in ``raw_text``, scored, in document order."""
+    breaks = [m.start() for m in _PAGE_BREAK_PATTERN.finditer(raw_text)]
+    candidates = []
+    for match in _RULE_PATTERN.finditer(raw_text):
+        field_name = next(field for field in RULE_LABELS if match.group(field))
+        unit = match.group("unit")
+        value = coerce_numeric(match.group("value") + (_UNIT_SUFFIX[unit.lower()] if unit else ""))
+        if value is None:
+            continue
+        start = max(0, match.start() - 50)
+        end = min(len(raw_text), match.end() + 50)
+        candidates.append({
+            "field_name": field_name,
+            "field_value": str(int(value)) if value.is_integer() else repr(value),
+            "field_type": "number",
+            "confidence_score": _score_candidate(match),
+            "extraction_method": "regex",
+            "page_number": bisect.bisect_left(breaks, match.start()) + 1 if breaks else None,
+            "context_snippet": raw_text[start:end].strip(),
+        })
+    return candidates
+
+
+def _rule_based_extract(raw_text: str, document_type: str | None) -> list[dict]:
+    """Fallback rule-based extraction: the best-scoring candidate per field."""
+    best: dict[str, dict] = {}
+    for candidate in scan_rule_candidates(raw_text):
+        current = best.get(candidate["field_name"])
+        if current is None or candidate["confidence_score"] > current["confidence_score"]:
+            best[candidate["field_name"]] = candidate
+    return list(best.values())
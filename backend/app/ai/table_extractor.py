@@ -0,0 +1,281 @@
+"""Table-aware extraction of financial statement line items across periods.
+
+Finds a header row of period columns (FY2024, Q3 2024, 31 Dec 2024, ...) in
+Excel sheets, CSV files or page text, then maps each line-item row onto the
+numeric fields of ``EXTRACTION_SCHEMAS["financial_statement"]``, emitting
+one value per field and period.
+"""
+import calendar
+import csv
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from app.ai.structured_output import coerce_numeric
+
+LINE_ITEM_LABELS = {
+    "revenue": ["revenue", "revenues", "total revenue", "total revenues", "net revenue", "net sales", "sales", "turnover"],
+    "cost_of_goods_sold": ["cost of goods sold", "cogs", "cost of sales", "cost of revenue", "cost of revenues"],
+    "gross_profit": ["gross profit", "gross margin"],
+    "ebitda": ["ebitda", "adjusted ebitda", "adj ebitda", "reported ebitda"],
+    "net_income": [
+        "net income", "net profit", "net earnings", "profit for the year", "profit for the period",
+        "net loss", "loss for the year", "loss for the period",
+    ],
+    "total_assets": ["total assets"],
+    "total_liabilities": ["total liabilities"],
+    "total_equity": ["total equity", "total shareholders equity", "total stockholders equity", "shareholders equity"],
+    "cash_and_equivalents": ["cash and cash equivalents", "cash and equivalents", "cash"],
+    "total_debt": ["total debt", "total borrowings", "borrowings", "gross debt"],
+    "free_cash_flow": ["free cash flow", "fcf"],
+}
+_LABEL_TO_FIELD = {label: field for field, labels in LINE_ITEM_LABELS.items() for label in labels}
+# Loss rows report the size of the loss; their values are stored as negative income
+LOSS_LABELS = {"net loss", "loss for the year", "loss for the period"}
+# Labels used for a ratio as often as an amount; ratio rows are skipped
+RATIO_PRONE_LABELS = {"gross margin"}
+
+_SCALES = [
+    (re.compile(r"\bbillions?\b|\$\s?bn\b|\bbn\b"), 1_000_000_000),
+    (re.compile(r"\bmillions?\b|\$\s?mm?\b|\bmm\b"), 1_000_000),
+    (re.compile(r"\bthousands?\b|\b000s\b|\$\s?000\b|\$\s?k\b"), 1_000),
+]
+
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_abbr) if m}
+_YEAR = r"(?:19|20)\d{2}"
+_FY = re.compile(rf"^(?:fy|cy)?\s*'?({_YEAR}|\d{{2}})\s*[aebf]?$")
+_PARTIAL = re.compile(rf"^(q[1-4]|h[12])\s*(?:fy)?\s*'?({_YEAR}|\d{{2}})$|^({_YEAR})\s*(q[1-4]|h[12])$")
+_MONTH_YEAR = re.compile(rf"^(?:(\d{{1,2}})\s+)?([a-z]{{3}})[a-z]*[\s\-.']*({_YEAR}|\d{{2}})$")
+_NUMBER = re.compile(r"\(?-?\$?\d[\d,]*(?:\.\d+)?\)?%?|\(?-?\$?\.\d+\)?")
+_BLANKS = ("-", "\u2013", "\u2014", "n/a", "nm")
+
+
+class TableRow(NamedTuple):
+    label: str | None
+    values: dict[int, Any]
+    page: int | None
+    ref: str
+
+
+def _year(text: str) -> int:
+    year = int(text)
+    return year + 2000 if year < 100 else year
+
+
+def parse_period(value: Any) -> str | None:
+    """Canonical period label for a header cell, or None if it is not a period."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, int) and 1990 <= value <= 2100:
+        return f"FY{value}"
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip().lower().replace("fiscal year", "fy").replace("year ended", "").strip()
+    if m := _FY.match(text):
+        if len(m.group(1)) == 2 and not text.startswith(("fy", "cy", "'")):
+            return None
+        return f"FY{_year(m.group(1))}"
+    if m := _PARTIAL.match(text):
+        part, year = (m.group(1), m.group(2)) if m.group(1) else (m.group(4), m.group(3))
+        return f"{part.upper()} {_year(year)}"
+    if (m := _MONTH_YEAR.match(text)) and m.group(2) in _MONTHS:
+        year, month = _year(m.group(3)), _MONTHS[m.group(2)]
+        return date(year, month, calendar.monthrange(year, month)[1]).isoformat()
+    return None
+
+
+def period_end(label: str) -> date:
+    """Last day of a canonical period label produced by ``parse_period``."""
+    if label.startswith("FY"):
+        return date(int(label[2:]), 12, 31)
+    if label[0] in "QH":
+        part, year = label.split()
+        month = int(part[1]) * (3 if part[0] == "Q" else 6)
+        return date(int(year), month, calendar.monthrange(int(year), month)[1])
+    return date.fromisoformat(label)
+
+
+def _header_periods(row: TableRow) -> dict[int, str]:
+    """Period columns if ``row`` looks like a header, else an empty dict.
+
+    Other cells may only be text (e.g. "Notes"). Bare years such as 2023 must
+    be consecutive so a row of plain numbers is not mistaken for a header.
+    """
+    periods = {col: p for col, v in row.values.items() if (p := parse_period(v))}
+    if len(periods) < 2:
+        return {}
+    others = [v for col, v in row.values.items() if col not in periods]
+    if any(not isinstance(v, str) or coerce_numeric(v) is not None for v in others):
+        return {}
+    bare = sorted(int(v) for col, v in row.values.items() if col in periods and str(v).strip().isdigit())
+    if any(b - a != 1 for a, b in zip(bare, bare[1:])):
+        return {}
+    return periods
+
+
+def _normalise_label(label: str) -> str:
+    label = re.sub(r"\(.*?\)", " ", label.lower())
+    label = re.sub(r"[^a-z& ]+", " ", label).replace("&", " and ")
+    return " ".join(label.split())
+
+
+def match_line_item(label: str | None) -> str | None:
+    if not label:
+        return None
+    return _LABEL_TO_FIELD.get(_normalise_label(label))
+
+
+def _is_ratio_row(row: TableRow) -> bool:
+    """Whether a row holds percentages or fractions rather than amounts."""
+    if "%" in row.label or "percent" in row.label.lower():
+        return True
+    if any(isinstance(v, str) and v.strip().endswith("%") for v in row.values.values()):
+        return True
+    numbers = [n for v in row.values.values() if (n := coerce_numeric(v)) is not None]
+    return bool(numbers) and all(abs(n) <= 1 for n in numbers)
+
+
+def _scale(text: str) -> int | None:
+    text = text.lower()
+    for pattern, multiplier in _SCALES:
+        if pattern.search(text):
+            return multiplier
+    return None
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def extract_table_rows(rows: Iterable[TableRow]) -> list[dict]:
+    """Map line-item rows under the most recent period header to schema fields.
+
+    Header context resets whenever ``ref`` moves to a new sheet or page (the
+    part before ``!``). The first value seen for each (field, period) wins.
+    Values on loss rows are made negative, and ratio rows under labels such
+    as "gross margin" are ignored.
+    """
+    results: dict[tuple[str, str], dict] = {}
+    periods: dict[int, str] = {}
+    multiplier = 1
+    section = None
+
+    for row in rows:
+        row_section = row.ref.split("!")[0]
+        if row_section != section:
+            section, periods, multiplier = row_section, {}, 1
+
+        field = match_line_item(row.label)
+        if field is None:
+            header = _header_periods(row)
+            texts = [row.label or ""] + [v for v in row.values.values() if isinstance(v, str)]
+            scale = _scale(" ".join(texts))
+            if header:
+                periods = header
+                multiplier = scale or multiplier
+            elif scale:
+                multiplier = scale
+            continue
+        label = _normalise_label(row.label)
+        if label in RATIO_PRONE_LABELS and _is_ratio_row(row):
+            continue
+
+        for col, period in periods.items():
+            value = coerce_numeric(row.values.get(col))
+            if value is None or (field, period) in results:
+                continue
+            if label in LOSS_LABELS and value > 0:
+                value = -value
+            results[(field, period)] = {
+                "field_name": field,
+                "field_value": _format_value(value * multiplier),
+                "field_type": "number",
+                "confidence_score": 0.9,
+                "extraction_method": "table_parse",
+                "page_number": row.page,
+                "period": period,
+                "context_snippet": f"{row.ref}: {row.label}"[:1000],
+            }
+
+    return sorted(results.values(), key=lambda e: (e["field_name"], period_end(e["period"])))
+
+
+def _cells_row(cells: tuple, page: int | None, ref: str) -> TableRow:
+    label, values = None, {}
+    for col, value in enumerate(cells, start=1):
+        if value is None or value == "":
+            continue
+        if label is None and isinstance(value, str) and coerce_numeric(value) is None and not parse_period(value):
+            label = value
+        else:
+            values[col] = value
+    return TableRow(label, values, page, ref)
+
+
+def _line_row(line: str, page: int | None, ref: str) -> TableRow | None:
+    """Split a text line into a label and right-aligned value columns.
+
+    Columns are keyed by their position from the right (-1 is the last
+    column), so headers and rows with different label widths still line up.
+    """
+    words = line.split()
+    tail: list[str] = []
+    while words:
+        for width in (3, 2):
+            if len(words) >= width and parse_period(" ".join(words[-width:])):
+                tail.insert(0, " ".join(words[-width:]))
+                del words[-width:]
+                break
+        else:
+            if not (_NUMBER.fullmatch(words[-1]) or parse_period(words[-1]) or words[-1] in _BLANKS):
+                break
+            tail.insert(0, words.pop())
+    if not tail:
+        return None
+    values = {i - len(tail): v for i, v in enumerate(tail)}
+    return TableRow(" ".join(words) or None, values, page, ref)
+
+
+def iter_text_rows(pages: list[str], paged: bool = True) -> Iterator[TableRow]:
+    for page_number, text in enumerate(pages, start=1):
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            row = _line_row(line, page_number if paged else None, f"page {page_number}!{line_number}")
+            if row is not None:
+                yield row
+
+
+def iter_excel_table_rows(path: Path) -> Iterator[TableRow]:
+    from app.ai.document_parser import iter_excel_rows
+
+    for sheet, row_number, values in iter_excel_rows(path):
+        yield _cells_row(values, None, f"{sheet}!{row_number}")
+
+
+def iter_csv_rows(path: Path) -> Iterator[TableRow]:
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for row_number, cells in enumerate(csv.reader(f), start=1):
+            yield _cells_row(tuple(cells), None, f"{path.name}!{row_number}")
+
+
+def extract_tables_sync(file_path: str, file_type: str, pages: list[str] | None = None) -> list[dict]:
+    """Run table extraction over a stored file, or over already-parsed page text."""
+    path = Path(file_path)
+    if file_type in ("xlsx", "xls"):
+        rows = iter_excel_table_rows(path)
+    elif file_type == "csv":
+        rows = iter_csv_rows(path)
+    elif pages is not None:
+        rows = iter_text_rows(pages, paged=file_type == "pdf")
+    else:
+        return []
+    return extract_table_rows(rows)
+
+
+async def extract_tables(file_path: str, file_type: str, pages: list[str] | None = None) -> list[dict]:
+    from app.ai.document_parser import run_in_parser_pool
+
+    return await run_in_parser_pool(extract_tables_sync, file_path, file_type, pages)
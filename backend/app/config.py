@@ -15,13 +15,58 @@ class Settings(BaseSettings):
     upload_dir: str = "uploads"
     max_upload_size_mb: int = 50
 
+    # Extraction jobs
+    parse_workers: int = 2
+    pdf_pages_per_task: int = 20
+    # Worker coroutines started with the app; 0 leaves queued jobs to the batch runner or another process
+    extraction_workers: int = 2
+    extraction_poll_interval: float = 1.0
+    extraction_max_attempts: int = 3
+    # Seconds without a checkpoint after which a running job is presumed abandoned and reclaimed
+    extraction_claim_timeout: float = 900.0
+
     # AI / LLM
     openai_api_key: str = ""
     openai_model: str = "gpt-4o"
+    openai_base_url: str = ""
+    llm_timeout_seconds: float = 60.0
+    llm_max_connections: int = 20
+    llm_requests_per_minute: int = 500
+    llm_tokens_per_minute: int = 200_000
+    llm_max_retries: int = 5
+    llm_backoff_base_seconds: float = 0.5
+    llm_backoff_max_seconds: float = 30.0
     embedding_model: str = "text-embedding-3-small"
+    embedding_batch_size: int = 64
+    embedding_chunk_chars: int = 1000
+    embedding_chunk_overlap: int = 200
+    table_extraction_min_fields: int = 3
+    llm_chunk_chars: int = 12000
+    llm_max_chunks: int = 20
+    llm_concurrency: int = 4
+    llm_batch_poll_seconds: float = 30.0
+    llm_batch_max_documents: int = 500
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "llm_cache.sqlite3"
+    llm_cache_ttl_seconds: int = 30 * 24 * 3600
+    llm_cache_max_entries: int = 100_000
+
+    # Portfolio
+    portfolio_rollup_enabled: bool = False
+
+    # Metric imports
+    metric_import_batch_rows: int = 50_000
+    metric_import_max_errors: int = 1000
+    metric_import_max_mb: int = 1024
+
+    # Valuation
+    monte_carlo_workers: int = 2
+    valuation_cache_size: int = 1024
 
     # ChromaDB
     chroma_persist_dir: str = "./chroma_data"
+    chroma_workers: int = 4
+    vector_search_batch_size: int = 32
 
     # Auth (placeholder)
     secret_key: str = "dev-secret-change-in-production"
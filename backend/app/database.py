@@ -1,3 +1,4 @@
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -45,3 +46,25 @@ async def get_db() -> AsyncSession:
             raise
         finally:
             await session.close()
+
+
+async def bulk_insert(session: AsyncSession, model: type[Base], rows: list[dict]) -> list:
+    """Insert ``rows`` with multi-row ``INSERT ... RETURNING``; instances come back in input order.
+
+    SQLAlchemy splits large inputs into pages of multi-VALUES statements, so
+    thousands of rows cost a handful of round trips and no refresh queries.
+    """
+    if not rows:
+        return []
+    result = await session.scalars(insert(model).returning(model, sort_by_parameter_order=True), rows)
+    return list(result.all())
+
+
+async def upsert_insert(session: AsyncSession, model: type[Base]):
+    """``INSERT`` construct for the session's dialect that supports ``on_conflict_do_update``."""
+    conn = await session.connection()
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
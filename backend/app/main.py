@@ -1,15 +1,37 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from app.ai import llm_client
+from app.ai.embeddings import embedding_service
+from app.ai.llm_extractor import response_cache
 from app.config import get_settings
+from app.process_pools import shutdown_process_pools
 from app.routers import portfolio, documents, monitoring, valuation, reports
+from app.services.extraction_jobs import extraction_worker
+from app.services.pagination import InvalidCursor
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.extraction_workers > 0:
+        await extraction_worker.start(settings.extraction_workers)
+    yield
+    await extraction_worker.stop()
+    await llm_client.close_llm_client()
+    embedding_service.close()
+    shutdown_process_pools()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="AI-powered private markets operations platform",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -27,6 +49,15 @@ app.include_router(valuation.router)
 app.include_router(reports.router)
 
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "version": settings.app_version}
+    return {
+        "status": "healthy",
+        "version": settings.app_version,
+        "llm": {**llm_client.get_metrics(), "cache": response_cache.stats()},
+    }
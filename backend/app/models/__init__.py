@@ -3,10 +3,12 @@ from app.models.company import Company
 from app.models.financial_metric import FinancialMetric
 from app.models.document import Document
 from app.models.extraction import Extraction
+from app.models.extraction_job import ExtractionJob
 from app.models.valuation import Valuation, ValuationOverride
 from app.models.scenario import Scenario
 from app.models.report import Report
 from app.models.audit_log import AuditLog
+from app.models.portfolio_rollup import PortfolioRollup
 
 __all__ = [
     "Fund",
@@ -14,9 +16,11 @@ __all__ = [
     "FinancialMetric",
     "Document",
     "Extraction",
+    "ExtractionJob",
     "Valuation",
     "ValuationOverride",
     "Scenario",
     "Report",
     "AuditLog",
+    "PortfolioRollup",
 ]
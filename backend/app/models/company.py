@@ -1,7 +1,7 @@
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import String, Float, Date, DateTime, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, Float, Date, DateTime, ForeignKey, Index, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -30,6 +30,7 @@ class Sector(str, enum.Enum):
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (Index("ix_companies_created_at_id", "created_at", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     fund_id: Mapped[str] = mapped_column(String(36), ForeignKey("funds.id"), nullable=False, index=True)
@@ -48,7 +49,7 @@ class Company(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     fund = relationship("Fund", back_populates="companies")
-    financial_metrics = relationship("FinancialMetric", back_populates="company", lazy="selectin")
-    documents = relationship("Document", back_populates="company", lazy="selectin")
-    valuations = relationship("Valuation", back_populates="company", lazy="selectin")
-    scenarios = relationship("Scenario", back_populates="company", lazy="selectin")
+    financial_metrics = relationship("FinancialMetric", back_populates="company", lazy="raise")
+    documents = relationship("Document", back_populates="company", lazy="raise")
+    valuations = relationship("Valuation", back_populates="company", lazy="raise")
+    scenarios = relationship("Scenario", back_populates="company", lazy="raise")
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Enum as SAEnum, Text, JSON
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, Enum as SAEnum, Text, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -31,6 +31,7 @@ class ProcessingStatus(str, enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (Index("ix_documents_created_at_id", "created_at", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     company_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("companies.id"), nullable=True, index=True)
@@ -38,6 +39,7 @@ class Document(Base):
     file_type: Mapped[str] = mapped_column(String(50), nullable=False)
     file_path: Mapped[str] = mapped_column(String(1000), nullable=False)
     file_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     document_type: Mapped[str | None] = mapped_column(SAEnum(DocumentType), nullable=True)
     processing_status: Mapped[str] = mapped_column(SAEnum(ProcessingStatus), default=ProcessingStatus.pending)
     extracted_data: Mapped[dict | None] = mapped_column(JSON, nullable=True)
@@ -48,4 +50,4 @@ class Document(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     company = relationship("Company", back_populates="documents")
-    extractions = relationship("Extraction", back_populates="document", lazy="selectin")
+    extractions = relationship("Extraction", back_populates="document", lazy="raise")
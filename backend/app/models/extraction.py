@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Float, Boolean, DateTime, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, Float, Boolean, DateTime, ForeignKey, Index, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -26,9 +26,16 @@ class Extraction(Base):
     confidence_score: Mapped[float] = mapped_column(Float, nullable=False)
     extraction_method: Mapped[str] = mapped_column(SAEnum(ExtractionMethod), default=ExtractionMethod.llm)
     page_number: Mapped[int | None] = mapped_column(nullable=True)
+    period: Mapped[str | None] = mapped_column(String(20), nullable=True)
     context_snippet: Mapped[str | None] = mapped_column(String(1000), nullable=True)
     validated: Mapped[bool] = mapped_column(Boolean, default=False)
     validated_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # Set when the validated value was written to financial_metrics; cleared when it is re-validated
+    promoted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     document = relationship("Document", back_populates="extractions")
+
+
+# Finds validated extractions that still need promoting to metrics
+Index("ix_extractions_validated_promoted_at", Extraction.validated, Extraction.promoted_at)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import String, Float, Date, DateTime, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, Float, Date, DateTime, ForeignKey, Index, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -54,3 +54,23 @@ class FinancialMetric(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     company = relationship("Company", back_populates="financial_metrics")
+
+
+# One value per (company, metric, period): the upsert target of imports and promotions. It also
+# serves latest-value-per-metric lookups; on Postgres it covers ``value`` for index-only scans
+Index(
+    "ix_financial_metrics_company_type_period",
+    FinancialMetric.company_id,
+    FinancialMetric.metric_type,
+    FinancialMetric.period_date.desc(),
+    unique=True,
+    postgresql_include=["value"],
+)
+METRIC_KEY = (FinancialMetric.company_id, FinancialMetric.metric_type, FinancialMetric.period_date)
+
+Index(
+    "ix_financial_metrics_company_period_id",
+    FinancialMetric.company_id,
+    FinancialMetric.period_date,
+    FinancialMetric.id,
+)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Integer, Float, DateTime, Enum as SAEnum
+from sqlalchemy import String, Integer, Float, DateTime, Index, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -25,6 +25,7 @@ class FundStrategy(str, enum.Enum):
 
 class Fund(Base):
     __tablename__ = "funds"
+    __table_args__ = (Index("ix_funds_created_at_id", "created_at", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
@@ -37,4 +38,4 @@ class Fund(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    companies = relationship("Company", back_populates="fund", lazy="selectin")
+    companies = relationship("Company", back_populates="fund", lazy="raise")
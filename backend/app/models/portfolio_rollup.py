@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import String, Integer, Float, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class PortfolioRollup(Base):
+    """Pre-aggregated company totals per dimension ("total", "sector", "geography")."""
+
+    __tablename__ = "portfolio_rollups"
+
+    dimension: Mapped[str] = mapped_column(String(20), primary_key=True)
+    key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    company_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    active_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_invested: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    total_value: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    active_value: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
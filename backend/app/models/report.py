@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, DateTime, Enum as SAEnum, JSON
+from sqlalchemy import String, DateTime, Enum as SAEnum, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column
 import enum
 
@@ -25,6 +25,7 @@ class ReportStatus(str, enum.Enum):
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (Index("ix_reports_created_at_id", "created_at", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import String, Float, Date, DateTime, ForeignKey, Enum as SAEnum, JSON
+from sqlalchemy import String, Float, Date, DateTime, ForeignKey, Index, Enum as SAEnum, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -13,6 +13,7 @@ class ValuationMethod(str, enum.Enum):
     comparable_companies = "comparable_companies"
     comparable_transactions = "comparable_transactions"
     sensitivity = "sensitivity"
+    monte_carlo = "monte_carlo"
     weighted_blend = "weighted_blend"
 
 
@@ -25,6 +26,7 @@ class ValuationStatus(str, enum.Enum):
 
 class Valuation(Base):
     __tablename__ = "valuations"
+    __table_args__ = (Index("ix_valuations_created_at_id", "created_at", "id"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     company_id: Mapped[str] = mapped_column(String(36), ForeignKey("companies.id"), nullable=False, index=True)
@@ -36,6 +38,7 @@ class Valuation(Base):
     equity_value: Mapped[float | None] = mapped_column(Float, nullable=True)
     implied_multiple: Mapped[float | None] = mapped_column(Float, nullable=True)
     currency: Mapped[str] = mapped_column(String(3), default="USD")
+    input_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     status: Mapped[str] = mapped_column(SAEnum(ValuationStatus), default=ValuationStatus.draft)
     notes: Mapped[str | None] = mapped_column(String(2000), nullable=True)
     created_by: Mapped[str] = mapped_column(String(255), default="system")
@@ -43,7 +46,7 @@ class Valuation(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     company = relationship("Company", back_populates="valuations")
-    overrides = relationship("ValuationOverride", back_populates="valuation", lazy="selectin")
+    overrides = relationship("ValuationOverride", back_populates="valuation", lazy="raise")
 
 
 class ValuationOverride(Base):
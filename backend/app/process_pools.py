@@ -0,0 +1,25 @@
+"""Process pools for CPU-bound work such as document parsing and Monte Carlo paths.
+
+Each named pool is created on first use with the ``spawn`` start method and
+all of them are shut down together when the application stops.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_pools: dict[str, ProcessPoolExecutor] = {}
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _pools[name] = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return pool
+
+
+def shutdown_process_pools():
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(wait=False, cancel_futures=True)
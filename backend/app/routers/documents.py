@@ -1,6 +1,6 @@
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
@@ -12,51 +12,100 @@ from app.schemas.document import (
     ExtractionResponse,
     ExtractionValidation,
     ExtractionListResponse,
+    ExtractionJobResponse,
+    ExtractionJobListResponse,
 )
+from app.services import extraction_jobs as jobs
 from app.services import ingestion as svc
+from app.services.pagination import CountMode, PageRequest
 
 settings = get_settings()
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
 
 
-@router.post("/upload", response_model=DocumentResponse, status_code=201)
-async def upload_document(
-    file: UploadFile = File(...),
-    company_id: str | None = Form(None),
-    document_type: DocumentType | None = Form(None),
-    db: AsyncSession = Depends(get_db),
-):
-    content = await file.read()
-    max_bytes = settings.max_upload_size_mb * 1024 * 1024
-    if len(content) > max_bytes:
-        raise HTTPException(413, f"File exceeds {settings.max_upload_size_mb}MB limit")
+_UPLOAD_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["file"],
+        "properties": {
+            "file": {"type": "string", "format": "binary"},
+            "company_id": {"type": "string"},
+            "document_type": {"type": "string", "enum": [t.value for t in DocumentType]},
+        },
+    }}},
+}
+
 
-    doc = await svc.save_upload(db, file.filename, content, company_id, document_type)
-    return _doc_response(doc)
+@router.post("/upload", response_model=DocumentResponse, status_code=201, openapi_extra={"requestBody": _UPLOAD_BODY})
+async def upload_document(request: Request, db: AsyncSession = Depends(get_db)):
+    """Stream a multipart upload straight to disk; oversized bodies are cut off early with 413."""
+    try:
+        upload = svc.MultipartUpload(request.headers.get("content-type"), request.stream())
+        doc = await svc.save_multipart_upload(db, upload)
+    except svc.UploadTooLarge:
+        raise HTTPException(413, f"File exceeds {settings.max_upload_size_mb}MB limit")
+    except svc.InvalidUpload as e:
+        raise HTTPException(422, str(e))
+    await jobs.enqueue_extraction(db, doc.id)
+    return _doc_response(doc, 0)
 
 
 @router.get("", response_model=DocumentListResponse)
 async def list_documents(
     company_id: str | None = None,
     status: ProcessingStatus | None = None,
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    docs, total = await svc.list_documents(db, company_id, status, skip, limit)
+    page = await svc.list_documents(db, company_id, status, PageRequest(cursor, limit, skip, count))
+    counts = await svc.get_extraction_counts(db, [d.id for d in page.items])
     return DocumentListResponse(
-        documents=[_doc_response(d) for d in docs],
-        total=total,
+        documents=[_doc_response(d, counts.get(d.id, 0)) for d in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
+@router.get("/jobs/{job_id}", response_model=ExtractionJobResponse)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return ExtractionJobResponse.model_validate(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ExtractionJobResponse)
+async def cancel_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await jobs.cancel_job(db, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return ExtractionJobResponse.model_validate(job)
+
+
+@router.post("/jobs/{job_id}/retry", response_model=ExtractionJobResponse)
+async def retry_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job.status != ProcessingStatus.failed:
+        raise HTTPException(409, "Only failed jobs can be retried")
+    job = await jobs.retry_job(db, job_id)
+    return ExtractionJobResponse.model_validate(job)
+
+
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(document_id: str, db: AsyncSession = Depends(get_db)):
     doc = await svc.get_document(db, document_id)
     if not doc:
         raise HTTPException(404, "Document not found")
-    return _doc_response(doc)
+    counts = await svc.get_extraction_counts(db, [doc.id])
+    return _doc_response(doc, counts.get(doc.id, 0))
 
 
 @router.post("/{document_id}/extract", response_model=ExtractionListResponse)
@@ -65,26 +114,9 @@ async def extract_document(document_id: str, db: AsyncSession = Depends(get_db))
     if not doc:
         raise HTTPException(404, "Document not found")
 
-    await svc.update_document_status(db, document_id, ProcessingStatus.parsing)
-
     try:
-        from app.ai.document_parser import parse_document
-        from app.ai.llm_extractor import extract_fields
-
-        raw_text, page_count = await parse_document(doc.file_path, doc.file_type)
-        await svc.update_document_status(
-            db, document_id, ProcessingStatus.extracting,
-            raw_text=raw_text, page_count=page_count,
-        )
-
-        extracted = await extract_fields(raw_text, doc.document_type)
-        extractions = await svc.save_extractions(db, document_id, extracted)
-
-        await svc.update_document_status(
-            db, document_id, ProcessingStatus.completed,
-            extracted_data={e["field_name"]: e["field_value"] for e in extracted},
-        )
-
+        extractions = await jobs.process_document(db, doc)
+        await jobs.complete_pending_jobs(db, document_id)
         return ExtractionListResponse(
             extractions=[ExtractionResponse.model_validate(e) for e in extractions],
             total=len(extractions),
@@ -97,6 +129,24 @@ async def extract_document(document_id: str, db: AsyncSession = Depends(get_db))
         raise HTTPException(500, f"Extraction failed: {str(e)}")
 
 
+@router.post("/{document_id}/jobs", response_model=ExtractionJobResponse, status_code=202)
+async def enqueue_extraction(document_id: str, db: AsyncSession = Depends(get_db)):
+    doc = await svc.get_document(db, document_id)
+    if not doc:
+        raise HTTPException(404, "Document not found")
+    job = await jobs.enqueue_extraction(db, document_id)
+    return ExtractionJobResponse.model_validate(job)
+
+
+@router.get("/{document_id}/jobs", response_model=ExtractionJobListResponse)
+async def list_jobs(document_id: str, db: AsyncSession = Depends(get_db)):
+    items = await jobs.list_jobs(db, document_id)
+    return ExtractionJobListResponse(
+        jobs=[ExtractionJobResponse.model_validate(j) for j in items],
+        total=len(items),
+    )
+
+
 @router.get("/{document_id}/extractions", response_model=ExtractionListResponse)
 async def get_extractions(document_id: str, db: AsyncSession = Depends(get_db)):
     extractions = await svc.get_extractions(db, document_id)
@@ -120,18 +170,19 @@ async def validate_extraction(
     return ExtractionResponse.model_validate(extraction)
 
 
-def _doc_response(doc) -> DocumentResponse:
+def _doc_response(doc, extraction_count: int) -> DocumentResponse:
     return DocumentResponse(
         id=doc.id,
         company_id=doc.company_id,
         filename=doc.filename,
         file_type=doc.file_type,
         file_size=doc.file_size,
+        content_hash=doc.content_hash,
         document_type=doc.document_type,
         processing_status=doc.processing_status,
         extracted_data=doc.extracted_data,
         page_count=doc.page_count,
         error_message=doc.error_message,
         upload_date=doc.upload_date,
-        extraction_count=len(doc.extractions) if doc.extractions else 0,
+        extraction_count=extraction_count,
     )
@@ -1,44 +1,123 @@
 import uuid
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.database import get_db
 from app.models.financial_metric import MetricType
 from app.schemas.monitoring import (
+    MetricBulkResult,
     MetricCreate,
     MetricResponse,
     MetricListResponse,
+    MetricPromotionResult,
     MetricTimeSeries,
     ScenarioCreate,
     ScenarioResponse,
+    TimeSeriesFrame,
 )
+from app.services import metric_import, metric_promotion, timeseries
 from app.services import monitoring as svc
+from app.services.ingestion import UploadTooLarge
+from app.services.pagination import CountMode, PageRequest
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/monitoring", tags=["Monitoring"])
 
 
 @router.post("/metrics", response_model=MetricResponse, status_code=201)
 async def create_metric(data: MetricCreate, db: AsyncSession = Depends(get_db)):
-    metric = await svc.create_metric(db, data)
+    try:
+        metric = await svc.create_metric(db, data)
+    except svc.DuplicateMetric as e:
+        raise HTTPException(409, f"Metric conflicts with an existing one: {e}")
+    except svc.InvalidMetric as e:
+        raise HTTPException(422, f"Invalid metric: {e}")
     return MetricResponse.model_validate(metric)
 
 
+@router.post("/metrics/batch", response_model=list[MetricResponse], status_code=201)
+async def create_metrics(data: list[MetricCreate], db: AsyncSession = Depends(get_db)):
+    try:
+        metrics = await svc.create_metrics(db, data)
+    except svc.DuplicateMetric as e:
+        raise HTTPException(409, f"Metric conflicts with an existing one: {e}")
+    except svc.InvalidMetric as e:
+        raise HTTPException(422, f"Invalid metric: {e}")
+    return [MetricResponse.model_validate(m) for m in metrics]
+
+
+@router.post("/metrics/bulk", response_model=MetricBulkResult)
+async def bulk_import_metrics(
+    request: Request,
+    file_format: str | None = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Upsert metrics from a streamed CSV, JSONL or Parquet body, reporting rejected rows."""
+    try:
+        fmt = metric_import.detect_format(request.headers.get("content-type"), file_format)
+    except metric_import.MetricImportError as e:
+        raise HTTPException(415, str(e))
+    try:
+        return await metric_import.import_metrics(db, request.stream(), fmt)
+    except UploadTooLarge:
+        raise HTTPException(413, f"Upload exceeds {settings.metric_import_max_mb}MB limit")
+    except metric_import.MetricImportError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.post("/metrics/promote", response_model=MetricPromotionResult)
+async def promote_extractions(
+    company_id: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """Turn newly validated document extractions into extracted metrics."""
+    return await metric_promotion.promote_validated_extractions(db, company_id, limit)
+
+
+@router.get("/timeseries", response_model=TimeSeriesFrame)
+async def get_time_series_frame(
+    metric_type: list[MetricType] = Query(...),
+    company_id: list[str] | None = Query(None),
+    fund_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    freq: timeseries.Frequency = "quarter",
+    agg: timeseries.Aggregation = "last",
+    growth: bool = False,
+    margins: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """Columnar series for many companies and metrics on one resampled date axis."""
+    return await timeseries.get_time_series_frame(
+        db, metric_type, company_id, fund_id, start_date, end_date, freq, agg, growth, margins,
+    )
+
+
 @router.get("/metrics/{company_id}", response_model=MetricListResponse)
 async def list_metrics(
     company_id: str,
     metric_type: MetricType | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    metrics, total = await svc.list_metrics(db, company_id, metric_type, start_date, end_date, skip, limit)
+    page = await svc.list_metrics(
+        db, company_id, metric_type, start_date, end_date, PageRequest(cursor, limit, skip, count),
+    )
     return MetricListResponse(
-        metrics=[MetricResponse.model_validate(m) for m in metrics],
-        total=total,
+        metrics=[MetricResponse.model_validate(m) for m in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
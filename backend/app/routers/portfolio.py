@@ -9,6 +9,7 @@ from app.schemas.fund import FundCreate, FundUpdate, FundResponse, FundListRespo
 from app.schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse, CompanyListResponse
 from app.schemas.monitoring import PortfolioSummary
 from app.services import portfolio as svc
+from app.services.pagination import CountMode, PageRequest
 
 router = APIRouter(prefix="/api/portfolio", tags=["Portfolio"])
 
@@ -18,24 +19,35 @@ async def get_portfolio_summary(db: AsyncSession = Depends(get_db)):
     return await svc.get_portfolio_summary(db)
 
 
+@router.post("/summary/refresh", response_model=PortfolioSummary)
+async def refresh_portfolio_summary(db: AsyncSession = Depends(get_db)):
+    await svc.refresh_portfolio_rollup(db)
+    return await svc.get_portfolio_summary(db)
+
+
 # --- Funds ---
 
 @router.post("/funds", response_model=FundResponse, status_code=201)
 async def create_fund(data: FundCreate, db: AsyncSession = Depends(get_db)):
     fund = await svc.create_fund(db, data)
-    return _fund_response(fund)
+    return _fund_response(fund, {})
 
 
 @router.get("/funds", response_model=FundListResponse)
 async def list_funds(
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    funds, total = await svc.list_funds(db, skip, limit)
+    page = await svc.list_funds(db, PageRequest(cursor, limit, skip, count))
+    stats = await svc.get_fund_stats(db, [f.id for f in page.items])
     return FundListResponse(
-        funds=[_fund_response(f) for f in funds],
-        total=total,
+        funds=[_fund_response(f, stats.get(f.id, {})) for f in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
@@ -44,7 +56,8 @@ async def get_fund(fund_id: str, db: AsyncSession = Depends(get_db)):
     fund = await svc.get_fund(db, fund_id)
     if not fund:
         raise HTTPException(404, "Fund not found")
-    return _fund_response(fund)
+    stats = await svc.get_fund_stats(db, [fund.id])
+    return _fund_response(fund, stats.get(fund.id, {}))
 
 
 @router.patch("/funds/{fund_id}", response_model=FundResponse)
@@ -52,7 +65,8 @@ async def update_fund(fund_id: str, data: FundUpdate, db: AsyncSession = Depends
     fund = await svc.update_fund(db, fund_id, data)
     if not fund:
         raise HTTPException(404, "Fund not found")
-    return _fund_response(fund)
+    stats = await svc.get_fund_stats(db, [fund.id])
+    return _fund_response(fund, stats.get(fund.id, {}))
 
 
 @router.delete("/funds/{fund_id}", status_code=204)
@@ -73,14 +87,18 @@ async def create_company(data: CompanyCreate, db: AsyncSession = Depends(get_db)
 async def list_companies(
     fund_id: str | None = None,
     status: CompanyStatus | None = None,
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    companies, total = await svc.list_companies(db, fund_id, status, skip, limit)
+    page = await svc.list_companies(db, fund_id, status, PageRequest(cursor, limit, skip, count))
     return CompanyListResponse(
-        companies=[_company_response(c) for c in companies],
-        total=total,
+        companies=[_company_response(c) for c in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
@@ -104,8 +122,7 @@ async def update_company(
     return _company_response(company)
 
 
-def _fund_response(fund) -> FundResponse:
-    companies = fund.companies or []
+def _fund_response(fund, stats: dict) -> FundResponse:
     return FundResponse(
         id=fund.id,
         name=fund.name,
@@ -117,9 +134,9 @@ def _fund_response(fund) -> FundResponse:
         description=fund.description,
         created_at=fund.created_at,
         updated_at=fund.updated_at,
-        company_count=len(companies),
-        total_invested=sum(c.initial_investment for c in companies),
-        total_value=sum(c.current_valuation for c in companies),
+        company_count=stats.get("company_count", 0),
+        total_invested=stats.get("total_invested", 0.0),
+        total_value=stats.get("total_value", 0.0),
     )
 
 
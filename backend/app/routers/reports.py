@@ -12,6 +12,7 @@ from app.schemas.report import (
     AuditLogListResponse,
 )
 from app.services import reporting as svc
+from app.services.pagination import CountMode, PageRequest
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
@@ -24,14 +25,18 @@ async def create_report(data: ReportCreate, db: AsyncSession = Depends(get_db)):
 
 @router.get("", response_model=ReportListResponse)
 async def list_reports(
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    reports, total = await svc.list_reports(db, skip, limit)
+    page = await svc.list_reports(db, PageRequest(cursor, limit, skip, count))
     return ReportListResponse(
-        reports=[ReportResponse.model_validate(r) for r in reports],
-        total=total,
+        reports=[ReportResponse.model_validate(r) for r in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
@@ -39,14 +44,18 @@ async def list_reports(
 async def get_audit_logs(
     entity_type: str | None = None,
     entity_id: str | None = None,
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    logs, total = await svc.get_audit_logs(db, entity_type, entity_id, skip, limit)
+    page = await svc.get_audit_logs(db, entity_type, entity_id, PageRequest(cursor, limit, skip, count))
     return AuditLogListResponse(
-        logs=[AuditLogResponse.model_validate(l) for l in logs],
-        total=total,
+        logs=[AuditLogResponse.model_validate(l) for l in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
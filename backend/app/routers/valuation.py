@@ -1,6 +1,8 @@
+import json
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
@@ -8,10 +10,14 @@ from app.schemas.valuation import (
     ValuationCreate,
     ValuationResponse,
     ValuationListResponse,
+    DCFBatchRequest,
+    DCFBatchResponse,
+    MonteCarloInputs,
     OverrideCreate,
     OverrideResponse,
 )
 from app.services import valuation_engine as svc
+from app.services.pagination import CountMode, PageRequest
 
 router = APIRouter(prefix="/api/valuation", tags=["Valuation"])
 
@@ -22,17 +28,45 @@ async def run_valuation(data: ValuationCreate, db: AsyncSession = Depends(get_db
     return ValuationResponse.model_validate(valuation)
 
 
+@router.post("/dcf/batch", response_model=DCFBatchResponse)
+async def run_dcf_batch(data: DCFBatchRequest, db: AsyncSession = Depends(get_db)):
+    results = await svc.run_batch_dcf(db, data)
+    return DCFBatchResponse(results=results, total=len(results))
+
+
+@router.post("/monte-carlo/stream")
+async def stream_monte_carlo(data: MonteCarloInputs):
+    """Stream converging percentile bands as newline-delimited JSON.
+
+    Nothing is persisted; post the same inputs to ``/run`` with method
+    ``monte_carlo`` to store the result.
+    """
+    error = svc.validate_monte_carlo(data)
+    if error:
+        raise HTTPException(422, error)
+
+    async def events():
+        async for update in svc.stream_monte_carlo(data):
+            yield json.dumps(update) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @router.get("", response_model=ValuationListResponse)
 async def list_valuations(
     company_id: str | None = None,
+    cursor: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    count: CountMode | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    valuations, total = await svc.list_valuations(db, company_id, skip, limit)
+    page = await svc.list_valuations(db, company_id, PageRequest(cursor, limit, skip, count))
     return ValuationListResponse(
-        valuations=[ValuationResponse.model_validate(v) for v in valuations],
-        total=total,
+        valuations=[ValuationResponse.model_validate(v) for v in page.items],
+        total=page.total,
+        total_estimated=page.total_estimated,
+        next_cursor=page.next_cursor,
     )
 
 
@@ -53,5 +87,8 @@ async def add_override(
     valuation = await svc.get_valuation(db, valuation_id)
     if not valuation:
         raise HTTPException(404, "Valuation not found")
-    override = await svc.add_override(db, valuation_id, data)
+    try:
+        override = await svc.add_override(db, valuation_id, data)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
     return OverrideResponse.model_validate(override)
@@ -49,4 +49,6 @@ class CompanyResponse(BaseModel):
 
 class CompanyListResponse(BaseModel):
     companies: list[CompanyResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
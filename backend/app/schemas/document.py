@@ -12,6 +12,7 @@ class DocumentResponse(BaseModel):
     filename: str
     file_type: str
     file_size: int
+    content_hash: str | None = None
     document_type: DocumentType | None
     processing_status: ProcessingStatus
     extracted_data: dict | None
@@ -25,7 +26,9 @@ class DocumentResponse(BaseModel):
 
 class DocumentListResponse(BaseModel):
     documents: list[DocumentResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
 
 
 class ExtractionResponse(BaseModel):
@@ -37,9 +40,11 @@ class ExtractionResponse(BaseModel):
     confidence_score: float
     extraction_method: ExtractionMethod
     page_number: int | None
+    period: str | None = None
     context_snippet: str | None
     validated: bool
     validated_by: str | None
+    promoted_at: datetime | None = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -54,3 +59,25 @@ class ExtractionValidation(BaseModel):
 class ExtractionListResponse(BaseModel):
     extractions: list[ExtractionResponse]
     total: int
+
+
+class ExtractionJobResponse(BaseModel):
+    id: str
+    document_id: str
+    status: ProcessingStatus
+    progress: float
+    attempts: int
+    max_attempts: int
+    cancel_requested: bool
+    error_message: str | None
+    created_at: datetime
+    started_at: datetime | None
+    claimed_at: datetime | None
+    finished_at: datetime | None
+
+    model_config = {"from_attributes": True}
+
+
+class ExtractionJobListResponse(BaseModel):
+    jobs: list[ExtractionJobResponse]
+    total: int
@@ -40,4 +40,6 @@ class FundResponse(BaseModel):
 
 class FundListResponse(BaseModel):
     funds: list[FundResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
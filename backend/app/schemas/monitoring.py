@@ -31,7 +31,34 @@ class MetricResponse(BaseModel):
 
 class MetricListResponse(BaseModel):
     metrics: list[MetricResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
+
+
+class MetricPromotionResult(BaseModel):
+    processed: int
+    inserted: int
+    updated: int
+    skipped: int
+    conflicts: int
+
+
+class MetricRowError(BaseModel):
+    row: int
+    field: str | None = None
+    message: str
+
+
+class MetricBulkResult(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    rejected: int
+    # Rows rejected because a later row in the same batch has the same key
+    duplicates: int = 0
+    errors: list[MetricRowError]
+    errors_truncated: bool = False
 
 
 class MetricTimeSeries(BaseModel):
@@ -39,6 +66,19 @@ class MetricTimeSeries(BaseModel):
     data_points: list[dict]
 
 
+class TimeSeriesColumn(BaseModel):
+    company_id: str
+    metric: str
+    values: list[float | None]
+
+
+class TimeSeriesFrame(BaseModel):
+    freq: str
+    agg: str
+    dates: list[date]
+    series: list[TimeSeriesColumn]
+
+
 class PortfolioSummary(BaseModel):
     total_nav: float = 0.0
     total_invested: float = 0.0
@@ -33,7 +33,9 @@ class ReportResponse(BaseModel):
 
 class ReportListResponse(BaseModel):
     reports: list[ReportResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
 
 
 class AuditLogResponse(BaseModel):
@@ -50,4 +52,6 @@ class AuditLogResponse(BaseModel):
 
 class AuditLogListResponse(BaseModel):
     logs: list[AuditLogResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
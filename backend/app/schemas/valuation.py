@@ -1,6 +1,7 @@
 
+import enum
 from datetime import date, datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from app.models.valuation import ValuationMethod, ValuationStatus
 
@@ -19,6 +20,21 @@ class DCFInputs(BaseModel):
     net_debt: float = 0.0
 
 
+class DCFBatchCase(DCFInputs):
+    company_id: str | None = None
+    label: str | None = None
+
+
+class DCFBatchRequest(BaseModel):
+    cases: list[DCFBatchCase] = Field(..., min_length=1, max_length=10_000)
+    include_projections: bool = False
+
+
+class DCFBatchResponse(BaseModel):
+    results: list[dict]
+    total: int
+
+
 class CompsInputs(BaseModel):
     comparable_companies: list[dict] = Field(default_factory=list)
     metric: str = "ebitda"
@@ -32,6 +48,43 @@ class SensitivityInputs(BaseModel):
     variable_1_range: list[float] = Field(default_factory=list)
     variable_2: str = "terminal_growth_rate"
     variable_2_range: list[float] = Field(default_factory=list)
+    variable_3: str | None = None
+    variable_3_range: list[float] = Field(default_factory=list)
+
+
+class DistributionKind(str, enum.Enum):
+    normal = "normal"
+    uniform = "uniform"
+    triangular = "triangular"
+
+
+class DistributionSpec(BaseModel):
+    kind: DistributionKind = DistributionKind.normal
+    mean: float | None = None
+    std: float | None = Field(default=None, ge=0.0)
+    low: float | None = None
+    high: float | None = None
+    mode: float | None = None
+
+    @model_validator(mode="after")
+    def _check_triangular(self):
+        if self.kind != DistributionKind.triangular or self.low is None or self.high is None:
+            return self
+        if self.low >= self.high:
+            raise ValueError("triangular distribution requires low < high")
+        if self.mode is not None and not self.low <= self.mode <= self.high:
+            raise ValueError("triangular distribution requires low <= mode <= high")
+        return self
+
+
+class MonteCarloInputs(DCFInputs):
+    exit_multiple: float | None = Field(default=None, gt=0.0)
+    distributions: dict[str, DistributionSpec] = Field(default_factory=dict)
+    n_paths: int = Field(default=100_000, ge=1_000, le=5_000_000)
+    chunk_size: int = Field(default=100_000, ge=1_000, le=1_000_000)
+    seed: int | None = None
+    percentiles: list[float] = Field(default_factory=lambda: [5, 10, 25, 50, 75, 90, 95])
+    histogram_bins: int = Field(default=50, ge=5, le=500)
 
 
 class ValuationCreate(BaseModel):
@@ -54,6 +107,7 @@ class ValuationResponse(BaseModel):
     implied_multiple: float | None
     currency: str
     status: ValuationStatus
+    input_hash: str | None = None
     notes: str | None
     created_by: str
     created_at: datetime
@@ -64,7 +118,9 @@ class ValuationResponse(BaseModel):
 
 class ValuationListResponse(BaseModel):
     valuations: list[ValuationResponse]
-    total: int
+    total: int | None = None
+    total_estimated: bool = False
+    next_cursor: str | None = None
 
 
 class OverrideCreate(BaseModel):
@@ -0,0 +1,223 @@
+"""Bulk extraction of pending documents through the provider's batch API.
+
+Claims up to ``llm_batch_max_documents`` pending extraction jobs, parses each
+document, sends every uncached LLM chunk prompt in one JSONL batch, waits for
+it, then stores the merged results exactly as the interactive pipeline does.
+
+Run from the backend directory with ``python -m app.services.batch_extraction``.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai import llm_client
+from app.ai.document_parser import ParsedDocument, parse_document_pages
+from app.ai.llm_extractor import (
+    ChunkRequest,
+    _rule_based_extract,
+    chunk_request_body,
+    combine_with_tables,
+    merge_candidates,
+    needs_llm,
+    parse_completion_content,
+    plan_chunk_requests,
+    response_cache,
+    tag_chunk_page,
+)
+from app.ai.table_extractor import extract_tables
+from app.config import get_settings
+from app.models.document import Document, ProcessingStatus
+from app.models.extraction_job import ExtractionJob
+from app.services import ingestion
+from app.services.extraction_jobs import claim_next_job, complete_document, finish_job, heartbeat, requeue_or_fail
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _PendingDocument:
+    job: ExtractionJob
+    doc: Document
+    parsed: ParsedDocument
+    tables: list[dict]
+    requests: dict[str, ChunkRequest] = field(default_factory=dict)
+    candidates: list[dict] = field(default_factory=list)
+    failed_requests: int = 0
+
+
+async def _prepare(db: AsyncSession, job: ExtractionJob, use_cache: bool) -> _PendingDocument | None:
+    """Parse a claimed document; returns None when it was completed without the LLM."""
+    doc = await ingestion.get_document(db, job.document_id)
+    if doc is None:
+        raise LookupError(f"Document {job.document_id} not found")
+
+    source = await ingestion.find_reusable_document(db, doc)
+    if source is not None:
+        await ingestion.copy_extractions(db, source, doc)
+        return None
+
+    await ingestion.update_document_status(db, doc.id, ProcessingStatus.parsing)
+    parsed = await parse_document_pages(doc.file_path, doc.file_type)
+    await ingestion.update_document_status(
+        db, doc.id, ProcessingStatus.extracting,
+        raw_text=parsed.raw_text, page_count=parsed.page_count,
+    )
+    tables = await extract_tables(doc.file_path, doc.file_type, parsed.pages or [parsed.raw_text])
+
+    if not needs_llm(tables):
+        extracted = combine_with_tables(tables, _rule_based_extract(parsed.raw_text, doc.document_type))
+        await complete_document(db, doc, parsed, extracted)
+        return None
+
+    pending = _PendingDocument(job, doc, parsed, tables)
+    cached = use_cache and settings.llm_cache_enabled
+    for index, request in enumerate(plan_chunk_requests(parsed.raw_text, doc.document_type)):
+        hit = await response_cache.get(request.cache_key) if cached else None
+        if hit is not None:
+            pending.candidates.extend(tag_chunk_page(request.chunk, hit))
+        else:
+            pending.requests[f"{job.id}:{index}"] = request
+    return pending
+
+
+async def _isolated(db: AsyncSession, job: ExtractionJob, step: Awaitable[T]) -> tuple[bool, T | None]:
+    """Await one document's step in a savepoint so a failure rolls back only that document.
+
+    Returns (succeeded, result). A failed job is requeued or failed without
+    touching the other documents loaded in the session.
+    """
+    job_id = job.id
+    try:
+        async with db.begin_nested():
+            return True, await step
+    except Exception as e:
+        logger.exception("Extraction job %s failed", job_id)
+        await db.refresh(job)
+        await requeue_or_fail(db, job, e)
+        return False, None
+
+
+async def _complete(db: AsyncSession, item: _PendingDocument):
+    if item.requests and item.failed_requests == len(item.requests) and not item.candidates:
+        extracted = _rule_based_extract(item.parsed.raw_text, item.doc.document_type)
+    else:
+        extracted = merge_candidates(item.candidates)
+    await complete_document(db, item.doc, item.parsed, combine_with_tables(item.tables, extracted))
+
+
+def _apply_results(pending: dict[str, _PendingDocument], lines: list[dict]) -> list[tuple[str, list[dict]]]:
+    """Route batch output lines to their documents; returns (cache_key, extractions) to cache.
+
+    Requests with no line in either the output or the error file count as failed.
+    """
+    to_cache = []
+    answered: set[str] = set()
+    for line in lines:
+        job_id = line["custom_id"].split(":")[0]
+        doc = pending.get(job_id)
+        request = doc.requests.get(line["custom_id"]) if doc else None
+        if request is None or line["custom_id"] in answered:
+            continue
+        answered.add(line["custom_id"])
+        response = line.get("response") or {}
+        try:
+            if response.get("status_code") != 200:
+                raise ValueError(line.get("error") or f"status {response.get('status_code')}")
+            content = response["body"]["choices"][0]["message"]["content"]
+            extractions = parse_completion_content(content)
+        except Exception as e:
+            logger.warning("Batch request %s failed: %s", line["custom_id"], e)
+            doc.failed_requests += 1
+            continue
+        to_cache.append((request.cache_key, extractions))
+        doc.candidates.extend(tag_chunk_page(request.chunk, [dict(e) for e in extractions]))
+    for doc in pending.values():
+        missing = doc.requests.keys() - answered
+        if missing:
+            logger.warning("Batch returned no result for %d requests of job %s", len(missing), doc.job.id)
+            doc.failed_requests += len(missing)
+    return to_cache
+
+
+async def run_extraction_batch(db: AsyncSession, limit: int | None = None, use_cache: bool = True) -> dict:
+    """Extract up to ``limit`` pending documents with a single provider batch."""
+    limit = limit or settings.llm_batch_max_documents
+    pending: dict[str, _PendingDocument] = {}
+    claimed: set[str] = set()
+    completed = failed = 0
+
+    for _ in range(limit):
+        # Jobs requeued after failing in this run wait for the next one
+        job = await claim_next_job(db, exclude=claimed)
+        if job is None:
+            break
+        claimed.add(job.id)
+        ok, prepared = await _isolated(db, job, _prepare(db, job, use_cache))
+        if not ok:
+            await db.commit()
+            failed += 1
+            continue
+        if prepared is None:
+            finish_job(job, ProcessingStatus.completed)
+            completed += 1
+        else:
+            pending[job.id] = prepared
+        await db.commit()
+
+    requests = [
+        {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": chunk_request_body(r.messages)}
+        for doc in pending.values()
+        for custom_id, r in doc.requests.items()
+    ]
+    batch_id = None
+    batch_error = None
+    if requests:
+        batch = await llm_client.submit_batch(requests)
+        batch_id = batch["id"]
+        logger.info("Submitted extraction batch %s with %d requests", batch_id, len(requests))
+        jobs = [item.job for item in pending.values()]
+        # Keep the claims fresh so workers do not reclaim jobs while the batch runs
+        batch = await llm_client.wait_for_batch(batch_id, on_poll=lambda _: heartbeat(db, jobs))
+        to_cache = _apply_results(pending, await llm_client.batch_results(batch))
+        if use_cache and settings.llm_cache_enabled:
+            for key, extractions in to_cache:
+                await response_cache.put(key, extractions)
+        if batch["status"] != "completed":
+            # Whatever did come back is cached above, so the retried jobs only resend the rest
+            batch_error = RuntimeError(f"Extraction batch {batch_id} ended {batch['status']}")
+            logger.warning("%s; requeueing %d jobs", batch_error, len(pending))
+
+    for item in pending.values():
+        if batch_error is not None:
+            await requeue_or_fail(db, item.job, batch_error)
+            await db.commit()
+            failed += 1
+            continue
+        ok, _ = await _isolated(db, item.job, _complete(db, item))
+        if ok:
+            finish_job(item.job, ProcessingStatus.completed)
+            completed += 1
+        else:
+            failed += 1
+        await db.commit()
+
+    return {"batch_id": batch_id, "requests": len(requests), "completed": completed, "failed": failed}
+
+
+async def _main():
+    from app.database import get_session_factory
+
+    logging.basicConfig(level=logging.INFO)
+    async with get_session_factory()() as db:
+        print(await run_extraction_batch(db))
+    await llm_client.close_llm_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,313 @@
+"""Database-backed extraction job queue and in-process worker pool.
+
+Jobs live in ``extraction_jobs`` and reuse the ``ProcessingStatus`` states.
+Parsing runs in the document parser's process pool; LLM extraction runs on
+the worker coroutines, so concurrency is bounded by ``extraction_workers``.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.document import Document, ProcessingStatus
+from app.models.extraction import Extraction
+from app.models.extraction_job import ExtractionJob
+from app.services import ingestion
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CANCELLED = "Cancelled"
+ABANDONED = "Extraction worker stopped responding"
+RUNNING = (ProcessingStatus.parsing, ProcessingStatus.extracting, ProcessingStatus.validating)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+async def enqueue_extraction(db: AsyncSession, document_id: str) -> ExtractionJob:
+    job = ExtractionJob(
+        document_id=document_id,
+        status=ProcessingStatus.pending,
+        max_attempts=settings.extraction_max_attempts,
+    )
+    db.add(job)
+    await db.flush()
+    await db.refresh(job)
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: str) -> ExtractionJob | None:
+    result = await db.execute(select(ExtractionJob).where(ExtractionJob.id == job_id))
+    return result.scalar_one_or_none()
+
+
+async def list_jobs(db: AsyncSession, document_id: str) -> list[ExtractionJob]:
+    result = await db.execute(
+        select(ExtractionJob)
+        .where(ExtractionJob.document_id == document_id)
+        .order_by(ExtractionJob.created_at.desc())
+    )
+    return list(result.scalars().all())
+
+
+async def cancel_job(db: AsyncSession, job_id: str) -> ExtractionJob | None:
+    """Pending jobs are cancelled at once; running jobs stop at their next stage boundary."""
+    job = await get_job(db, job_id)
+    if not job:
+        return None
+    if job.status in (ProcessingStatus.completed, ProcessingStatus.failed):
+        return job
+    job.cancel_requested = True
+    if job.status == ProcessingStatus.pending:
+        finish_job(job, ProcessingStatus.failed, CANCELLED)
+    await db.flush()
+    await db.refresh(job)
+    return job
+
+
+async def retry_job(db: AsyncSession, job_id: str) -> ExtractionJob | None:
+    job = await get_job(db, job_id)
+    if not job or job.status != ProcessingStatus.failed:
+        return job
+    job.status = ProcessingStatus.pending
+    job.progress = 0.0
+    job.attempts = 0
+    job.cancel_requested = False
+    job.error_message = None
+    job.started_at = None
+    job.claimed_at = None
+    job.finished_at = None
+    await db.flush()
+    await db.refresh(job)
+    return job
+
+
+def finish_job(job: ExtractionJob, status: ProcessingStatus, error_message: str | None = None):
+    job.status = status
+    job.error_message = error_message
+    job.finished_at = datetime.utcnow()
+    if status == ProcessingStatus.completed:
+        job.progress = 1.0
+
+
+async def complete_pending_jobs(db: AsyncSession, document_id: str) -> int:
+    """Close queued jobs for a document that was just extracted outside the queue."""
+    result = await db.execute(
+        update(ExtractionJob)
+        .where(ExtractionJob.document_id == document_id, ExtractionJob.status == ProcessingStatus.pending)
+        .values(status=ProcessingStatus.completed, progress=1.0, finished_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def heartbeat(db: AsyncSession, jobs: list[ExtractionJob]):
+    """Refresh ``claimed_at`` so jobs that are still being worked on are not reclaimed."""
+    now = datetime.utcnow()
+    for job in jobs:
+        job.claimed_at = now
+    await db.commit()
+
+
+async def claim_next_job(db: AsyncSession, exclude: set[str] | None = None) -> ExtractionJob | None:
+    """Atomically move the oldest claimable job to ``parsing``; safe across workers and processes.
+
+    Besides pending jobs, running jobs whose ``claimed_at`` is older than
+    ``extraction_claim_timeout`` are claimed again, since their worker has
+    died. Such a job fails instead once it has used up its attempts. Jobs in
+    ``exclude`` are never claimed.
+    """
+    while True:
+        now = datetime.utcnow()
+        claimable = or_(
+            ExtractionJob.status == ProcessingStatus.pending,
+            and_(
+                ExtractionJob.status.in_(RUNNING),
+                ExtractionJob.claimed_at < now - timedelta(seconds=settings.extraction_claim_timeout),
+            ),
+        )
+        query = select(ExtractionJob.id).where(claimable).order_by(ExtractionJob.created_at).limit(1)
+        if exclude:
+            query = query.where(ExtractionJob.id.not_in(exclude))
+        job_id = (await db.execute(query)).scalar()
+        if job_id is None:
+            return None
+        result = await db.execute(
+            update(ExtractionJob)
+            .where(ExtractionJob.id == job_id, claimable)
+            .values(
+                status=ProcessingStatus.parsing,
+                started_at=now,
+                claimed_at=now,
+                attempts=ExtractionJob.attempts + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount != 1:
+            continue
+        job = await db.get(ExtractionJob, job_id, populate_existing=True)
+        if job.attempts <= job.max_attempts:
+            return job
+        logger.warning("Extraction job %s was abandoned with no attempts left", job.id)
+        finish_job(job, ProcessingStatus.failed, ABANDONED)
+        await ingestion.update_document_status(db, job.document_id, ProcessingStatus.failed, error_message=ABANDONED)
+        await db.commit()
+
+
+async def _checkpoint(db: AsyncSession, job: ExtractionJob, status: ProcessingStatus, progress: float):
+    await db.refresh(job, ["cancel_requested"])
+    if job.cancel_requested:
+        raise JobCancelled()
+    job.status = status
+    job.progress = progress
+    job.claimed_at = datetime.utcnow()
+    await db.commit()
+
+
+async def process_document(db: AsyncSession, doc: Document, job: ExtractionJob | None = None) -> list[Extraction]:
+    """Parse, extract and store fields for ``doc``, reporting stages on ``job`` if given.
+
+    Documents whose content was already processed reuse the earlier results.
+    """
+    from app.ai.document_parser import parse_document_pages
+    from app.ai.llm_extractor import extract_fields
+    from app.ai.table_extractor import extract_tables
+
+    source = await ingestion.find_reusable_document(db, doc)
+    if source is not None:
+        return await ingestion.copy_extractions(db, source, doc)
+
+    await ingestion.update_document_status(db, doc.id, ProcessingStatus.parsing)
+
+    async def on_progress(done: int, total: int):
+        job.progress = 0.4 * done / total
+        job.claimed_at = datetime.utcnow()
+        await db.commit()
+
+    parsed = await parse_document_pages(doc.file_path, doc.file_type, on_progress if job else None)
+
+    if job:
+        await _checkpoint(db, job, ProcessingStatus.extracting, 0.4)
+    await ingestion.update_document_status(
+        db, doc.id, ProcessingStatus.extracting,
+        raw_text=parsed.raw_text, page_count=parsed.page_count,
+    )
+
+    tables = await extract_tables(doc.file_path, doc.file_type, parsed.pages or [parsed.raw_text])
+    extracted = await extract_fields(parsed.raw_text, doc.document_type, tables)
+
+    if job:
+        await _checkpoint(db, job, ProcessingStatus.validating, 0.8)
+    return await complete_document(db, doc, parsed, extracted)
+
+
+async def complete_document(db: AsyncSession, doc: Document, parsed, extracted: list[dict]) -> list[Extraction]:
+    """Locate pages for ``extracted``, store it and mark ``doc`` completed."""
+    for e in extracted:
+        if e.get("page_number") is None:
+            e["page_number"] = (
+                parsed.page_number(e.get("context_snippet"))
+                or parsed.page_number(str(e.get("field_value", "")))
+            )
+    extractions = await ingestion.save_extractions(db, doc.id, extracted)
+    await ingestion.update_document_status(
+        db, doc.id, ProcessingStatus.completed,
+        extracted_data={e["field_name"]: e["field_value"] for e in extracted},
+    )
+    return extractions
+
+
+async def extracted_since(db: AsyncSession, doc: Document, since: datetime) -> bool:
+    """Whether ``doc`` is completed with extractions stored at or after ``since``."""
+    if doc.processing_status != ProcessingStatus.completed:
+        return False
+    return bool(await db.scalar(select(exists().where(
+        Extraction.document_id == doc.id, Extraction.created_at >= since,
+    ))))
+
+
+async def run_job(db: AsyncSession, job: ExtractionJob):
+    """Process the job's document unless it was already extracted after the job was queued."""
+    doc = await ingestion.get_document(db, job.document_id)
+    try:
+        if doc is None:
+            raise LookupError(f"Document {job.document_id} not found")
+        if not await extracted_since(db, doc, job.created_at):
+            await process_document(db, doc, job)
+        finish_job(job, ProcessingStatus.completed)
+    except JobCancelled:
+        await db.rollback()
+        await db.refresh(job)
+        finish_job(job, ProcessingStatus.failed, CANCELLED)
+        await ingestion.update_document_status(
+            db, job.document_id, ProcessingStatus.failed, error_message=CANCELLED,
+        )
+    except Exception as e:
+        await fail_job(db, job, e)
+    await db.commit()
+
+
+async def fail_job(db: AsyncSession, job: ExtractionJob, error: Exception):
+    """Roll back the failed attempt and requeue ``job``, or fail it once attempts run out."""
+    logger.exception("Extraction job %s failed", job.id, exc_info=error)
+    await db.rollback()
+    await db.refresh(job)
+    await requeue_or_fail(db, job, error)
+
+
+async def requeue_or_fail(db: AsyncSession, job: ExtractionJob, error: Exception):
+    """Record a failed attempt whose changes were already rolled back."""
+    if job.attempts < job.max_attempts:
+        job.status = ProcessingStatus.pending
+        job.error_message = str(error)
+    else:
+        finish_job(job, ProcessingStatus.failed, str(error))
+        await ingestion.update_document_status(
+            db, job.document_id, ProcessingStatus.failed, error_message=str(error),
+        )
+
+
+class ExtractionWorker:
+    """Pool of coroutines that claim and run pending extraction jobs."""
+
+    def __init__(self):
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    async def start(self, concurrency: int):
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(concurrency)]
+
+    async def stop(self):
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        from app.database import get_session_factory
+
+        session_factory = get_session_factory()
+        while not self._stopping.is_set():
+            try:
+                async with session_factory() as db:
+                    job = await claim_next_job(db)
+                    if job is not None:
+                        await run_job(db, job)
+                        continue
+            except Exception:
+                logger.exception("Extraction worker error")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), settings.extraction_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+extraction_worker = ExtractionWorker()
@@ -1,40 +1,180 @@
+import asyncio
+import hashlib
 import os
 import uuid
 from pathlib import Path
+from typing import AsyncIterator
 
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.database import bulk_insert
 from app.models.document import Document, ProcessingStatus, DocumentType
 from app.models.extraction import Extraction
+from app.services.pagination import Page, PageRequest, paginate
 
 settings = get_settings()
 
 
-async def save_upload(
-    db: AsyncSession,
-    filename: str,
-    content: bytes,
-    company_id: str | None = None,
-    document_type: DocumentType | None = None,
-) -> Document:
+class UploadTooLarge(ValueError):
+    pass
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+class MultipartUpload:
+    """A ``multipart/form-data`` body parsed as it arrives from the client.
+
+    ``chunks()`` yields the bytes of the first file part in ``file_field`` as
+    they are received, so nothing is spooled ahead of ``write_stream``. Other
+    text fields are collected into ``fields``; like ``filename`` they are
+    complete once ``chunks()`` is exhausted.
+    """
+
+    max_field_bytes = 64 * 1024
+
+    def __init__(self, content_type: str | None, body: AsyncIterator[bytes], file_field: str = "file"):
+        from multipart.multipart import MultipartParser, parse_options_header
+
+        kind, params = parse_options_header(content_type or "")
+        if kind != b"multipart/form-data" or not params.get(b"boundary"):
+            raise InvalidUpload("Expected a multipart/form-data body")
+        self.filename: str | None = None
+        self.fields: dict[str, str] = {}
+        self._body = body
+        self._file_field = file_field
+        self._parse_options_header = parse_options_header
+        self._received: list[bytes] = []
+        self._reset_part()
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._reset_part,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _reset_part(self):
+        self._header_name = self._header_value = self._disposition = b""
+        self._part_name: str | None = None
+        self._part_kind = "field"
+        self._part_data = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = self._parse_options_header(self._disposition)
+        self._part_name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            # Only the first file in the expected field is kept; other files are discarded
+            wanted = self._part_name == self._file_field and self.filename is None
+            self._part_kind = "file" if wanted else "skip"
+            if wanted:
+                self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._part_kind == "file":
+            self._received.append(data[start:end])
+        elif self._part_kind == "field":
+            self._part_data += data[start:end]
+            if len(self._part_data) > self.max_field_bytes:
+                raise InvalidUpload(f"Form field {self._part_name!r} is too large")
+
+    def _on_part_end(self):
+        if self._part_kind == "field" and self._part_name:
+            self.fields[self._part_name] = self._part_data.decode("utf-8", "replace")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        async for data in self._body:
+            self._parser.write(data)
+            received, self._received = self._received, []
+            for chunk in received:
+                yield chunk
+        self._parser.finalize()
+        if self.filename is None:
+            raise InvalidUpload(f"Missing file field {self._file_field!r}")
+
+
+async def _single_chunk(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+async def write_stream(chunks: AsyncIterator[bytes], file_path: Path, max_bytes: int) -> tuple[int, str]:
+    """Stream ``chunks`` to ``file_path`` and return (size, sha256 hex).
+
+    Writes run on a worker thread so the event loop never blocks on disk, and
+    only one chunk is held at a time. Exceeding ``max_bytes`` removes the
+    partial file and raises ``UploadTooLarge``.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, file_path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File exceeds {max_bytes // (1024 * 1024)}MB limit")
+            digest.update(chunk)
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        file_path.unlink(missing_ok=True)
+        raise
+    await asyncio.to_thread(f.close)
+    return size, digest.hexdigest()
+
+
+async def _write_part(content: bytes | AsyncIterator[bytes], max_bytes: int | None) -> tuple[Path, int, str]:
     upload_dir = Path(settings.upload_dir)
     upload_dir.mkdir(parents=True, exist_ok=True)
+    part_path = upload_dir / f".{uuid.uuid4()}.part"
 
-    file_ext = Path(filename).suffix.lower()
-    stored_name = f"{uuid.uuid4()}{file_ext}"
-    file_path = upload_dir / stored_name
+    if isinstance(content, bytes):
+        content = _single_chunk(content)
+    if max_bytes is None:
+        max_bytes = settings.max_upload_size_mb * 1024 * 1024
+    file_size, content_hash = await write_stream(content, part_path, max_bytes)
+    return part_path, file_size, content_hash
 
-    with open(file_path, "wb") as f:
-        f.write(content)
+
+async def _create_document(
+    db: AsyncSession,
+    filename: str,
+    part_path: Path,
+    file_size: int,
+    content_hash: str,
+    company_id: str | None,
+    document_type: DocumentType | None,
+) -> Document:
+    # Content-addressed: identical uploads share one file on disk
+    file_ext = Path(filename).suffix.lower()
+    file_path = part_path.parent / f"{content_hash}{file_ext}"
+    if file_path.exists():
+        part_path.unlink()
+    else:
+        os.replace(part_path, file_path)
 
     doc = Document(
         company_id=company_id,
         filename=filename,
         file_type=file_ext.lstrip("."),
         file_path=str(file_path),
-        file_size=len(content),
+        file_size=file_size,
+        content_hash=content_hash,
         document_type=document_type,
         processing_status=ProcessingStatus.pending,
     )
@@ -44,31 +184,116 @@ async def save_upload(
     return doc
 
 
+async def save_upload(
+    db: AsyncSession,
+    filename: str,
+    content: bytes | AsyncIterator[bytes],
+    company_id: str | None = None,
+    document_type: DocumentType | None = None,
+    max_bytes: int | None = None,
+) -> Document:
+    part_path, file_size, content_hash = await _write_part(content, max_bytes)
+    return await _create_document(db, filename, part_path, file_size, content_hash, company_id, document_type)
+
+
+async def save_multipart_upload(db: AsyncSession, upload: MultipartUpload, max_bytes: int | None = None) -> Document:
+    """Stream the upload's file to disk, then create its document from the form fields.
+
+    The size limit is enforced while the body is still arriving, so an
+    oversized request is rejected without reading the rest of it.
+    """
+    part_path, file_size, content_hash = await _write_part(upload.chunks(), max_bytes)
+    try:
+        document_type = upload.fields.get("document_type") or None
+        document_type = DocumentType(document_type) if document_type else None
+    except ValueError:
+        part_path.unlink(missing_ok=True)
+        raise InvalidUpload(f"Unknown document_type {upload.fields['document_type']!r}")
+    company_id = upload.fields.get("company_id") or None
+    return await _create_document(
+        db, upload.filename, part_path, file_size, content_hash, company_id, document_type,
+    )
+
+
 async def get_document(db: AsyncSession, doc_id: str) -> Document | None:
     result = await db.execute(select(Document).where(Document.id == doc_id))
     return result.scalar_one_or_none()
 
 
+async def find_reusable_document(db: AsyncSession, doc: Document) -> Document | None:
+    """Most recent completed document with the same content and document type."""
+    if not doc.content_hash:
+        return None
+    if doc.document_type is None:
+        same_type = Document.document_type.is_(None)
+    else:
+        same_type = Document.document_type == doc.document_type
+    result = await db.execute(
+        select(Document)
+        .where(
+            Document.content_hash == doc.content_hash,
+            Document.id != doc.id,
+            Document.processing_status == ProcessingStatus.completed,
+            same_type,
+        )
+        .order_by(Document.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def copy_extractions(db: AsyncSession, source: Document, target: Document) -> list[Extraction]:
+    """Give ``target`` the parse and extraction results of ``source``.
+
+    Copies are unvalidated; review decisions stay with the original document.
+    """
+    extractions = await get_extractions(db, source.id)
+    await update_document_status(
+        db, target.id, ProcessingStatus.completed,
+        raw_text=source.raw_text,
+        page_count=source.page_count,
+        extracted_data=source.extracted_data,
+    )
+    return await save_extractions(db, target.id, [
+        {
+            "field_name": e.field_name,
+            "field_value": e.field_value,
+            "field_type": e.field_type,
+            "confidence_score": e.confidence_score,
+            "extraction_method": e.extraction_method,
+            "page_number": e.page_number,
+            "period": e.period,
+            "context_snippet": e.context_snippet,
+        }
+        for e in extractions
+    ])
+
+
 async def list_documents(
     db: AsyncSession,
     company_id: str | None = None,
     status: ProcessingStatus | None = None,
-    skip: int = 0,
-    limit: int = 50,
-) -> tuple[list[Document], int]:
+    page: PageRequest | None = None,
+) -> Page:
     query = select(Document)
-    count_query = select(func.count(Document.id))
 
     if company_id:
         query = query.where(Document.company_id == company_id)
-        count_query = count_query.where(Document.company_id == company_id)
     if status:
         query = query.where(Document.processing_status == status)
-        count_query = count_query.where(Document.processing_status == status)
 
-    total = (await db.execute(count_query)).scalar()
-    result = await db.execute(query.order_by(Document.upload_date.desc()).offset(skip).limit(limit))
-    return list(result.scalars().all()), total
+    return await paginate(db, query, Document.created_at, Document.id, page or PageRequest())
+
+
+async def get_extraction_counts(db: AsyncSession, doc_ids: list[str]) -> dict[str, int]:
+    if not doc_ids:
+        return {}
+    result = await db.execute(
+        select(Extraction.document_id, func.count(Extraction.id))
+        .where(Extraction.document_id.in_(doc_ids))
+        .group_by(Extraction.document_id)
+    )
+    return dict(result.all())
 
 
 async def update_document_status(
@@ -102,24 +327,20 @@ async def save_extractions(
     document_id: str,
     extractions: list[dict],
 ) -> list[Extraction]:
-    records = []
-    for ext in extractions:
-        record = Extraction(
-            document_id=document_id,
-            field_name=ext["field_name"],
-            field_value=str(ext["field_value"]),
-            field_type=ext.get("field_type", "string"),
-            confidence_score=ext.get("confidence_score", 0.0),
-            extraction_method=ext.get("extraction_method", "llm"),
-            page_number=ext.get("page_number"),
-            context_snippet=ext.get("context_snippet"),
-        )
-        db.add(record)
-        records.append(record)
-    await db.flush()
-    for r in records:
-        await db.refresh(r)
-    return records
+    return await bulk_insert(db, Extraction, [
+        {
+            "document_id": document_id,
+            "field_name": ext["field_name"],
+            "field_value": str(ext["field_value"]),
+            "field_type": ext.get("field_type", "string"),
+            "confidence_score": ext.get("confidence_score", 0.0),
+            "extraction_method": ext.get("extraction_method", "llm"),
+            "page_number": ext.get("page_number"),
+            "period": ext.get("period"),
+            "context_snippet": ext.get("context_snippet"),
+        }
+        for ext in extractions
+    ])
 
 
 async def get_extractions(
@@ -149,6 +370,7 @@ async def validate_extraction(
     extraction.validated_by = validated_by
     if corrected_value is not None:
         extraction.field_value = corrected_value
+    extraction.promoted_at = None
     await db.flush()
     await db.refresh(extraction)
     return extraction
@@ -0,0 +1,281 @@
+"""Bulk import of financial metrics from CSV, JSONL or Parquet uploads.
+
+The request body is spooled to disk, then read back in ``metric_import_batch_rows``
+row batches that are validated column-wise with pandas. Valid rows are loaded
+into a temporary staging table (``COPY`` on Postgres, ``executemany``
+elsewhere) and merged into ``financial_metrics`` with one
+``INSERT ... SELECT ... ON CONFLICT DO UPDATE`` on the unique
+(company_id, metric_type, period_date) key. Invalid rows, and rows whose key
+repeats later in the same batch, are reported by their 1-based row number.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy import Column, Date, DateTime, Float, MetaData, String, Table, and_, cast, exists, func, insert, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable, DropTable
+
+from app.config import get_settings
+from app.database import upsert_insert
+from app.models.company import Company
+from app.models.financial_metric import METRIC_KEY, FinancialMetric, MetricSource, MetricType
+from app.services.ingestion import write_stream
+
+settings = get_settings()
+
+FORMATS = ("csv", "jsonl", "parquet")
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-jsonlines": "jsonl",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+REQUIRED_COLUMNS = ("company_id", "period_date", "metric_type", "value")
+_KEY_COLUMNS = ("company_id", "metric_type", "period_date")
+
+_METRIC_TYPES = [m.value for m in MetricType]
+_SOURCES = [s.value for s in MetricSource]
+
+_staging = Table(
+    "metric_import_staging",
+    MetaData(),
+    Column("id", String(36)),
+    Column("company_id", String(36)),
+    Column("metric_type", String(32)),
+    Column("period_date", Date),
+    Column("value", Float),
+    Column("currency", String(3)),
+    Column("source", String(20)),
+    Column("notes", String(500)),
+    Column("created_at", DateTime),
+    prefixes=["TEMPORARY"],
+)
+
+
+class MetricImportError(ValueError):
+    """The upload as a whole cannot be imported (format, columns, size)."""
+
+
+def detect_format(content_type: str | None, requested: str | None = None) -> str:
+    if requested:
+        if requested not in FORMATS:
+            raise MetricImportError(f"Unsupported format {requested!r}; expected one of {', '.join(FORMATS)}")
+        return requested
+    fmt = CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise MetricImportError("Unknown content type; pass ?format=csv, jsonl or parquet")
+    return fmt
+
+
+def _iter_frames(path: Path, fmt: str, batch_rows: int) -> Iterator:
+    import pandas as pd
+
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=batch_rows, dtype=str, keep_default_na=False)
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=batch_rows, dtype=False)
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise MetricImportError("Parquet import requires pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            yield batch.to_pandas()
+
+
+def validate_frame(frame, first_row: int):
+    """Vectorised checks over one batch; returns (valid rows, errors, duplicates).
+
+    Each row reports only its first failing column. Of several valid rows
+    with the same (company_id, metric_type, period_date), the last wins; the
+    others are rejected with an error naming the winning row and counted in
+    ``duplicates``.
+    """
+    import numpy as np
+    import pandas as pd
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise MetricImportError(f"Missing required columns: {', '.join(missing)}")
+    frame = frame.reset_index(drop=True)
+    bad = pd.Series(False, index=frame.index)
+    errors: list[dict] = []
+
+    def text(column: str, default: str = "") -> "pd.Series":
+        if column not in frame.columns:
+            return pd.Series(default, index=frame.index)
+        values = frame[column].astype("string").fillna("").str.strip()
+        return values.mask(values == "", default)
+
+    def reject(mask, column: str, message: str):
+        nonlocal bad
+        mask = mask & ~bad
+        errors.extend({"row": first_row + int(i), "field": column, "message": message} for i in mask[mask].index)
+        bad = bad | mask
+
+    out = pd.DataFrame(index=frame.index)
+    out["company_id"] = text("company_id")
+    reject(out["company_id"] == "", "company_id", "company_id is required")
+
+    out["metric_type"] = text("metric_type").str.lower()
+    reject(~out["metric_type"].isin(_METRIC_TYPES), "metric_type", "unknown metric_type")
+
+    period = pd.to_datetime(frame["period_date"].astype("string"), errors="coerce", format="ISO8601")
+    reject(period.isna(), "period_date", "period_date must be an ISO date")
+    out["period_date"] = period.dt.date
+
+    value = pd.to_numeric(frame["value"], errors="coerce")
+    reject(~np.isfinite(value.astype(float)), "value", "value must be a finite number")
+    out["value"] = value.astype(float)
+
+    out["currency"] = text("currency", "USD").str.upper()
+    reject(~out["currency"].str.fullmatch(r"[A-Z]{3}"), "currency", "currency must be a 3-letter code")
+
+    out["source"] = text("source", MetricSource.manual.value).str.lower()
+    reject(~out["source"].isin(_SOURCES), "source", "unknown source")
+
+    notes = text("notes")
+    reject(notes.str.len() > 500, "notes", "notes must be at most 500 characters")
+    out["notes"] = notes.astype(object).where(notes != "", None)
+
+    out["row"] = out.index + first_row
+    valid = out[~bad]
+    superseded = valid.duplicated(list(_KEY_COLUMNS), keep="last")
+    if superseded.any():
+        winners = valid.groupby(list(_KEY_COLUMNS), sort=False)["row"].transform("last")
+        errors.extend(
+            {"row": int(row), "field": None, "message": f"duplicate key; row {int(winner)} is imported instead"}
+            for row, winner in zip(valid.loc[superseded, "row"], winners[superseded])
+        )
+    return valid[~superseded], sorted(errors, key=lambda e: e["row"]), int(superseded.sum())
+
+
+async def _known_companies(db: AsyncSession, ids: set[str], cache: dict[str, bool]) -> set[str]:
+    unknown = [i for i in ids if i not in cache]
+    if unknown:
+        found = set((await db.execute(select(Company.id).where(Company.id.in_(unknown)))).scalars())
+        cache.update({i: i in found for i in unknown})
+    return {i for i in ids if cache[i]}
+
+
+async def _load_staging(db: AsyncSession, valid) -> None:
+    """Bulk-load validated rows into the staging table with the driver's fastest path."""
+    conn = await db.connection()
+    postgres = conn.dialect.name == "postgresql"
+    now = datetime.utcnow()
+    periods = valid["period_date"].tolist()
+    records = list(zip(
+        [str(uuid.uuid4()) for _ in range(len(valid))],
+        valid["company_id"].tolist(),
+        valid["metric_type"].tolist(),
+        periods if postgres else [p.isoformat() for p in periods],
+        valid["value"].tolist(),
+        valid["currency"].tolist(),
+        valid["source"].tolist(),
+        valid["notes"].tolist(),
+        [now] * len(valid) if postgres else [now.isoformat(sep=" ")] * len(valid),
+    ))
+    if postgres:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _staging.name, records=records, columns=[c.name for c in _staging.columns],
+        )
+    else:
+        # Plain DB-API executemany over tuples skips per-row parameter processing
+        statement = str(insert(_staging).compile(dialect=conn.dialect))
+        await conn.exec_driver_sql(statement, records)
+
+
+async def _merge_staging(db: AsyncSession) -> tuple[int, int]:
+    metrics = FinancialMetric.__table__
+    staged_type = cast(_staging.c.metric_type, metrics.c.metric_type.type)
+    staged_source = cast(_staging.c.source, metrics.c.source.type)
+    match = and_(
+        metrics.c.company_id == _staging.c.company_id,
+        metrics.c.metric_type == staged_type,
+        metrics.c.period_date == _staging.c.period_date,
+    )
+    staged, updated = (await db.execute(
+        select(func.count(), func.count().filter(exists().where(match))).select_from(_staging)
+    )).one()
+
+    stmt = await upsert_insert(db, FinancialMetric)
+    await db.execute(
+        stmt.from_select(
+            ["id", "company_id", "metric_type", "period_date", "value", "currency", "source", "notes", "created_at"],
+            select(
+                _staging.c.id, _staging.c.company_id, staged_type, _staging.c.period_date, _staging.c.value,
+                _staging.c.currency, staged_source, _staging.c.notes, _staging.c.created_at,
+            # SQLite cannot tell ON CONFLICT from a join constraint after a bare SELECT ... FROM
+            ).where(true()),
+        ).on_conflict_do_update(
+            index_elements=list(METRIC_KEY),
+            set_={c: getattr(stmt.excluded, c) for c in ("value", "currency", "source", "notes")},
+        )
+    )
+    return staged - updated, updated
+
+
+async def import_metrics(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str) -> dict:
+    """Stream an upload to disk and upsert its rows in batches; returns counts and row errors."""
+    max_errors = settings.metric_import_max_errors
+    fd, name = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    path = Path(name)
+    summary = {
+        "rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "duplicates": 0,
+        "errors": [], "errors_truncated": False,
+    }
+    companies: dict[str, bool] = {}
+    try:
+        await write_stream(chunks, path, settings.metric_import_max_mb * 1024 * 1024)
+        conn = await db.connection()
+        await conn.execute(DropTable(_staging, if_exists=True))
+        await conn.execute(CreateTable(_staging))
+
+        frames = _iter_frames(path, fmt, settings.metric_import_batch_rows)
+        while True:
+            try:
+                frame = await asyncio.to_thread(next, frames, None)
+            except MetricImportError:
+                raise
+            except Exception as e:
+                raise MetricImportError(f"Could not read {fmt} data: {e}")
+            if frame is None:
+                break
+            valid, errors, duplicates = await asyncio.to_thread(validate_frame, frame, summary["rows"] + 1)
+            summary["rows"] += len(frame)
+            summary["duplicates"] += duplicates
+
+            known = await _known_companies(db, set(valid["company_id"]), companies)
+            unknown = ~valid["company_id"].isin(known)
+            errors.extend(
+                {"row": int(r), "field": "company_id", "message": "unknown company"}
+                for r in valid.loc[unknown, "row"]
+            )
+            valid = valid[~unknown]
+            summary["rejected"] += len(errors)
+            room = max_errors - len(summary["errors"])
+            summary["errors"].extend(sorted(errors, key=lambda e: e["row"])[:room])
+            summary["errors_truncated"] |= len(errors) > room
+
+            if valid.empty:
+                continue
+            await conn.execute(_staging.delete())
+            await _load_staging(db, valid)
+            inserted, updated = await _merge_staging(db)
+            summary["inserted"] += inserted
+            summary["updated"] += updated
+
+        await conn.execute(DropTable(_staging, if_exists=True))
+    finally:
+        path.unlink(missing_ok=True)
+    return summary
@@ -0,0 +1,180 @@
+"""Promotion of validated extractions into the FinancialMetric time series.
+
+Each run picks up validated extractions that have not been promoted yet,
+maps their field to a ``MetricType``, resolves the reporting period and
+upserts one metric per (company, metric type, period date) with
+``source=extracted`` using ``INSERT ... ON CONFLICT DO UPDATE`` on that
+unique key. Metrics from any other source are never overwritten.
+"""
+from datetime import date, datetime
+from itertools import islice
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.structured_output import coerce_numeric
+from app.ai.table_extractor import parse_period, period_end
+from app.database import upsert_insert
+from app.models.document import Document
+from app.models.extraction import Extraction
+from app.models.financial_metric import METRIC_KEY, FinancialMetric, MetricSource, MetricType
+
+FIELD_METRICS = {
+    "revenue": MetricType.revenue,
+    "ebitda": MetricType.ebitda,
+    "net_income": MetricType.net_income,
+    "gross_profit": MetricType.gross_profit,
+    "free_cash_flow": MetricType.free_cash_flow,
+    "total_debt": MetricType.total_debt,
+    "cash_and_equivalents": MetricType.cash,
+}
+# Document-level fields that give the period and currency of its other values
+PERIOD_FIELDS = ("period", "reporting_date", "date")
+CURRENCY_FIELD = "currency"
+
+_KEY_BATCH = 500
+
+
+def resolve_period_date(label: str | None) -> date | None:
+    """Period end for a period label or date string, or None if it is not one."""
+    if not label:
+        return None
+    try:
+        return date.fromisoformat(label.strip())
+    except ValueError:
+        pass
+    canonical = parse_period(label)
+    return period_end(canonical) if canonical else None
+
+
+def _batched(items: list, size: int):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def _document_context(db: AsyncSession, document_ids: set[str]) -> dict[str, dict[str, str]]:
+    """Period and currency values extracted from each document, validated ones first."""
+    context: dict[str, dict[str, str]] = {}
+    for batch in _batched(sorted(document_ids), _KEY_BATCH):
+        result = await db.execute(
+            select(Extraction.document_id, Extraction.field_name, Extraction.field_value)
+            .where(
+                Extraction.document_id.in_(batch),
+                Extraction.field_name.in_((*PERIOD_FIELDS, CURRENCY_FIELD)),
+            )
+            .order_by(Extraction.validated.desc(), Extraction.confidence_score.desc())
+        )
+        for document_id, field_name, value in result.all():
+            context.setdefault(document_id, {}).setdefault(field_name, value)
+    return context
+
+
+def _currency(context: dict[str, str]) -> str:
+    code = context.get(CURRENCY_FIELD, "").strip().upper()
+    return code if len(code) == 3 and code.isalpha() else "USD"
+
+
+async def promote_validated_extractions(
+    db: AsyncSession,
+    company_id: str | None = None,
+    limit: int | None = None,
+) -> dict:
+    """Upsert metrics for newly validated extractions and mark them promoted.
+
+    Extractions that cannot become a metric (no mapped field, non-numeric
+    value, unknown period, or a non-extracted metric already recorded) are
+    marked too, so each validation is looked at once. Re-validating an
+    extraction clears the mark.
+    """
+    query = (
+        select(Extraction, Document.company_id)
+        .join(Document, Extraction.document_id == Document.id)
+        .where(
+            Extraction.validated.is_(True),
+            Extraction.promoted_at.is_(None),
+            Document.company_id.is_not(None),
+        )
+        .order_by(Extraction.created_at, Extraction.id)
+    )
+    if company_id:
+        query = query.where(Document.company_id == company_id)
+    if limit:
+        query = query.limit(limit)
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return {"processed": 0, "inserted": 0, "updated": 0, "skipped": 0, "conflicts": 0}
+
+    context = await _document_context(db, {e.document_id for e, _ in rows})
+
+    # Rows are in creation order, so the most recently created extraction of a key wins
+    candidates: dict[tuple, dict] = {}
+    skipped = 0
+    for extraction, company in rows:
+        doc_context = context.get(extraction.document_id, {})
+        metric_type = FIELD_METRICS.get(extraction.field_name)
+        value = coerce_numeric(extraction.field_value)
+        period_date = resolve_period_date(
+            extraction.period or next((doc_context[f] for f in PERIOD_FIELDS if f in doc_context), None)
+        )
+        if metric_type is None or value is None or period_date is None:
+            skipped += 1
+            continue
+        candidates[(company, metric_type, period_date)] = {
+            "company_id": company,
+            "metric_type": metric_type,
+            "period_date": period_date,
+            "value": value,
+            "currency": _currency(doc_context),
+            "source": MetricSource.extracted,
+            "notes": f"Promoted from extraction {extraction.id}",
+        }
+
+    # Sources of the metrics already recorded; only used to classify the upserts below
+    existing: dict[tuple, MetricSource] = {}
+    for keys in _batched(list(candidates), _KEY_BATCH):
+        result = await db.execute(select(*METRIC_KEY, FinancialMetric.source).where(tuple_(*METRIC_KEY).in_(keys)))
+        for company, metric_type, period_date, source in result.all():
+            existing[(company, MetricType(metric_type), period_date)] = MetricSource(source)
+
+    writes, inserted, updated, conflicts = [], 0, 0, 0
+    for key, values in candidates.items():
+        source = existing.get(key)
+        if source is None:
+            inserted += 1
+        elif source == MetricSource.extracted:
+            updated += 1
+        else:
+            conflicts += 1
+            continue
+        writes.append(values)
+
+    if writes:
+        stmt = await upsert_insert(db, FinancialMetric)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(METRIC_KEY),
+                set_={c: getattr(stmt.excluded, c) for c in ("value", "currency", "source", "notes")},
+                # Also guards against metrics from other sources written since the lookup above
+                where=FinancialMetric.source == MetricSource.extracted,
+            ),
+            writes,
+        )
+
+    now = datetime.utcnow()
+    for ids in _batched([e.id for e, _ in rows], _KEY_BATCH):
+        await db.execute(
+            update(Extraction)
+            .where(Extraction.id.in_(ids))
+            .values(promoted_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    await db.flush()
+
+    return {
+        "processed": len(rows),
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+        "conflicts": conflicts,
+    }
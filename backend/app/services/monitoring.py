@@ -2,48 +2,66 @@ import uuid
 from datetime import date
 
 from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database import bulk_insert
 from app.models.financial_metric import FinancialMetric, MetricType
 from app.models.scenario import Scenario
 from app.schemas.monitoring import MetricCreate, ScenarioCreate
+from app.services.pagination import Page, PageRequest, paginate
+
+
+class DuplicateMetric(ValueError):
+    """A metric already exists for the same company, metric type and period."""
+
+
+class InvalidMetric(ValueError):
+    """A metric violates another constraint, such as an unknown company."""
+
+
+def _is_unique_violation(error: IntegrityError) -> bool:
+    # SQLSTATE 23505 on Postgres; sqlite3 reports the extended result code by name
+    return (
+        getattr(error.orig, "sqlstate", None) == "23505"
+        or getattr(error.orig, "sqlite_errorname", None) == "SQLITE_CONSTRAINT_UNIQUE"
+    )
 
 
 async def create_metric(db: AsyncSession, data: MetricCreate) -> FinancialMetric:
-    metric = FinancialMetric(**data.model_dump())
-    db.add(metric)
-    await db.flush()
-    await db.refresh(metric)
+    [metric] = await create_metrics(db, [data])
     return metric
 
 
+async def create_metrics(db: AsyncSession, items: list[MetricCreate]) -> list[FinancialMetric]:
+    """Insert new metrics; a key that is already recorded rejects the whole request."""
+    try:
+        async with db.begin_nested():
+            return await bulk_insert(db, FinancialMetric, [item.model_dump() for item in items])
+    except IntegrityError as e:
+        if _is_unique_violation(e):
+            raise DuplicateMetric(str(e.orig))
+        raise InvalidMetric(str(e.orig))
+
+
 async def list_metrics(
     db: AsyncSession,
     company_id: str,
     metric_type: MetricType | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    skip: int = 0,
-    limit: int = 100,
-) -> tuple[list[FinancialMetric], int]:
+    page: PageRequest | None = None,
+) -> Page:
     query = select(FinancialMetric).where(FinancialMetric.company_id == company_id)
-    count_query = select(func.count(FinancialMetric.id)).where(FinancialMetric.company_id == company_id)
 
     if metric_type:
         query = query.where(FinancialMetric.metric_type == metric_type)
-        count_query = count_query.where(FinancialMetric.metric_type == metric_type)
     if start_date:
         query = query.where(FinancialMetric.period_date >= start_date)
-        count_query = count_query.where(FinancialMetric.period_date >= start_date)
     if end_date:
         query = query.where(FinancialMetric.period_date <= end_date)
-        count_query = count_query.where(FinancialMetric.period_date <= end_date)
 
-    total = (await db.execute(count_query)).scalar()
-    result = await db.execute(
-        query.order_by(FinancialMetric.period_date.desc()).offset(skip).limit(limit)
-    )
-    return list(result.scalars().all()), total
+    return await paginate(db, query, FinancialMetric.period_date, FinancialMetric.id, page or PageRequest(limit=100))
 
 
 async def get_time_series(
@@ -0,0 +1,90 @@
+import base64
+import enum
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Select, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CountMode(str, enum.Enum):
+    exact = "exact"
+    estimate = "estimate"
+    none = "none"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class PageRequest:
+    cursor: str | None = None
+    limit: int = 50
+    skip: int = 0
+    count: CountMode | None = None
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    next_cursor: str | None = None
+    total: int | None = None
+    total_estimated: bool = False
+
+
+def encode_cursor(sort_value, row_id: str) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_col) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if isinstance(sort_col.type, DateTime):
+            return datetime.fromisoformat(sort_value), str(row_id)
+        if isinstance(sort_col.type, Date):
+            return date.fromisoformat(sort_value), str(row_id)
+        return sort_value, str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+async def _count(db: AsyncSession, query: Select, mode: CountMode) -> tuple[int | None, bool]:
+    if mode == CountMode.none:
+        return None, False
+    unordered = query.order_by(None)
+    if mode == CountMode.estimate and db.bind.dialect.name == "postgresql":
+        # The planner's row estimate avoids a full scan on very large tables
+        compiled = unordered.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"]), True
+    total = (await db.execute(select(func.count()).select_from(unordered.subquery()))).scalar()
+    return total, False
+
+
+async def paginate(db: AsyncSession, query: Select, sort_col, id_col, page: PageRequest) -> Page:
+    """Newest-first keyset pagination over ``(sort_col, id_col)``.
+
+    Without a cursor the first page is returned (``skip`` is still honoured for
+    older clients). Totals default to an exact count on the first page only.
+    """
+    count_mode = page.count or (CountMode.exact if page.cursor is None else CountMode.none)
+    total, estimated = await _count(db, query, count_mode)
+
+    if page.cursor:
+        query = query.where(tuple_(sort_col, id_col) < tuple_(*decode_cursor(page.cursor, sort_col)))
+    elif page.skip:
+        query = query.offset(page.skip)
+
+    result = await db.execute(query.order_by(sort_col.desc(), id_col.desc()).limit(page.limit + 1))
+    items = list(result.scalars().all())
+
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
+    return Page(items=items, next_cursor=next_cursor, total=total, total_estimated=estimated)
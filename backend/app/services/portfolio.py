@@ -1,12 +1,20 @@
+import enum
 import uuid
-from sqlalchemy import select, func
+from datetime import datetime
+from sqlalchemy import select, func, case, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
+from app.database import upsert_insert
 from app.models.fund import Fund
 from app.models.company import Company, CompanyStatus
+from app.models.portfolio_rollup import PortfolioRollup
 from app.schemas.fund import FundCreate, FundUpdate
 from app.schemas.company import CompanyCreate, CompanyUpdate
 from app.schemas.monitoring import PortfolioSummary
+from app.services.pagination import Page, PageRequest, paginate
+
+settings = get_settings()
 
 
 async def create_fund(db: AsyncSession, data: FundCreate) -> Fund:
@@ -22,15 +30,25 @@ async def get_fund(db: AsyncSession, fund_id: str) -> Fund | None:
     return result.scalar_one_or_none()
 
 
-async def list_funds(db: AsyncSession, skip: int = 0, limit: int = 50) -> tuple[list[Fund], int]:
-    count_result = await db.execute(select(func.count(Fund.id)))
-    total = count_result.scalar()
+async def list_funds(db: AsyncSession, page: PageRequest) -> Page:
+    return await paginate(db, select(Fund), Fund.created_at, Fund.id, page)
+
 
+async def get_fund_stats(db: AsyncSession, fund_ids: list[str]) -> dict[str, dict]:
+    """Company count and invested/current value per fund, aggregated in SQL."""
+    if not fund_ids:
+        return {}
     result = await db.execute(
-        select(Fund).order_by(Fund.created_at.desc()).offset(skip).limit(limit)
+        select(
+            Company.fund_id,
+            func.count(Company.id).label("company_count"),
+            func.coalesce(func.sum(Company.initial_investment), 0.0).label("total_invested"),
+            func.coalesce(func.sum(Company.current_valuation), 0.0).label("total_value"),
+        )
+        .where(Company.fund_id.in_(fund_ids))
+        .group_by(Company.fund_id)
     )
-    funds = list(result.scalars().all())
-    return funds, total
+    return {row.fund_id: row._asdict() for row in result.all()}
 
 
 async def update_fund(db: AsyncSession, fund_id: str, data: FundUpdate) -> Fund | None:
@@ -57,6 +75,7 @@ async def create_company(db: AsyncSession, data: CompanyCreate) -> Company:
     db.add(company)
     await db.flush()
     await db.refresh(company)
+    await _apply_rollup_delta(db, None, _rollup_snapshot(company))
     return company
 
 
@@ -69,65 +88,156 @@ async def list_companies(
     db: AsyncSession,
     fund_id: str | None = None,
     status: CompanyStatus | None = None,
-    skip: int = 0,
-    limit: int = 50,
-) -> tuple[list[Company], int]:
+    page: PageRequest | None = None,
+) -> Page:
     query = select(Company)
-    count_query = select(func.count(Company.id))
 
     if fund_id:
         query = query.where(Company.fund_id == fund_id)
-        count_query = count_query.where(Company.fund_id == fund_id)
     if status:
         query = query.where(Company.status == status)
-        count_query = count_query.where(Company.status == status)
 
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
-
-    result = await db.execute(
-        query.order_by(Company.created_at.desc()).offset(skip).limit(limit)
-    )
-    companies = list(result.scalars().all())
-    return companies, total
+    return await paginate(db, query, Company.created_at, Company.id, page or PageRequest())
 
 
 async def update_company(db: AsyncSession, company_id: str, data: CompanyUpdate) -> Company | None:
     company = await get_company(db, company_id)
     if not company:
         return None
+    before = _rollup_snapshot(company)
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(company, field, value)
     await db.flush()
     await db.refresh(company)
+    after = _rollup_snapshot(company)
+    if after != before:
+        await _apply_rollup_delta(db, before, after)
     return company
 
 
+_ROLLUP_DIMENSIONS = ("sector", "geography")
+_ROLLUP_FIELDS = ("company_count", "active_count", "total_invested", "total_value", "active_value")
+
+
+def _rollup_snapshot(company: Company) -> dict:
+    return {
+        field: getattr(company, field)
+        for field in ("sector", "geography", "status", "initial_investment", "current_valuation")
+    }
+
+
+def _rollup_key(value) -> str:
+    return value.value if isinstance(value, enum.Enum) else str(value)
+
+
+def _contribution(snapshot: dict, sign: int) -> dict:
+    active = snapshot["status"] == CompanyStatus.active
+    return {
+        "company_count": sign,
+        "active_count": sign if active else 0,
+        "total_invested": sign * snapshot["initial_investment"],
+        "total_value": sign * snapshot["current_valuation"],
+        "active_value": sign * snapshot["current_valuation"] if active else 0.0,
+    }
+
+
+async def _apply_rollup_delta(db: AsyncSession, before: dict | None, after: dict | None):
+    """Move a company's contribution between rollup rows; no-op until the rollup is built.
+
+    Each row is adjusted with one atomic ``INSERT ... ON CONFLICT DO UPDATE SET
+    x = x + delta``. Changes made while the rollup is disabled are not tracked,
+    so rebuild it with ``refresh_portfolio_rollup`` after turning it back on.
+    """
+    if not settings.portfolio_rollup_enabled:
+        return
+    built = await db.execute(
+        select(PortfolioRollup.key).where(PortfolioRollup.dimension == "total", PortfolioRollup.key == "all")
+    )
+    if built.first() is None:
+        return
+
+    deltas: dict[tuple[str, str], dict] = {}
+    for snapshot, sign in ((before, -1), (after, 1)):
+        if snapshot is None:
+            continue
+        contribution = _contribution(snapshot, sign)
+        keys = [("total", "all")] + [(d, _rollup_key(snapshot[d])) for d in _ROLLUP_DIMENSIONS]
+        for key in keys:
+            row = deltas.setdefault(key, dict.fromkeys(_ROLLUP_FIELDS, 0))
+            for field, value in contribution.items():
+                row[field] += value
+
+    stmt = await upsert_insert(db, PortfolioRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dimension", "key"],
+        set_={
+            **{field: getattr(PortfolioRollup, field) + getattr(stmt.excluded, field) for field in _ROLLUP_FIELDS},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    now = datetime.utcnow()
+    await db.execute(stmt, [
+        {"dimension": dimension, "key": key, **delta, "updated_at": now}
+        for (dimension, key), delta in deltas.items()
+    ])
+
+
+def _aggregate_columns():
+    active = Company.status == CompanyStatus.active
+    return (
+        func.count(Company.id).label("company_count"),
+        func.coalesce(func.sum(case((active, 1), else_=0)), 0).label("active_count"),
+        func.coalesce(func.sum(Company.initial_investment), 0.0).label("total_invested"),
+        func.coalesce(func.sum(Company.current_valuation), 0.0).label("total_value"),
+        func.coalesce(func.sum(case((active, Company.current_valuation), else_=0.0)), 0.0).label("active_value"),
+    )
+
+
+async def _aggregate_rollup_rows(db: AsyncSession) -> list[dict]:
+    totals = (await db.execute(select(*_aggregate_columns()))).one()
+    rows = [{"dimension": "total", "key": "all", **totals._asdict()}]
+    for dimension in _ROLLUP_DIMENSIONS:
+        column = getattr(Company, dimension)
+        result = await db.execute(select(column, *_aggregate_columns()).group_by(column))
+        for row in result.all():
+            values = row._asdict()
+            rows.append({"dimension": dimension, "key": _rollup_key(values.pop(dimension)), **values})
+    return rows
+
+
+async def refresh_portfolio_rollup(db: AsyncSession) -> list[dict]:
+    """Rebuild the rollup table from scratch with GROUP BY aggregates."""
+    rows = await _aggregate_rollup_rows(db)
+    await db.execute(delete(PortfolioRollup))
+    db.add_all([PortfolioRollup(**row) for row in rows])
+    await db.flush()
+    return rows
+
+
+async def _load_rollup_rows(db: AsyncSession) -> list[dict]:
+    columns = [getattr(PortfolioRollup, f) for f in ("dimension", "key", *_ROLLUP_FIELDS)]
+    rows = [row._asdict() for row in (await db.execute(select(*columns))).all()]
+    return rows or await refresh_portfolio_rollup(db)
+
+
 async def get_portfolio_summary(db: AsyncSession) -> PortfolioSummary:
-    companies_result = await db.execute(select(Company))
-    companies = list(companies_result.scalars().all())
-
-    funds_result = await db.execute(select(func.count(Fund.id)))
-    fund_count = funds_result.scalar()
-
-    total_invested = sum(c.initial_investment for c in companies)
-    total_nav = sum(c.current_valuation for c in companies if c.status == CompanyStatus.active)
-    active = [c for c in companies if c.status == CompanyStatus.active]
-
-    sector_counts: dict[str, dict] = {}
-    geo_counts: dict[str, dict] = {}
-    for c in companies:
-        sector = c.sector
-        if sector not in sector_counts:
-            sector_counts[sector] = {"sector": sector, "count": 0, "value": 0.0}
-        sector_counts[sector]["count"] += 1
-        sector_counts[sector]["value"] += c.current_valuation
-
-        geo = c.geography
-        if geo not in geo_counts:
-            geo_counts[geo] = {"geography": geo, "count": 0, "value": 0.0}
-        geo_counts[geo]["count"] += 1
-        geo_counts[geo]["value"] += c.current_valuation
+    if settings.portfolio_rollup_enabled:
+        rows = await _load_rollup_rows(db)
+    else:
+        rows = await _aggregate_rollup_rows(db)
+
+    fund_count = (await db.execute(select(func.count(Fund.id)))).scalar()
+
+    totals = next(r for r in rows if r["dimension"] == "total")
+    total_invested = totals["total_invested"]
+    total_nav = totals["active_value"]
+
+    breakdowns: dict[str, list[dict]] = {dimension: [] for dimension in _ROLLUP_DIMENSIONS}
+    for r in sorted(rows, key=lambda r: (-r["total_value"], r["key"])):
+        if r["dimension"] in breakdowns and r["company_count"] > 0:
+            breakdowns[r["dimension"]].append(
+                {r["dimension"]: r["key"], "count": r["company_count"], "value": r["total_value"]}
+            )
 
     return PortfolioSummary(
         total_nav=total_nav,
@@ -136,8 +246,8 @@ async def get_portfolio_summary(db: AsyncSession) -> PortfolioSummary:
         unrealized_gain=total_nav - total_invested,
         gross_moic=total_nav / total_invested if total_invested > 0 else 0.0,
         fund_count=fund_count,
-        company_count=len(companies),
-        active_companies=len(active),
-        sector_breakdown=list(sector_counts.values()),
-        geography_breakdown=list(geo_counts.values()),
+        company_count=totals["company_count"],
+        active_companies=totals["active_count"],
+        sector_breakdown=breakdowns["sector"],
+        geography_breakdown=breakdowns["geography"],
     )
@@ -1,12 +1,13 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.report import Report, ReportStatus
 from app.models.audit_log import AuditLog
 from app.schemas.report import ReportCreate
+from app.services.pagination import Page, PageRequest, paginate
 
 
 async def create_report(db: AsyncSession, data: ReportCreate) -> Report:
@@ -22,16 +23,8 @@ async def get_report(db: AsyncSession, report_id: str) -> Report | None:
     return result.scalar_one_or_none()
 
 
-async def list_reports(
-    db: AsyncSession,
-    skip: int = 0,
-    limit: int = 50,
-) -> tuple[list[Report], int]:
-    total = (await db.execute(select(func.count(Report.id)))).scalar()
-    result = await db.execute(
-        select(Report).order_by(Report.created_at.desc()).offset(skip).limit(limit)
-    )
-    return list(result.scalars().all()), total
+async def list_reports(db: AsyncSession, page: PageRequest | None = None) -> Page:
+    return await paginate(db, select(Report), Report.created_at, Report.id, page or PageRequest())
 
 
 async def update_report_status(
@@ -78,21 +71,13 @@ async def get_audit_logs(
     db: AsyncSession,
     entity_type: str | None = None,
     entity_id: str | None = None,
-    skip: int = 0,
-    limit: int = 100,
-) -> tuple[list[AuditLog], int]:
+    page: PageRequest | None = None,
+) -> Page:
     query = select(AuditLog)
-    count_query = select(func.count(AuditLog.id))
 
     if entity_type:
         query = query.where(AuditLog.entity_type == entity_type)
-        count_query = count_query.where(AuditLog.entity_type == entity_type)
     if entity_id:
         query = query.where(AuditLog.entity_id == entity_id)
-        count_query = count_query.where(AuditLog.entity_id == entity_id)
 
-    total = (await db.execute(count_query)).scalar()
-    result = await db.execute(
-        query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit)
-    )
-    return list(result.scalars().all()), total
+    return await paginate(db, query, AuditLog.timestamp, AuditLog.id, page or PageRequest(limit=100))
@@ -0,0 +1,169 @@
+"""Columnar multi-company, multi-metric time series with resampling.
+
+One query fetches bare (company, metric, date, value) tuples. NumPy then
+buckets them onto a contiguous month, quarter or year grid, aggregates each
+cell (last, sum or avg) and derives growth and margin series. The result is
+one shared ``dates`` axis plus one value array per series.
+"""
+from datetime import date
+from typing import Literal
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.company import Company
+from app.models.financial_metric import FinancialMetric, MetricType
+
+Frequency = Literal["month", "quarter", "year"]
+Aggregation = Literal["last", "sum", "avg"]
+
+FREQ_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+# Metrics that are reported as a share of revenue when margins are requested
+MARGIN_METRICS = (MetricType.gross_profit, MetricType.ebitda, MetricType.net_income, MetricType.free_cash_flow)
+
+
+def bucket_index(dates: np.ndarray, freq: Frequency) -> np.ndarray:
+    """Period number of each ``datetime64[D]`` date, counted from 1970."""
+    return dates.astype("datetime64[M]").astype(np.int64) // FREQ_MONTHS[freq]
+
+
+def bucket_end(index: np.ndarray, freq: Frequency) -> np.ndarray:
+    """Last day of each period number as ``datetime64[D]``."""
+    next_start = ((index + 1) * FREQ_MONTHS[freq]).astype("datetime64[M]")
+    return next_start.astype("datetime64[D]") - np.timedelta64(1, "D")
+
+
+def resample(
+    series: np.ndarray,
+    dates: np.ndarray,
+    values: np.ndarray,
+    n_series: int,
+    freq: Frequency,
+    agg: Aggregation,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Aggregate points onto a contiguous period grid.
+
+    ``series`` holds each point's row in the output. Returns the period end
+    dates and a (n_series, n_periods) matrix with NaN for empty cells.
+    """
+    if len(values) == 0:
+        return np.array([], dtype="datetime64[D]"), np.empty((n_series, 0))
+    buckets = bucket_index(dates, freq)
+    first = buckets.min()
+    n_periods = int(buckets.max() - first + 1)
+    cells = series * n_periods + (buckets - first)
+    size = n_series * n_periods
+
+    if agg == "last":
+        order = np.lexsort((dates, cells))
+        cells, values = cells[order], values[order]
+        is_last = np.append(cells[1:] != cells[:-1], True)
+        out = np.full(size, np.nan)
+        out[cells[is_last]] = values[is_last]
+    else:
+        counts = np.bincount(cells, minlength=size)
+        out = np.bincount(cells, weights=values, minlength=size)
+        if agg == "avg":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out = out / counts
+        out[counts == 0] = np.nan
+
+    grid = bucket_end(np.arange(first, first + n_periods), freq)
+    return grid, out.reshape(n_series, n_periods)
+
+
+def growth(matrix: np.ndarray) -> np.ndarray:
+    """Period-over-period change; the first period and zero bases are NaN."""
+    out = np.full(matrix.shape, np.nan)
+    previous = matrix[:, :-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[:, 1:] = np.where(previous != 0, matrix[:, 1:] / previous - 1, np.nan)
+    return out
+
+
+def ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _column(values: np.ndarray) -> list[float | None]:
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+async def get_time_series_frame(
+    db: AsyncSession,
+    metric_types: list[MetricType],
+    company_ids: list[str] | None = None,
+    fund_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    freq: Frequency = "quarter",
+    agg: Aggregation = "last",
+    include_growth: bool = False,
+    include_margins: bool = False,
+) -> dict:
+    """Resampled series for every requested company × metric from a single query.
+
+    Without ``company_ids`` every company with data is included, optionally
+    limited to ``fund_id``. Margins divide each of ``MARGIN_METRICS`` by the
+    company's revenue, which is fetched even if it was not requested.
+    """
+    metric_types = list(dict.fromkeys(MetricType(m) for m in metric_types))
+    fetched = list(metric_types)
+    if include_margins and MetricType.revenue not in fetched and any(m in MARGIN_METRICS for m in fetched):
+        fetched.append(MetricType.revenue)
+
+    query = (
+        select(FinancialMetric.company_id, FinancialMetric.metric_type, FinancialMetric.period_date, FinancialMetric.value)
+        .where(FinancialMetric.metric_type.in_(fetched))
+    )
+    if company_ids:
+        query = query.where(FinancialMetric.company_id.in_(company_ids))
+    if fund_id:
+        query = query.where(FinancialMetric.company_id.in_(select(Company.id).where(Company.fund_id == fund_id)))
+    if start_date:
+        query = query.where(FinancialMetric.period_date >= start_date)
+    if end_date:
+        query = query.where(FinancialMetric.period_date <= end_date)
+    rows = (await db.execute(query)).all()
+
+    companies = list(dict.fromkeys(company_ids)) if company_ids else sorted({r[0] for r in rows})
+    company_index = {c: i for i, c in enumerate(companies)}
+    metric_index = {m: i for i, m in enumerate(fetched)}
+    rows = [r for r in rows if r[0] in company_index]
+
+    series = np.fromiter(
+        (company_index[r[0]] * len(fetched) + metric_index[MetricType(r[1])] for r in rows),
+        dtype=np.int64, count=len(rows),
+    )
+    dates = np.array([r[2] for r in rows], dtype="datetime64[D]")
+    values = np.fromiter((r[3] for r in rows), dtype=np.float64, count=len(rows))
+    grid, matrix = resample(series, dates, values, len(companies) * len(fetched), freq, agg)
+    matrix = matrix.reshape(len(companies), len(fetched), len(grid))
+
+    columns = []
+    for c, company_id in enumerate(companies):
+        for metric in metric_types:
+            values = matrix[c, metric_index[metric]]
+            columns.append({"company_id": company_id, "metric": metric.value, "values": _column(values)})
+            if include_growth:
+                columns.append({
+                    "company_id": company_id,
+                    "metric": f"{metric.value}_growth",
+                    "values": _column(growth(values[np.newaxis])[0]),
+                })
+            if include_margins and metric in MARGIN_METRICS:
+                revenue = matrix[c, metric_index[MetricType.revenue]]
+                columns.append({
+                    "company_id": company_id,
+                    "metric": f"{metric.value}_margin",
+                    "values": _column(ratio(values, revenue)),
+                })
+
+    return {
+        "freq": freq,
+        "agg": agg,
+        "dates": grid.astype(str).tolist(),
+        "series": columns,
+    }
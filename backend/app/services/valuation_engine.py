@@ -1,95 +1,182 @@
+import asyncio
+import copy
+import hashlib
+import json
 import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
-from sqlalchemy import select
+import numpy as np
+from pydantic import BaseModel
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.valuation import Valuation, ValuationOverride, ValuationMethod
+from app.models.valuation import Valuation, ValuationOverride, ValuationMethod, ValuationStatus
 from app.models.financial_metric import FinancialMetric, MetricType
 from app.schemas.valuation import (
     ValuationCreate,
     DCFInputs,
+    DCFBatchRequest,
     CompsInputs,
     SensitivityInputs,
+    MonteCarloInputs,
+    DistributionKind,
+    DistributionSpec,
     OverrideCreate,
 )
+from app.process_pools import get_process_pool
+from app.services.pagination import Page, PageRequest, paginate
+
+
+def _latest_metrics_query(company_ids: list[str]):
+    ranked = (
+        select(
+            FinancialMetric.company_id,
+            FinancialMetric.metric_type,
+            FinancialMetric.value,
+            func.row_number().over(
+                partition_by=(FinancialMetric.company_id, FinancialMetric.metric_type),
+                order_by=(FinancialMetric.period_date.desc(), FinancialMetric.created_at.desc()),
+            ).label("recency"),
+        )
+        .where(FinancialMetric.company_id.in_(company_ids))
+        .subquery()
+    )
+    return select(ranked.c.company_id, ranked.c.metric_type, ranked.c.value).where(ranked.c.recency == 1)
 
 
 async def get_latest_metrics(db: AsyncSession, company_id: str) -> dict[str, float]:
-    result = await db.execute(
-        select(FinancialMetric)
-        .where(FinancialMetric.company_id == company_id)
-        .order_by(FinancialMetric.period_date.desc())
-    )
-    metrics = list(result.scalars().all())
-
-    latest: dict[str, float] = {}
-    seen: set[str] = set()
-    for m in metrics:
-        if m.metric_type not in seen:
-            latest[m.metric_type] = m.value
-            seen.add(m.metric_type)
+    latest = await get_latest_metrics_bulk(db, [company_id])
+    return latest.get(company_id, {})
+
+
+async def get_latest_metrics_bulk(db: AsyncSession, company_ids: list[str]) -> dict[str, dict[str, float]]:
+    """Latest value of every metric type for each company, in one round trip."""
+    if not company_ids:
+        return {}
+    result = await db.execute(_latest_metrics_query(list(set(company_ids))))
+    latest: dict[str, dict[str, float]] = {}
+    for company_id, metric_type, value in result.all():
+        latest.setdefault(company_id, {})[metric_type] = value
     return latest
 
 
-def run_dcf(inputs: DCFInputs) -> dict:
-    base_revenue = inputs.base_revenue or 0.0
-    projection_years = inputs.projection_years
-    discount_rate = inputs.discount_rate
-    terminal_growth = inputs.terminal_growth_rate
-    tax_rate = inputs.tax_rate
-
-    growth_rates = inputs.revenue_growth_rates or [0.10] * projection_years
-    margins = inputs.ebitda_margins or [0.25] * projection_years
-
-    if len(growth_rates) < projection_years:
-        growth_rates.extend([growth_rates[-1]] * (projection_years - len(growth_rates)))
-    if len(margins) < projection_years:
-        margins.extend([margins[-1]] * (projection_years - len(margins)))
-
-    projections = []
-    revenue = base_revenue
-    total_pv_fcf = 0.0
-
-    for year in range(1, projection_years + 1):
-        revenue *= (1 + growth_rates[year - 1])
-        ebitda = revenue * margins[year - 1]
-        tax = ebitda * tax_rate
-        capex = revenue * inputs.capex_pct_revenue
-        nwc_change = revenue * inputs.nwc_pct_revenue * growth_rates[year - 1]
-        fcf = ebitda - tax - capex - nwc_change
-        discount_factor = (1 + discount_rate) ** year
-        pv_fcf = fcf / discount_factor
-        total_pv_fcf += pv_fcf
-
-        projections.append({
-            "year": year,
-            "revenue": round(revenue, 2),
-            "ebitda": round(ebitda, 2),
-            "ebitda_margin": round(margins[year - 1], 4),
-            "fcf": round(fcf, 2),
-            "pv_fcf": round(pv_fcf, 2),
-            "discount_factor": round(discount_factor, 4),
-        })
-
-    terminal_fcf = projections[-1]["fcf"] * (1 + terminal_growth)
-    terminal_value = terminal_fcf / (discount_rate - terminal_growth)
-    pv_terminal = terminal_value / ((1 + discount_rate) ** projection_years)
-
-    enterprise_value = total_pv_fcf + pv_terminal
-    equity_value = enterprise_value - inputs.net_debt
+def _pad_path(path: list[float], default: float, years: int, horizon: int) -> list[float]:
+    path = list(path) or [default] * years
+    if len(path) < horizon:
+        path = path + [path[-1]] * (horizon - len(path))
+    return path[:horizon]
+
+
+def _dcf_arrays(cases: list[DCFInputs]) -> dict[str, np.ndarray]:
+    """Evaluate N DCF cases at once; year-indexed arrays are shaped (N, max horizon)."""
+    n = len(cases)
+    years = np.array([c.projection_years for c in cases])
+    horizon = int(years.max())
+
+    growth = np.array([
+        _pad_path(c.revenue_growth_rates, 0.10, c.projection_years, horizon) for c in cases
+    ])
+    margins = np.array([
+        _pad_path(c.ebitda_margins, 0.25, c.projection_years, horizon) for c in cases
+    ])
+    base_revenue = np.array([c.base_revenue or 0.0 for c in cases])
+    discount_rate = np.array([c.discount_rate for c in cases])
+    terminal_growth = np.array([c.terminal_growth_rate for c in cases])
+    tax_rate = np.array([c.tax_rate for c in cases])
+    capex_pct = np.array([c.capex_pct_revenue for c in cases])
+    nwc_pct = np.array([c.nwc_pct_revenue for c in cases])
+    net_debt = np.array([c.net_debt for c in cases])
+
+    t = np.arange(1, horizon + 1)
+    in_horizon = t[None, :] <= years[:, None]
+
+    revenue = base_revenue[:, None] * np.cumprod(1 + growth, axis=1)
+    ebitda = revenue * margins
+    tax = ebitda * tax_rate[:, None]
+    capex = revenue * capex_pct[:, None]
+    nwc_change = revenue * nwc_pct[:, None] * growth
+    fcf = ebitda - tax - capex - nwc_change
+    discount_factor = (1 + discount_rate[:, None]) ** t[None, :]
+    pv_fcf = fcf / discount_factor
+    pv_fcf_total = np.where(in_horizon, pv_fcf, 0.0).sum(axis=1)
+
+    final_fcf = fcf[np.arange(n), years - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminal_value = final_fcf * (1 + terminal_growth) / (discount_rate - terminal_growth)
+        pv_terminal = terminal_value / (1 + discount_rate) ** years
+        enterprise_value = pv_fcf_total + pv_terminal
+        implied_ev_ebitda = np.where(ebitda[:, 0] != 0, enterprise_value / ebitda[:, 0], np.nan)
 
     return {
-        "projections": projections,
-        "terminal_value": round(terminal_value, 2),
-        "pv_terminal_value": round(pv_terminal, 2),
-        "pv_fcf_total": round(total_pv_fcf, 2),
-        "enterprise_value": round(enterprise_value, 2),
-        "equity_value": round(equity_value, 2),
-        "implied_ev_ebitda": round(enterprise_value / projections[0]["ebitda"], 2) if projections[0]["ebitda"] else None,
+        "years": years,
+        "revenue": revenue,
+        "ebitda": ebitda,
+        "ebitda_margin": margins,
+        "fcf": fcf,
+        "pv_fcf": pv_fcf,
+        "discount_factor": discount_factor,
+        "terminal_value": terminal_value,
+        "pv_terminal_value": pv_terminal,
+        "pv_fcf_total": pv_fcf_total,
+        "enterprise_value": enterprise_value,
+        "equity_value": enterprise_value - net_debt,
+        "implied_ev_ebitda": implied_ev_ebitda,
     }
 
 
+def _finite_or_none(values: np.ndarray, decimals: int) -> list[float | None]:
+    rounded = np.round(values, decimals)
+    return [float(v) if np.isfinite(v) else None for v in rounded]
+
+
+def run_dcf_batch(cases: list[DCFInputs], include_projections: bool = True) -> list[dict]:
+    if not cases:
+        return []
+
+    arrays = _dcf_arrays(cases)
+    summary = {
+        key: _finite_or_none(arrays[key], 2)
+        for key in (
+            "terminal_value", "pv_terminal_value", "pv_fcf_total",
+            "enterprise_value", "equity_value", "implied_ev_ebitda",
+        )
+    }
+
+    if include_projections:
+        revenue = np.round(arrays["revenue"], 2).tolist()
+        ebitda = np.round(arrays["ebitda"], 2).tolist()
+        margin = np.round(arrays["ebitda_margin"], 4).tolist()
+        fcf = np.round(arrays["fcf"], 2).tolist()
+        pv_fcf = np.round(arrays["pv_fcf"], 2).tolist()
+        discount_factor = np.round(arrays["discount_factor"], 4).tolist()
+
+    results = []
+    for i, n_years in enumerate(arrays["years"].tolist()):
+        result = {key: values[i] for key, values in summary.items()}
+        if include_projections:
+            result["projections"] = [
+                {
+                    "year": y + 1,
+                    "revenue": revenue[i][y],
+                    "ebitda": ebitda[i][y],
+                    "ebitda_margin": margin[i][y],
+                    "fcf": fcf[i][y],
+                    "pv_fcf": pv_fcf[i][y],
+                    "discount_factor": discount_factor[i][y],
+                }
+                for y in range(n_years)
+            ]
+        results.append(result)
+    return results
+
+
+def run_dcf(inputs: DCFInputs) -> dict:
+    return run_dcf_batch([inputs])[0]
+
+
 def run_comps(inputs: CompsInputs) -> dict:
     if not inputs.comparable_companies:
         return {"error": "No comparable companies provided"}
@@ -128,10 +215,142 @@ def run_comps(inputs: CompsInputs) -> dict:
     }
 
 
-def run_sensitivity(base_ev: float, inputs: SensitivityInputs) -> dict:
-    var1_range = inputs.variable_1_range or [0.08, 0.09, 0.10, 0.11, 0.12]
-    var2_range = inputs.variable_2_range or [0.015, 0.02, 0.025, 0.03, 0.035]
+# Inputs that move enterprise value; net debt only shifts equity value and is left out
+SENSITIVITY_VARIABLES = {
+    "discount_rate",
+    "terminal_growth_rate",
+    "tax_rate",
+    "capex_pct_revenue",
+    "nwc_pct_revenue",
+    "base_revenue",
+    "revenue_growth_rate",
+    "ebitda_margin",
+}
+
+MAX_SENSITIVITY_CELLS = 1_000_000
+
+
+def _default_range(variable: str, base: DCFInputs | None) -> list[float]:
+    if variable == "discount_rate" and base is None:
+        return [0.08, 0.09, 0.10, 0.11, 0.12]
+    if variable == "terminal_growth_rate" and base is None:
+        return [0.015, 0.02, 0.025, 0.03, 0.035]
+    if variable == "discount_rate":
+        return [round(base.discount_rate + d, 4) for d in (-0.02, -0.01, 0.0, 0.01, 0.02)]
+    if variable == "terminal_growth_rate":
+        return [round(base.terminal_growth_rate + d, 4) for d in (-0.01, -0.005, 0.0, 0.005, 0.01)]
+    centre = _sensitivity_base_value(variable, base) if base is not None else 1.0
+    return [round(centre * f, 6) for f in (0.8, 0.9, 1.0, 1.1, 1.2)]
+
+
+def _sensitivity_base_value(variable: str, base: DCFInputs) -> float:
+    if variable == "revenue_growth_rate":
+        return (base.revenue_growth_rates or [0.10])[0]
+    if variable == "ebitda_margin":
+        return (base.ebitda_margins or [0.25])[0]
+    return getattr(base, variable) or 0.0
+
+
+def _evaluate_dcf(base: DCFInputs, overrides: dict[str, np.ndarray]) -> np.ndarray:
+    """Enterprise value of ``base`` with fields replaced by broadcastable arrays.
+
+    Override arrays carry a trailing length-1 projection-year axis. Growth and
+    margin overrides replace the whole projection path with a flat rate. When an
+    ``exit_multiple`` is present the terminal value is final-year EBITDA times the
+    multiple; otherwise Gordon growth is used and cells where the discount rate
+    does not exceed terminal growth are NaN.
+    """
+    years = base.projection_years
+    t = np.arange(1, years + 1)
+
+    params: dict[str, np.ndarray] = {
+        "revenue_growth_rate": np.array(_pad_path(base.revenue_growth_rates, 0.10, years, years)),
+        "ebitda_margin": np.array(_pad_path(base.ebitda_margins, 0.25, years, years)),
+    }
+    for name in SENSITIVITY_VARIABLES - params.keys():
+        params[name] = np.array([getattr(base, name) or 0.0])
+    exit_multiple = getattr(base, "exit_multiple", None)
+    if exit_multiple is not None:
+        params["exit_multiple"] = np.array([exit_multiple])
+    params.update(overrides)
+
+    growth = params["revenue_growth_rate"] * np.ones(years)
+    margin = params["ebitda_margin"] * np.ones(years)
+    r = params["discount_rate"]
+    tg = params["terminal_growth_rate"]
+
+    revenue = params["base_revenue"] * np.cumprod(1 + growth, axis=-1)
+    ebitda = revenue * margin
+    fcf = ebitda * (1 - params["tax_rate"]) - revenue * (
+        params["capex_pct_revenue"] + params["nwc_pct_revenue"] * growth
+    )
+    pv_fcf_total = (fcf / (1 + r) ** t).sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "exit_multiple" in params:
+            terminal_value = ebitda[..., -1] * params["exit_multiple"][..., 0]
+            valid = True
+        else:
+            spread = (r - tg)[..., 0]
+            terminal_value = fcf[..., -1] * (1 + tg[..., 0]) / spread
+            valid = spread > 0
+        pv_terminal = terminal_value / (1 + r[..., 0]) ** years
+        return np.where(valid, pv_fcf_total + pv_terminal, np.nan)
+
+
+def run_dcf_grid(base: DCFInputs, axes: list[tuple[str, list[float]]]) -> np.ndarray:
+    """Re-evaluate the DCF over the cartesian product of ``axes`` in one broadcast pass.
+
+    Returns an array shaped ``(len(values_1), len(values_2), ...)`` of enterprise values.
+    """
+    ndim = len(axes)
+    overrides = {}
+    # Each axis occupies its own leading dimension; the trailing dimension is the projection year.
+    for i, (name, values) in enumerate(axes):
+        shape = [1] * ndim + [1]
+        shape[i] = len(values)
+        overrides[name] = np.asarray(values, dtype=float).reshape(shape)
+
+    grid_shape = tuple(len(values) for _, values in axes)
+    return np.broadcast_to(_evaluate_dcf(base, overrides), grid_shape)
+
+
+def run_sensitivity(base_ev: float, inputs: SensitivityInputs, base_inputs: DCFInputs | None = None) -> dict:
+    axes = [(inputs.variable_1, inputs.variable_1_range), (inputs.variable_2, inputs.variable_2_range)]
+    if inputs.variable_3:
+        axes.append((inputs.variable_3, inputs.variable_3_range))
+    axes = [(name, values or _default_range(name, base_inputs)) for name, values in axes]
+
+    if base_inputs is None:
+        if inputs.variable_3:
+            return {"error": "A base DCF valuation is required for three-variable sensitivity"}
+        return _scaled_sensitivity(base_ev, inputs, axes[0][1], axes[1][1])
+
+    unsupported = [name for name, _ in axes if name not in SENSITIVITY_VARIABLES]
+    if unsupported:
+        return {"error": f"Unsupported sensitivity variable(s): {', '.join(unsupported)}"}
+    if len({name for name, _ in axes}) != len(axes):
+        return {"error": "Sensitivity variables must be distinct"}
+    if np.prod([len(values) for _, values in axes]) > MAX_SENSITIVITY_CELLS:
+        return {"error": f"Sensitivity grid exceeds {MAX_SENSITIVITY_CELLS:,} cells"}
+
+    grid = np.round(run_dcf_grid(base_inputs, axes), 2)
+    matrix = np.where(np.isfinite(grid), grid, None).tolist()
+
+    outputs = {}
+    for i, (name, values) in enumerate(axes, start=1):
+        outputs[f"variable_{i}"] = name
+        outputs[f"variable_{i}_range"] = values
+    outputs.update({
+        "matrix": matrix,
+        "base_enterprise_value": base_ev,
+        "method": "dcf_recompute",
+    })
+    return outputs
+
 
+def _scaled_sensitivity(base_ev: float, inputs: SensitivityInputs, var1_range: list[float], var2_range: list[float]) -> dict:
+    """Approximate grid that scales a known EV; used only when no DCF inputs are available."""
     matrix = []
     for v1 in var1_range:
         row = []
@@ -149,36 +368,257 @@ def run_sensitivity(base_ev: float, inputs: SensitivityInputs) -> dict:
         "variable_2_range": var2_range,
         "matrix": matrix,
         "base_enterprise_value": base_ev,
+        "method": "scaled",
     }
 
 
-async def create_valuation(db: AsyncSession, data: ValuationCreate) -> Valuation:
-    outputs = {}
-    ev = None
-    eq_val = None
-    implied_mult = None
+def _resolve_dcf_inputs(inputs: DCFInputs, metrics: dict[str, float]) -> DCFInputs:
+    updates = {}
+    if inputs.base_revenue is None and MetricType.revenue in metrics:
+        updates["base_revenue"] = metrics[MetricType.revenue]
+    if inputs.base_ebitda is None and MetricType.ebitda in metrics:
+        updates["base_ebitda"] = metrics[MetricType.ebitda]
+    return inputs.model_copy(update=updates) if updates else inputs
+
+
+MONTE_CARLO_VARIABLES = SENSITIVITY_VARIABLES | {"exit_multiple"}
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    from app.config import get_settings
+    return get_process_pool("monte_carlo", get_settings().monte_carlo_workers)
+
+
+def validate_monte_carlo(inputs: MonteCarloInputs) -> str | None:
+    unsupported = sorted(set(inputs.distributions) - MONTE_CARLO_VARIABLES)
+    if unsupported:
+        return f"Unsupported Monte Carlo variable(s): {', '.join(unsupported)}"
+    if "exit_multiple" in inputs.distributions and inputs.exit_multiple is None:
+        return "exit_multiple must be set to simulate an exit multiple distribution"
+    for name, spec in inputs.distributions.items():
+        if spec.kind == DistributionKind.normal and spec.std is None:
+            return f"{name}: normal distribution requires std"
+        if spec.kind != DistributionKind.normal and (spec.low is None or spec.high is None):
+            return f"{name}: {spec.kind.value} distribution requires low and high"
+        if spec.low is not None and spec.high is not None and spec.low > spec.high:
+            return f"{name}: low must not exceed high"
+    if any(not 0 <= p <= 100 for p in inputs.percentiles):
+        return "Percentiles must be between 0 and 100"
+    return None
+
+
+def _draw(rng: np.random.Generator, spec: DistributionSpec, centre: float, size: int) -> np.ndarray:
+    if spec.kind == DistributionKind.uniform:
+        return rng.uniform(spec.low, spec.high, size)
+    if spec.kind == DistributionKind.triangular:
+        mode = spec.mode if spec.mode is not None else min(max(centre, spec.low), spec.high)
+        return rng.triangular(spec.low, mode, spec.high, size)
+    draws = rng.normal(spec.mean if spec.mean is not None else centre, spec.std, size)
+    if spec.low is not None or spec.high is not None:
+        draws = np.clip(draws, spec.low, spec.high)
+    return draws
+
+
+def _simulate_chunk(payload: dict, seed: np.random.SeedSequence, size: int) -> np.ndarray:
+    """Enterprise values for one chunk of paths; runs inside a worker process."""
+    inputs = MonteCarloInputs(**payload)
+    rng = np.random.default_rng(seed)
+    draws = {
+        name: _draw(rng, spec, _sensitivity_base_value(name, inputs), size)[:, None]
+        for name, spec in sorted(inputs.distributions.items())
+    }
+    return np.broadcast_to(_evaluate_dcf(inputs, draws), (size,))
+
+
+def _chunk_plan(inputs: MonteCarloInputs, seed: int) -> list[tuple[np.random.SeedSequence, int]]:
+    n_chunks = -(-inputs.n_paths // inputs.chunk_size)
+    sizes = [inputs.chunk_size] * (n_chunks - 1) + [inputs.n_paths - inputs.chunk_size * (n_chunks - 1)]
+    return list(zip(np.random.SeedSequence(seed).spawn(n_chunks), sizes))
+
+
+def summarise_paths(ev: np.ndarray, inputs: MonteCarloInputs, include_histogram: bool = True) -> dict:
+    valid = ev[np.isfinite(ev)]
+    summary = {"paths": int(ev.size), "valid_paths": int(valid.size)}
+    if not valid.size:
+        return {**summary, "error": "No simulated path produced a finite valuation"}
+
+    bands = np.percentile(valid, inputs.percentiles)
+    summary.update({
+        "mean": round(float(valid.mean()), 2),
+        "std": round(float(valid.std()), 2),
+        "percentiles": {f"p{p:g}": round(float(v), 2) for p, v in zip(inputs.percentiles, bands)},
+        "equity_percentiles": {
+            f"p{p:g}": round(float(v - inputs.net_debt), 2) for p, v in zip(inputs.percentiles, bands)
+        },
+    })
+    if include_histogram:
+        counts, edges = np.histogram(valid, bins=inputs.histogram_bins)
+        summary["histogram"] = {
+            "bin_edges": np.round(edges, 2).tolist(),
+            "counts": counts.tolist(),
+        }
+    return summary
+
+
+def _submit_chunks(inputs: MonteCarloInputs) -> tuple[int, list[asyncio.Future]]:
+    seed = inputs.seed if inputs.seed is not None else int(np.random.SeedSequence().generate_state(1)[0])
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    payload = inputs.model_dump()
+    futures = [
+        loop.run_in_executor(pool, _simulate_chunk, payload, chunk_seed, size)
+        for chunk_seed, size in _chunk_plan(inputs, seed)
+    ]
+    return seed, futures
+
+
+async def run_monte_carlo(inputs: MonteCarloInputs) -> dict:
+    error = validate_monte_carlo(inputs)
+    if error:
+        return {"error": error}
+    seed, futures = _submit_chunks(inputs)
+    ev = np.concatenate(await asyncio.gather(*futures))
+    return {"seed": seed, **summarise_paths(ev, inputs)}
+
+
+async def stream_monte_carlo(inputs: MonteCarloInputs) -> AsyncIterator[dict]:
+    """Yield running percentile bands as each chunk of paths completes."""
+    seed, futures = _submit_chunks(inputs)
+    completed: list[np.ndarray] = []
+    try:
+        for i, future in enumerate(futures, start=1):
+            completed.append(await future)
+            done = i == len(futures)
+            update = summarise_paths(np.concatenate(completed), inputs, include_histogram=done)
+            yield {"seed": seed, "chunk": i, "chunks": len(futures), "done": done, **update}
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+_result_cache: OrderedDict[str, dict] = OrderedDict()
+
+
+def _cache_get(key: str | None) -> dict | None:
+    if key is None or key not in _result_cache:
+        return None
+    _result_cache.move_to_end(key)
+    return copy.deepcopy(_result_cache[key])
+
+
+def _cache_put(key: str | None, outputs: dict):
+    if key is None or "error" in outputs:
+        return
+    from app.config import get_settings
+    _result_cache[key] = copy.deepcopy(outputs)
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > get_settings().valuation_cache_size:
+        _result_cache.popitem(last=False)
+
+
+def valuation_input_hash(method: ValuationMethod, resolved: dict) -> str | None:
+    """Content address of a valuation's fully-resolved inputs, or None if not reproducible."""
+    if not resolved:
+        return None
+    mc_inputs = resolved.get("inputs")
+    if isinstance(mc_inputs, MonteCarloInputs) and mc_inputs.seed is None:
+        return None
+    payload = {
+        key: value.model_dump(mode="json") if isinstance(value, BaseModel) else value
+        for key, value in resolved.items()
+    }
+    encoded = json.dumps({"method": method.value, **payload}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
 
+async def _resolve_inputs(db: AsyncSession, data: ValuationCreate) -> dict:
+    """Parse ``data.inputs`` and fill anything taken from stored metrics or a base valuation."""
     if data.method == ValuationMethod.dcf:
-        dcf_inputs = DCFInputs(**data.inputs)
         metrics = await get_latest_metrics(db, data.company_id)
-        if dcf_inputs.base_revenue is None and MetricType.revenue in metrics:
-            dcf_inputs.base_revenue = metrics[MetricType.revenue]
-        if dcf_inputs.base_ebitda is None and MetricType.ebitda in metrics:
-            dcf_inputs.base_ebitda = metrics[MetricType.ebitda]
-        outputs = run_dcf(dcf_inputs)
-        ev = outputs.get("enterprise_value")
-        eq_val = outputs.get("equity_value")
-        implied_mult = outputs.get("implied_ev_ebitda")
-
-    elif data.method == ValuationMethod.comparable_companies:
-        comps_inputs = CompsInputs(**data.inputs)
-        outputs = run_comps(comps_inputs)
-        ev = outputs.get("implied_enterprise_value")
-
-    elif data.method == ValuationMethod.sensitivity:
-        sens_inputs = SensitivityInputs(**data.inputs)
-        base_ev = data.inputs.get("base_enterprise_value", 0)
-        outputs = run_sensitivity(base_ev, sens_inputs)
+        return {"inputs": _resolve_dcf_inputs(DCFInputs(**data.inputs), metrics)}
+
+    if data.method == ValuationMethod.comparable_companies:
+        return {"inputs": CompsInputs(**data.inputs)}
+
+    if data.method == ValuationMethod.monte_carlo:
+        metrics = await get_latest_metrics(db, data.company_id)
+        return {"inputs": _resolve_dcf_inputs(MonteCarloInputs(**data.inputs), metrics)}
+
+    if data.method == ValuationMethod.sensitivity:
+        resolved = {
+            "inputs": SensitivityInputs(**data.inputs),
+            "base_inputs": None,
+            "base_ev": data.inputs.get("base_enterprise_value", 0),
+        }
+        base_valuation_id = resolved["inputs"].base_valuation_id
+        if base_valuation_id:
+            base = await get_valuation(db, base_valuation_id)
+            if base is None or base.method != ValuationMethod.dcf:
+                resolved["error"] = "Base valuation must be an existing DCF valuation"
+            else:
+                metrics = await get_latest_metrics(db, base.company_id)
+                resolved["base_inputs"] = _resolve_dcf_inputs(DCFInputs(**base.inputs), metrics)
+                resolved["base_ev"] = base.enterprise_value or resolved["base_ev"]
+        return resolved
+
+    return {}
+
+
+async def _compute_outputs(method: ValuationMethod, resolved: dict) -> dict:
+    if "error" in resolved:
+        return {"error": resolved["error"]}
+    if method == ValuationMethod.dcf:
+        return run_dcf(resolved["inputs"])
+    if method == ValuationMethod.comparable_companies:
+        return run_comps(resolved["inputs"])
+    if method == ValuationMethod.monte_carlo:
+        return await run_monte_carlo(resolved["inputs"])
+    if method == ValuationMethod.sensitivity:
+        return run_sensitivity(resolved["base_ev"], resolved["inputs"], resolved["base_inputs"])
+    return {}
+
+
+def _headline_values(method: ValuationMethod, outputs: dict) -> tuple[float | None, float | None, float | None]:
+    if method == ValuationMethod.dcf:
+        return outputs.get("enterprise_value"), outputs.get("equity_value"), outputs.get("implied_ev_ebitda")
+    if method == ValuationMethod.comparable_companies:
+        return outputs.get("implied_enterprise_value"), None, None
+    if method == ValuationMethod.monte_carlo and "percentiles" in outputs:
+        return outputs["percentiles"].get("p50"), outputs["equity_percentiles"].get("p50"), None
+    return None, None, None
+
+
+async def _find_valuation_by_hash(db: AsyncSession, data: ValuationCreate, input_hash: str) -> Valuation | None:
+    result = await db.execute(
+        select(Valuation)
+        .where(
+            Valuation.company_id == data.company_id,
+            Valuation.valuation_date == data.valuation_date,
+            Valuation.input_hash == input_hash,
+            Valuation.status != ValuationStatus.superseded,
+            ~Valuation.overrides.any(),
+        )
+        .order_by(Valuation.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def create_valuation(db: AsyncSession, data: ValuationCreate) -> Valuation:
+    resolved = await _resolve_inputs(db, data)
+    input_hash = valuation_input_hash(data.method, resolved)
+
+    # An identical run for the same mark date returns the stored valuation
+    if input_hash:
+        existing = await _find_valuation_by_hash(db, data, input_hash)
+        if existing:
+            return existing
+
+    outputs = _cache_get(input_hash)
+    if outputs is None:
+        outputs = await _compute_outputs(data.method, resolved)
+        _cache_put(input_hash, outputs)
+    ev, eq_val, implied_mult = _headline_values(data.method, outputs)
 
     valuation = Valuation(
         company_id=data.company_id,
@@ -189,6 +629,7 @@ async def create_valuation(db: AsyncSession, data: ValuationCreate) -> Valuation
         enterprise_value=ev,
         equity_value=eq_val,
         implied_multiple=implied_mult,
+        input_hash=input_hash,
         notes=data.notes,
     )
     db.add(valuation)
@@ -197,6 +638,19 @@ async def create_valuation(db: AsyncSession, data: ValuationCreate) -> Valuation
     return valuation
 
 
+async def run_batch_dcf(db: AsyncSession, data: DCFBatchRequest) -> list[dict]:
+    metrics_by_company = await get_latest_metrics_bulk(
+        db, [case.company_id for case in data.cases if case.company_id]
+    )
+    cases = [_resolve_dcf_inputs(case, metrics_by_company.get(case.company_id, {})) for case in data.cases]
+
+    outputs = run_dcf_batch(cases, include_projections=data.include_projections)
+    return [
+        {"company_id": case.company_id, "label": case.label, **out}
+        for case, out in zip(data.cases, outputs)
+    ]
+
+
 async def get_valuation(db: AsyncSession, valuation_id: str) -> Valuation | None:
     result = await db.execute(select(Valuation).where(Valuation.id == valuation_id))
     return result.scalar_one_or_none()
@@ -205,24 +659,107 @@ async def get_valuation(db: AsyncSession, valuation_id: str) -> Valuation | None
 async def list_valuations(
     db: AsyncSession,
     company_id: str | None = None,
-    skip: int = 0,
-    limit: int = 50,
-) -> tuple[list[Valuation], int]:
-    from sqlalchemy import func
-
+    page: PageRequest | None = None,
+) -> Page:
     query = select(Valuation)
-    count_query = select(func.count(Valuation.id))
 
     if company_id:
         query = query.where(Valuation.company_id == company_id)
-        count_query = count_query.where(Valuation.company_id == company_id)
 
-    total = (await db.execute(count_query)).scalar()
-    result = await db.execute(query.order_by(Valuation.created_at.desc()).offset(skip).limit(limit))
-    return list(result.scalars().all()), total
+    return await paginate(db, query, Valuation.created_at, Valuation.id, page or PageRequest())
+
+
+_DCF_STAGES = ("projections", "pv_fcf_total", "terminal_value", "pv_terminal_value", "enterprise_value", "equity_value")
+
+# First stage that has to be re-run when an input is overridden
+_DCF_INPUT_STAGE = {
+    "base_revenue": "projections",
+    "tax_rate": "projections",
+    "capex_pct_revenue": "projections",
+    "nwc_pct_revenue": "projections",
+    "discount_rate": "pv_fcf_total",
+    "terminal_growth_rate": "terminal_value",
+    "net_debt": "equity_value",
+}
+
+
+def apply_dcf_override(
+    inputs: DCFInputs,
+    outputs: dict,
+    field_name: str,
+    value: float,
+    pinned: dict[str, float] | None = None,
+) -> dict:
+    """Re-run only the DCF terms downstream of ``field_name``.
+
+    ``field_name`` is either a scalar input or one of the output terms in
+    ``_DCF_STAGES``; an overridden output term is pinned and only the stages
+    after it are recomputed. ``pinned`` holds output terms overridden
+    earlier, which keep their values. Every other term is recomputed at full
+    precision and rounded only when stored, so the result matches a plain
+    run at the same inputs.
+    """
+    pinned = dict(pinned or {})
+    if field_name in _DCF_INPUT_STAGE:
+        inputs = inputs.model_copy(update={field_name: value})
+        todo = _DCF_STAGES[_DCF_STAGES.index(_DCF_INPUT_STAGE[field_name]):]
+    elif field_name in _DCF_STAGES[1:]:
+        pinned[field_name] = value
+        todo = _DCF_STAGES[_DCF_STAGES.index(field_name) + 1:]
+    else:
+        raise ValueError(f"{field_name} cannot be overridden on a DCF valuation")
+
+    r = inputs.discount_rate
+    g = inputs.terminal_growth_rate
+    n = inputs.projection_years
+    if "terminal_value" in todo and "terminal_value" not in pinned and r <= g:
+        raise ValueError("discount_rate must exceed terminal_growth_rate")
+
+    out = run_dcf(inputs) if "projections" in todo else copy.deepcopy(outputs)
+    arrays = _dcf_arrays([inputs])
+    if "pv_fcf_total" in todo and "projections" not in todo:
+        for p in out["projections"]:
+            p["discount_factor"] = round(float(arrays["discount_factor"][0, p["year"] - 1]), 4)
+            p["pv_fcf"] = round(float(arrays["pv_fcf"][0, p["year"] - 1]), 2)
+
+    terms = {"pv_fcf_total": pinned.get("pv_fcf_total", float(arrays["pv_fcf_total"][0]))}
+    terms["terminal_value"] = pinned.get("terminal_value", float(arrays["terminal_value"][0]))
+    terms["pv_terminal_value"] = pinned.get("pv_terminal_value", terms["terminal_value"] / (1 + r) ** n)
+    terms["enterprise_value"] = pinned.get("enterprise_value", terms["pv_fcf_total"] + terms["pv_terminal_value"])
+    terms["equity_value"] = pinned.get("equity_value", terms["enterprise_value"] - inputs.net_debt)
+
+    for name in todo[1:] if todo[0] == "projections" else todo:
+        out[name] = pinned[name] if name in pinned else round(terms[name], 2)
+    if "enterprise_value" in todo:
+        first_ebitda = float(arrays["ebitda"][0, 0])
+        out["implied_ev_ebitda"] = round(terms["enterprise_value"] / first_ebitda, 2) if first_ebitda else None
+    return out
+
+
+async def _apply_override(db: AsyncSession, valuation: Valuation, field_name: str, value: float):
+    overrides = {**valuation.outputs.get("overrides", {}), field_name: value}
+
+    if valuation.method == ValuationMethod.dcf:
+        metrics = await get_latest_metrics(db, valuation.company_id)
+        inputs = _resolve_dcf_inputs(DCFInputs(**valuation.inputs), metrics)
+        inputs = inputs.model_copy(update={k: v for k, v in overrides.items() if k in _DCF_INPUT_STAGE})
+        pinned = {k: v for k, v in overrides.items() if k in _DCF_STAGES and k != field_name}
+        outputs = apply_dcf_override(inputs, valuation.outputs, field_name, value, pinned)
+        valuation.enterprise_value = outputs.get("enterprise_value")
+        valuation.equity_value = outputs.get("equity_value")
+        valuation.implied_multiple = outputs.get("implied_ev_ebitda")
+    else:
+        outputs = copy.deepcopy(valuation.outputs)
+        if field_name in ("enterprise_value", "equity_value"):
+            setattr(valuation, field_name, value)
+
+    outputs["overrides"] = overrides
+    valuation.outputs = outputs
 
 
 async def add_override(db: AsyncSession, valuation_id: str, data: OverrideCreate) -> ValuationOverride:
+    valuation = await get_valuation(db, valuation_id)
+    await _apply_override(db, valuation, data.field_name, data.override_value)
     override = ValuationOverride(valuation_id=valuation_id, **data.model_dump())
     db.add(override)
     await db.flush()
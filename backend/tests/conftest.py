@@ -1,6 +1,7 @@
 import os
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite://"
 os.environ["DATABASE_URL_SYNC"] = "sqlite://"
+os.environ["LLM_CACHE_ENABLED"] = "false"
 
 import asyncio
 import pytest
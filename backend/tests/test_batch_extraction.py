@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.ai import llm_client
+
+
+class FakeBatchServer(BaseHTTPRequestHandler):
+    """Minimal files + batches API: batches reach ``final_status`` on their second poll."""
+
+    uploads: dict[str, list[dict]] = {}
+    batches: dict[str, dict] = {}
+    final_status = "completed"
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            # Pull the JSONL lines out of the multipart body
+            lines = [json.loads(l) for l in data.decode().splitlines() if l.startswith('{"custom_id"')]
+            file_id = f"file-{len(self.uploads)}"
+            self.uploads[file_id] = lines
+            self._send({"id": file_id, "object": "file", "bytes": len(data), "created_at": 0,
+                        "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+        elif self.path == "/v1/batches":
+            body = json.loads(data)
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {"id": batch_id, "status": "validating", "polls": 0, **body}
+            self._send(self.batches[batch_id])
+
+    def do_GET(self):
+        if self.path.startswith("/v1/batches/"):
+            batch = self.batches[self.path.rsplit("/", 1)[1]]
+            batch["polls"] += 1
+            if batch["polls"] > 1 and self.final_status != "completed":
+                batch["status"] = self.final_status
+            elif batch["polls"] > 1:
+                batch.update(status="completed", output_file_id=f"out-{batch['input_file_id']}")
+            else:
+                batch["status"] = "in_progress"
+            self._send(batch)
+        elif self.path.startswith("/v1/files/out-"):
+            file_id = self.path.split("/")[3][len("out-"):]
+            lines = [json.dumps(self._answer(r)) for r in self.uploads[file_id]]
+            self._send_raw("\n".join(lines).encode())
+
+    @staticmethod
+    def _answer(request: dict) -> dict:
+        content = json.dumps({"extractions": [{
+            "field_name": "revenue", "field_value": "50000000", "field_type": "currency",
+            "confidence_score": 0.95, "context_snippet": "Revenue: $50,000,000",
+        }]})
+        return {
+            "id": f"resp-{request['custom_id']}",
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+            "error": None,
+        }
+
+    def _send(self, payload: dict):
+        self._send_raw(json.dumps(payload).encode(), "application/json")
+
+    def _send_raw(self, data: bytes, content_type: str = "application/octet-stream"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def batch_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBatchServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeBatchServer.uploads, FakeBatchServer.batches = {}, {}
+    FakeBatchServer.final_status = "completed"
+    monkeypatch.setattr(llm_client.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(llm_client.settings, "openai_base_url", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(llm_client.settings, "llm_batch_poll_seconds", 0)
+    llm_client.reset_llm_client()
+    yield FakeBatchServer
+    server.shutdown()
+    llm_client.reset_llm_client()
+
+
+@pytest.mark.asyncio
+async def test_batch_extraction_completes_pending_documents(db, batch_server):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs as jobs, ingestion
+    from app.services.batch_extraction import run_extraction_batch
+
+    job_ids = []
+    for i in range(3):
+        doc = await ingestion.save_upload(db, f"memo{i}.txt", f"Memo {i}\nRevenue: $50,000,000".encode())
+        job_ids.append((await jobs.enqueue_extraction(db, doc.id)).id)
+    await db.commit()
+
+    summary = await run_extraction_batch(db)
+    assert summary["completed"] == 3
+    assert summary["failed"] == 0
+    assert summary["requests"] == 3
+
+    [batch] = batch_server.batches.values()
+    assert batch["endpoint"] == "/v1/chat/completions"
+    assert batch["polls"] == 2
+
+    for job_id in job_ids:
+        job = await jobs.get_job(db, job_id)
+        assert job.status == ProcessingStatus.completed
+        doc = await ingestion.get_document(db, job.document_id)
+        assert doc.processing_status == ProcessingStatus.completed
+        [extraction] = await ingestion.get_extractions(db, doc.id)
+        assert extraction.field_value == "50000000"
+
+    assert (await run_extraction_batch(db))["batch_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_batch_extraction_isolates_a_failing_document(db, batch_server):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs as jobs, ingestion
+    from app.services.batch_extraction import run_extraction_batch
+
+    job_ids = []
+    for i in range(3):
+        doc = await ingestion.save_upload(db, f"memo{i}.txt", f"Memo {i}\nRevenue: $5{i},000,000".encode())
+        job_ids.append((await jobs.enqueue_extraction(db, doc.id)).id)
+        if i == 1:
+            missing = doc.file_path
+    await db.commit()
+    os.remove(missing)
+
+    summary = await run_extraction_batch(db)
+    assert (summary["completed"], summary["failed"], summary["requests"]) == (2, 1, 2)
+
+    statuses = [(j.status, j.attempts) for j in [await jobs.get_job(db, job_id) for job_id in job_ids]]
+    # The failed job is requeued once, not retried within the same run
+    assert statuses == [
+        (ProcessingStatus.completed, 1), (ProcessingStatus.pending, 1), (ProcessingStatus.completed, 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_extraction_requeues_jobs_of_an_expired_batch(db, batch_server):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs as jobs, ingestion
+    from app.services.batch_extraction import run_extraction_batch
+
+    batch_server.final_status = "expired"
+    job_ids = []
+    for i in range(2):
+        doc = await ingestion.save_upload(db, f"memo{i}.txt", f"Memo {i}\nRevenue: $50,000,000".encode())
+        job_ids.append((await jobs.enqueue_extraction(db, doc.id)).id)
+    await db.commit()
+
+    summary = await run_extraction_batch(db)
+    assert (summary["completed"], summary["failed"], summary["requests"]) == (0, 2, 2)
+
+    for job_id in job_ids:
+        job = await jobs.get_job(db, job_id)
+        assert (job.status, job.attempts) == (ProcessingStatus.pending, 1)
+        assert "expired" in job.error_message
+        assert await ingestion.get_extractions(db, job.document_id) == []
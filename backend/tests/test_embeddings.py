@@ -0,0 +1,96 @@
+import pytest
+
+from app.ai import embeddings
+from app.ai.document_parser import PAGE_BREAK
+
+
+def test_chunks_keep_pages_and_whole_lines():
+    rows = "\n".join(f"Revenue line {i:03d}    1,234,567.89    2,345,678.90" for i in range(40))
+    text = PAGE_BREAK.join(["Cover page\n\nIntro paragraph.", rows])
+
+    chunks = list(embeddings.iter_chunks(text, chunk_size=300, overlap=120))
+    assert chunks[0] == embeddings.TextChunk("Cover page\n\nIntro paragraph.", 1)
+    assert all(c.page == 2 for c in chunks[1:])
+    assert all(len(c.text) <= 300 + 120 for c in chunks)
+    for chunk in chunks[1:]:
+        for line in chunk.text.splitlines():
+            assert line.endswith("2,345,678.90")
+    # Consecutive chunks on a page share their boundary line
+    assert chunks[2].text.splitlines()[0] in chunks[1].text
+
+    assert list(embeddings.iter_chunks(iter(["a", "", "b"]), chunk_size=10)) == [
+        embeddings.TextChunk("a", 1), embeddings.TextChunk("b", 3),
+    ]
+    assert [c.page for c in embeddings.iter_chunks("no breaks here")] == [None]
+
+
+class FakeCollection:
+    def __init__(self):
+        self.upserts = []
+        self.deleted = []
+
+    def delete(self, where):
+        self.deleted.append(where)
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.upserts.append((ids, documents, embeddings, metadatas))
+
+
+@pytest.mark.asyncio
+async def test_index_document_embeds_in_batches(monkeypatch):
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(len(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    embeddings.register_embedding_function("fake-model", lambda model: fake_embed)
+    monkeypatch.setattr(embeddings.settings, "embedding_model", "fake-model")
+    monkeypatch.setattr(embeddings.settings, "embedding_batch_size", 4)
+    service = embeddings.EmbeddingService()
+    service._collection = FakeCollection()
+
+    pages = (f"Page {n} paragraph one.\n\nPage {n} paragraph two." for n in range(1, 6))
+    count = await service.index_document("doc-1", pages, {"company_id": "c1"})
+
+    assert count == 5
+    assert calls == [4, 1]
+    assert service._collection.deleted == [{"document_id": "doc-1"}]
+    ids, documents, vectors, metadatas = service._collection.upserts[1]
+    assert ids == ["doc-1_chunk_4"]
+    assert vectors == [[float(len(documents[0])), 1.0]]
+    assert metadatas == [{"document_id": "doc-1", "chunk_index": 4, "company_id": "c1", "page_number": 5}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_share_one_query(monkeypatch):
+    import asyncio
+    import threading
+
+    class QueryCollection:
+        def __init__(self):
+            self.queries = []
+            self.threads = set()
+
+        def query(self, query_embeddings, n_results, where=None):
+            self.queries.append(len(query_embeddings))
+            self.threads.add(threading.current_thread().name)
+            return {
+                "documents": [[f"hit for {v[0]:.0f}"] for v in query_embeddings],
+                "metadatas": [[{"document_id": "d"}] for _ in query_embeddings],
+                "distances": [[0.1] for _ in query_embeddings],
+            }
+
+    embeddings.register_embedding_function("fake-model", lambda model: lambda texts: [[float(len(t))] for t in texts])
+    monkeypatch.setattr(embeddings.settings, "embedding_model", "fake-model")
+    service = embeddings.EmbeddingService()
+    service._collection = QueryCollection()
+
+    results = await asyncio.gather(*(service.search("q" * n) for n in range(1, 6)))
+    assert [r[0]["text"] for r in results] == [f"hit for {n}" for n in range(1, 6)]
+    assert service._collection.queries == [5]
+    assert all(name.startswith("chroma") for name in service._collection.threads)
+
+    await service.search("filtered", where={"company_id": "c1"})
+    assert service._collection.queries == [5, 1]
+    service.close()
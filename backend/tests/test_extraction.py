@@ -32,6 +32,28 @@ def test_rule_based_no_match():
     assert len(results) == 0
 
 
+def test_rule_based_units_pages_and_scoring():
+    from app.ai.llm_extractor import scan_rule_candidates
+
+    text = (
+        "Revenue 12% higher year on year. EBITDA margin 25%.\n"
+        "Revenue of $48 million was reported in the summary."
+        "\n\n---PAGE BREAK---\n\n"
+        "Total revenue: $52.5m\nEBITDA: 12,000k\nNet income was 1.2bn"
+    )
+    candidates = scan_rule_candidates(text)
+    assert [(c["field_name"], c["field_value"], c["page_number"]) for c in candidates] == [
+        ("revenue", "48000000", 1),
+        ("revenue", "52500000", 2),
+        ("ebitda", "12000000", 2),
+        ("net_income", "1200000000", 2),
+    ]
+
+    best = {r["field_name"]: r for r in _rule_based_extract(text, None)}
+    assert best["revenue"]["field_value"] == "52500000"
+    assert best["revenue"]["confidence_score"] > candidates[0]["confidence_score"]
+
+
 def test_validate_extraction_financial():
     data = {
         "revenue": 150_000_000,
@@ -53,3 +75,216 @@ def test_coerce_numeric():
     assert coerce_numeric(None) is None
     assert coerce_numeric("abc") is None
     assert coerce_numeric(42) == 42.0
+
+
+STATEMENT_TEXT = """Acme Corp Consolidated Income Statement
+($ in thousands) FY2022 FY2023 FY2024
+Revenue 100,000 120,000 150,000
+Cost of sales (40,000) (48,000) (60,000)
+Revenue growth 10% 20% 25%
+EBITDA 25,000 30,000 37,500
+Employees 2000 2050 2100
+Net income 15,000 18,000 -
+"""
+
+
+def test_table_extraction_from_text():
+    from app.ai.table_extractor import extract_tables_sync
+
+    results = extract_tables_sync("statement.pdf", "pdf", ["Cover page", STATEMENT_TEXT])
+    values = {(r["field_name"], r["period"]): r["field_value"] for r in results}
+
+    assert values[("revenue", "FY2022")] == "100000000"
+    assert values[("revenue", "FY2024")] == "150000000"
+    assert values[("cost_of_goods_sold", "FY2023")] == "-48000000"
+    assert values[("ebitda", "FY2024")] == "37500000"
+    assert values[("net_income", "FY2023")] == "18000000"
+    assert ("net_income", "FY2024") not in values
+    assert len(results) == 11
+    assert all(r["extraction_method"] == "table_parse" and r["page_number"] == 2 for r in results)
+
+
+def test_table_extraction_signs_losses_and_skips_margin_ratios():
+    from app.ai.table_extractor import extract_tables_sync
+
+    pages = [
+        "($ in thousands) FY2023 FY2024\nGross margin 42.0% 45.5%\nNet loss 5,000 (2,000)\n",
+        "USD millions FY2023 FY2024\nGross margin (%) 42.0 45.5\n",
+        "USD millions FY2023 FY2024\nGross margin 0.42 0.455\n",
+        "USD millions FY2023 FY2024\nGross margin 21.0 27.3\n",
+    ]
+    results = extract_tables_sync("statement.pdf", "pdf", pages)
+    values = {(r["field_name"], r["period"]): r["field_value"] for r in results}
+
+    assert values[("net_income", "FY2023")] == "-5000000"
+    assert values[("net_income", "FY2024")] == "-2000000"
+    assert values[("gross_profit", "FY2023")] == "21000000"
+    assert [r["page_number"] for r in results if r["field_name"] == "gross_profit"] == [4, 4]
+
+
+def test_table_extraction_from_excel(tmp_path):
+    import openpyxl
+    from datetime import datetime
+    from app.ai.table_extractor import extract_tables_sync
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Balance Sheet"
+    ws.append(["USD millions"])
+    ws.append(["", datetime(2023, 12, 31), datetime(2024, 12, 31)])
+    ws.append(["Cash and cash equivalents", 12.5, 18])
+    ws.append(["Total assets", 240, 275])
+    ws.append(["Total debt", 45, 40])
+    path = tmp_path / "model.xlsx"
+    wb.save(path)
+
+    results = extract_tables_sync(str(path), "xlsx")
+    values = {(r["field_name"], r["period"]): r["field_value"] for r in results}
+    assert values[("cash_and_equivalents", "2023-12-31")] == "12500000"
+    assert values[("total_assets", "2024-12-31")] == "275000000"
+    assert values[("total_debt", "2024-12-31")] == "40000000"
+    assert results[0]["page_number"] is None
+
+
+def test_parse_period_labels():
+    from datetime import date
+    from app.ai.table_extractor import parse_period, period_end
+
+    assert parse_period("FY24") == "FY2024"
+    assert parse_period("Q3 2024") == "Q3 2024"
+    assert parse_period("Dec-23") == "2023-12-31"
+    assert parse_period("Revenue") is None
+    assert period_end("Q3 2024") == date(2024, 9, 30)
+    assert period_end("H1 2024") == date(2024, 6, 30)
+
+
+@pytest.mark.asyncio
+async def test_table_fields_skip_llm(monkeypatch):
+    from app.ai import llm_extractor
+    from app.ai.table_extractor import extract_tables_sync
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(llm_extractor.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(llm_extractor, "_llm_extract", fail)
+
+    tables = extract_tables_sync("statement.txt", "txt", [STATEMENT_TEXT])
+    results = await llm_extractor.extract_fields(STATEMENT_TEXT, "financial_statement", tables)
+    assert {r["extraction_method"] for r in results} == {"table_parse"}
+
+
+def test_chunk_document_keeps_pages():
+    from app.ai.document_parser import PAGE_BREAK
+    from app.ai.llm_extractor import chunk_document
+
+    pages = [f"Page {i} " + "x" * 400 for i in range(1, 11)]
+    chunks = chunk_document(PAGE_BREAK.join(pages), max_chars=1000)
+    assert len(chunks) == 5
+    assert (chunks[0].first_page, chunks[0].last_page) == (1, 2)
+    assert (chunks[-1].first_page, chunks[-1].last_page) == (9, 10)
+    assert all(len(c.text) <= 1000 for c in chunks)
+
+
+def test_select_chunks_falls_back_and_warns_on_truncation(caplog):
+    from app.ai.llm_extractor import EXTRACTION_SCHEMAS, Chunk, select_chunks
+
+    schema = EXTRACTION_SCHEMAS["financial_statement"]
+    unrelated = [Chunk(f"Chapter {i}: lorem ipsum", i, i) for i in range(1, 6)]
+    assert select_chunks(unrelated, schema, limit=2) == unrelated[:2]
+
+    relevant = [Chunk(f"Revenue and EBITDA for segment {i}", i, i) for i in range(1, 6)]
+    with caplog.at_level("WARNING", logger="app.ai.llm_extractor"):
+        assert len(select_chunks(relevant, schema, limit=3)) == 3
+    assert "3 of 5 relevant chunks" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_llm_extract_maps_relevant_chunks_and_merges(monkeypatch):
+    import asyncio
+    from app.ai import llm_extractor
+    from app.ai.document_parser import PAGE_BREAK
+
+    pages = ["Table of contents " * 50] * 30
+    pages[4] = "Revenue was strong. Revenue: 50m"
+    pages[25] = "Audited revenue: 52m and EBITDA 12m"
+    seen, active, peak = [], 0, 0
+
+    async def fake_chunk(messages):
+        nonlocal active, peak
+        text = messages[-1]["content"]
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        seen.append(text)
+        if "Audited" in text:
+            return [
+                {"field_name": "revenue", "field_value": "52000000", "confidence_score": 0.95},
+                {"field_name": "ebitda", "field_value": "12000000", "confidence_score": 0.9},
+            ]
+        return [{"field_name": "revenue", "field_value": "50000000", "confidence_score": 0.7}]
+
+    monkeypatch.setattr(llm_extractor.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(llm_extractor.settings, "llm_chunk_chars", 1000)
+    monkeypatch.setattr(llm_extractor.settings, "llm_concurrency", 1)
+    monkeypatch.setattr(llm_extractor, "_llm_extract_chunk", fake_chunk)
+
+    results = await llm_extractor._llm_extract(PAGE_BREAK.join(pages), "financial_statement")
+    by_field = {r["field_name"]: r for r in results}
+
+    assert len(seen) == 2
+    assert peak == 1
+    assert by_field["revenue"]["field_value"] == "52000000"
+    assert by_field["ebitda"]["field_value"] == "12000000"
+
+
+@pytest.mark.asyncio
+async def test_llm_response_cache(monkeypatch, tmp_path):
+    from app.ai import llm_extractor
+
+    calls = []
+
+    async def fake_chunk(messages):
+        calls.append(messages)
+        return [{"field_name": "revenue", "field_value": "50000000", "confidence_score": 0.9}]
+
+    monkeypatch.setattr(llm_extractor.settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(llm_extractor.settings, "llm_cache_path", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_extractor, "_llm_extract_chunk", fake_chunk)
+    monkeypatch.setattr(llm_extractor, "response_cache", llm_extractor.LLMResponseCache())
+    cache = llm_extractor.response_cache
+    text = "Revenue for the year was 50 million."
+
+    first = await llm_extractor._llm_extract(text, "financial_statement")
+    second = await llm_extractor._llm_extract(text, "financial_statement")
+    assert first == second
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+    await llm_extractor._llm_extract(text, "financial_statement", use_cache=False)
+    assert len(calls) == 2
+
+    # A different schema produces a different prompt, so it misses
+    await llm_extractor._llm_extract(text, "default")
+    assert len(calls) == 3
+
+    monkeypatch.setattr(llm_extractor.settings, "llm_cache_ttl_seconds", -1)
+    await llm_extractor._llm_extract(text, "financial_statement")
+    assert len(calls) == 4
+
+
+def test_llm_response_cache_evicts_least_recently_used(monkeypatch, tmp_path):
+    from app.ai import llm_extractor
+
+    monkeypatch.setattr(llm_extractor.settings, "llm_cache_path", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_extractor.settings, "llm_cache_max_entries", 2)
+    cache = llm_extractor.LLMResponseCache()
+
+    cache._put("a", [])
+    cache._put("b", [])
+    assert cache._get("a") == []
+    cache._put("c", [])
+    assert cache._get("b") is None
+    assert cache._get("a") == []
+    assert cache._get("c") == []
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from httpx import AsyncClient
 
@@ -19,6 +21,72 @@ async def test_upload_document(client: AsyncClient, tmp_path):
     assert doc["file_type"] == "txt"
 
 
+@pytest.mark.asyncio
+async def test_upload_streams_to_disk_with_hash(db, tmp_path):
+    import hashlib
+    from app.services import ingestion
+
+    chunks = [b"a" * 1000, b"b" * 1000, b"c" * 500]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    doc = await ingestion.save_upload(db, "big.txt", stream())
+    assert doc.file_size == 2500
+    assert doc.content_hash == hashlib.sha256(b"".join(chunks)).hexdigest()
+    with open(doc.file_path, "rb") as f:
+        assert f.read() == b"".join(chunks)
+
+
+@pytest.mark.asyncio
+async def test_upload_too_large_aborts_and_cleans_up(tmp_path):
+    from app.services import ingestion
+
+    consumed = []
+
+    async def stream():
+        for i in range(10):
+            consumed.append(i)
+            yield b"x" * 100
+
+    path = tmp_path / "partial.bin"
+    with pytest.raises(ingestion.UploadTooLarge):
+        await ingestion.write_stream(stream(), path, max_bytes=250)
+    assert len(consumed) == 3
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload_is_parsed_while_streaming(client: AsyncClient, monkeypatch, tmp_path):
+    import hashlib
+    from app.services import ingestion
+
+    monkeypatch.setattr(ingestion.settings, "upload_dir", str(tmp_path))
+    res = await client.post(
+        "/api/documents/upload",
+        files={"file": ("memo.txt", b"Revenue: $1,000", "text/plain")},
+        data={"document_type": "valuation_memo"},
+    )
+    assert res.status_code == 201
+    assert (res.json()["filename"], res.json()["document_type"]) == ("memo.txt", "valuation_memo")
+
+    res = await client.post(
+        "/api/documents/upload",
+        files={"file": ("memo.txt", b"x", "text/plain")},
+        data={"document_type": "napkin"},
+    )
+    assert res.status_code == 422
+    res = await client.post("/api/documents/upload", data={"company_id": "abc"})
+    assert res.status_code == 422
+
+    monkeypatch.setattr(ingestion.settings, "max_upload_size_mb", 0)
+    res = await client.post("/api/documents/upload", files={"file": ("big.txt", b"x" * 1000, "text/plain")})
+    assert res.status_code == 413
+    # Rejected uploads leave no partial or orphaned files behind
+    assert [p.name for p in tmp_path.iterdir()] == [f"{hashlib.sha256(b'Revenue: $1,000').hexdigest()}.txt"]
+
+
 @pytest.mark.asyncio
 async def test_list_documents(client: AsyncClient):
     res = await client.get("/api/documents")
@@ -32,3 +100,267 @@ async def test_list_documents(client: AsyncClient):
 async def test_document_not_found(client: AsyncClient):
     res = await client.get("/api/documents/00000000-0000-0000-0000-000000000000")
     assert res.status_code == 404
+
+
+async def _upload(client: AsyncClient, tmp_path) -> dict:
+    test_file = tmp_path / "report.txt"
+    test_file.write_text("Revenue: $50,000,000\nEBITDA: $12,500,000")
+    with open(test_file, "rb") as f:
+        res = await client.post(
+            "/api/documents/upload",
+            files={"file": ("report.txt", f, "text/plain")},
+        )
+    return res.json()
+
+
+@pytest.mark.asyncio
+async def test_upload_enqueues_extraction_job(client: AsyncClient, tmp_path):
+    doc = await _upload(client, tmp_path)
+
+    res = await client.get(f"/api/documents/{doc['id']}/jobs")
+    assert res.status_code == 200
+    jobs = res.json()["jobs"]
+    assert len(jobs) == 1
+    assert jobs[0]["status"] == "pending"
+    assert jobs[0]["attempts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_and_retry_job(client: AsyncClient, tmp_path):
+    doc = await _upload(client, tmp_path)
+    job_id = (await client.get(f"/api/documents/{doc['id']}/jobs")).json()["jobs"][0]["id"]
+
+    res = await client.post(f"/api/documents/jobs/{job_id}/retry")
+    assert res.status_code == 409
+
+    res = await client.post(f"/api/documents/jobs/{job_id}/cancel")
+    assert res.status_code == 200
+    assert res.json()["status"] == "failed"
+    assert res.json()["error_message"] == "Cancelled"
+
+    res = await client.post(f"/api/documents/jobs/{job_id}/retry")
+    assert res.status_code == 200
+    assert res.json()["status"] == "pending"
+    assert res.json()["error_message"] is None
+
+
+@pytest.mark.asyncio
+async def test_run_extraction_job(db, tmp_path):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs, ingestion
+
+    doc = await ingestion.save_upload(
+        db, "report.txt", b"Revenue: $50,000,000\nEBITDA: $12,500,000\nNet Income: $8,000,000",
+    )
+    await extraction_jobs.enqueue_extraction(db, doc.id)
+    await db.commit()
+
+    job = await extraction_jobs.claim_next_job(db)
+    assert job.status == ProcessingStatus.parsing
+    assert job.attempts == 1
+    assert await extraction_jobs.claim_next_job(db) is None
+
+    await extraction_jobs.run_job(db, job)
+    assert job.status == ProcessingStatus.completed
+    assert job.progress == 1.0
+
+    doc = await ingestion.get_document(db, doc.id)
+    assert doc.processing_status == ProcessingStatus.completed
+    assert len(await ingestion.get_extractions(db, doc.id)) > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_until_max_attempts(db):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs, ingestion
+
+    doc = await ingestion.save_upload(db, "missing.txt", b"x")
+    job = await extraction_jobs.enqueue_extraction(db, doc.id)
+    job.max_attempts = 2
+    await db.commit()
+    os.remove(doc.file_path)
+
+    for expected in (ProcessingStatus.pending, ProcessingStatus.failed):
+        job = await extraction_jobs.claim_next_job(db)
+        await extraction_jobs.run_job(db, job)
+        assert job.status == expected
+    doc = await ingestion.get_document(db, doc.id)
+    assert doc.processing_status == ProcessingStatus.failed
+
+
+@pytest.mark.asyncio
+async def test_sync_extract_closes_queued_job(client: AsyncClient, tmp_path):
+    doc = await _upload(client, tmp_path)
+    res = await client.post(f"/api/documents/{doc['id']}/extract")
+    assert res.status_code == 200
+
+    jobs = (await client.get(f"/api/documents/{doc['id']}/jobs")).json()["jobs"]
+    assert [(j["status"], j["attempts"]) for j in jobs] == [("completed", 0)]
+
+
+@pytest.mark.asyncio
+async def test_job_skips_document_extracted_after_it_was_queued(db):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs, ingestion
+
+    doc = await ingestion.save_upload(db, "report.txt", b"Revenue: $50,000,000\nEBITDA: $12,500,000")
+    await extraction_jobs.enqueue_extraction(db, doc.id)
+    await db.commit()
+    extracted = await extraction_jobs.process_document(db, doc)
+    await db.commit()
+
+    job = await extraction_jobs.claim_next_job(db)
+    await extraction_jobs.run_job(db, job)
+    assert job.status == ProcessingStatus.completed
+    assert len(await ingestion.get_extractions(db, doc.id)) == len(extracted)
+
+
+@pytest.mark.asyncio
+async def test_stale_claims_are_reclaimed(db):
+    from datetime import datetime, timedelta
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs, ingestion
+
+    doc = await ingestion.save_upload(db, "report.txt", b"Revenue: $50,000,000")
+    job = await extraction_jobs.enqueue_extraction(db, doc.id)
+    job.max_attempts = 2
+    await db.commit()
+
+    for attempt in (1, 2):
+        job = await extraction_jobs.claim_next_job(db)
+        assert (job.status, job.attempts) == (ProcessingStatus.parsing, attempt)
+        assert await extraction_jobs.claim_next_job(db) is None
+        # The worker dies without checkpointing
+        job.claimed_at = datetime.utcnow() - timedelta(hours=1)
+        await db.commit()
+
+    assert await extraction_jobs.claim_next_job(db) is None
+    await db.refresh(job)
+    assert job.status == ProcessingStatus.failed
+    assert job.error_message == extraction_jobs.ABANDONED
+    doc = await ingestion.get_document(db, doc.id)
+    assert doc.processing_status == ProcessingStatus.failed
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_reuses_blob_and_extractions(db, monkeypatch):
+    from app.models.document import ProcessingStatus
+    from app.services import extraction_jobs, ingestion
+
+    content = b"Revenue: $72,000,000\nEBITDA: $18,000,000"
+    first = await ingestion.save_upload(db, "q3.txt", content)
+    second = await ingestion.save_upload(db, "q3-copy.txt", content)
+    assert first.file_path == second.file_path
+    assert first.content_hash == second.content_hash
+
+    await extraction_jobs.process_document(db, first)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("duplicate content should not be re-parsed")
+
+    monkeypatch.setattr("app.ai.document_parser.parse_document_pages", fail)
+    extractions = await extraction_jobs.process_document(db, second)
+
+    original = await ingestion.get_extractions(db, first.id)
+    assert sorted(e.field_name for e in extractions) == sorted(e.field_name for e in original)
+    second = await ingestion.get_document(db, second.id)
+    assert second.processing_status == ProcessingStatus.completed
+    assert second.raw_text == first.raw_text
+
+
+def _write_pdf(path, page_texts: list[str]):
+    """Minimal PDF with one line of Helvetica text per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+@pytest.mark.asyncio
+async def test_parallel_pdf_parse_keeps_page_order(tmp_path, monkeypatch):
+    from app.ai import document_parser
+
+    monkeypatch.setattr(document_parser.settings, "pdf_pages_per_task", 2)
+    path = tmp_path / "annual.pdf"
+    _write_pdf(path, [f"Page {i} text" for i in range(1, 8)])
+
+    progress = []
+
+    async def on_progress(done, total):
+        progress.append((done, total))
+
+    parsed = await document_parser.parse_document_pages(str(path), "pdf", on_progress)
+    assert parsed.page_count == 7
+    assert [p.strip() for p in parsed.pages] == [f"Page {i} text" for i in range(1, 8)]
+    assert len(progress) == 4
+    assert progress[-1] == (7, 7)
+    assert parsed.page_number("Page 5 text") == 5
+    assert parsed.page_number("not in document") is None
+
+
+@pytest.mark.asyncio
+async def test_extractions_get_page_numbers(db, tmp_path):
+    from app.services import extraction_jobs, ingestion
+
+    path = tmp_path / "report.pdf"
+    _write_pdf(path, ["Management overview", "Revenue: $50,000,000", "EBITDA: $12,500,000"])
+    doc = await ingestion.save_upload(db, "report.pdf", path.read_bytes())
+
+    extractions = await extraction_jobs.process_document(db, doc)
+    pages = {e.field_name: e.page_number for e in extractions}
+    assert pages["revenue"] == 2
+    assert pages["ebitda"] == 3
+
+
+def _write_workbook(path):
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "P&L"
+    ws.append(["Metric", "FY2023", "FY2024"])
+    ws.append([])
+    ws.append(["Revenue", 120, 150])
+    ws.append(["EBITDA", 30, None])
+    wb.create_sheet("Empty")
+    notes = wb.create_sheet("Notes")
+    notes["C5"] = "Audited"
+    wb.save(path)
+
+
+def test_excel_streams_structured_cells(tmp_path):
+    from app.ai.document_parser import ExcelCell, iter_excel_cells, parse_document_sync
+
+    path = tmp_path / "model.xlsx"
+    _write_workbook(path)
+
+    cells = list(iter_excel_cells(path))
+    assert ExcelCell("P&L", 3, 1, "Revenue") in cells
+    assert ExcelCell("P&L", 3, 3, 150) in cells
+    assert ExcelCell("Notes", 5, 3, "Audited") in cells
+    assert not any(c.sheet == "Empty" for c in cells)
+    assert not any(c.row == 2 and c.sheet == "P&L" for c in cells)
+
+    text, sheet_count = parse_document_sync(str(path), "xlsx")
+    assert sheet_count == 3
+    assert text.startswith("=== Sheet: P&L ===\nMetric\tFY2023\tFY2024\nRevenue\t120\t150\nEBITDA\t30\n")
+    assert "=== Sheet: Empty ===" not in text
+    assert text.endswith("=== Sheet: Notes ===\n\t\tAudited")
@@ -0,0 +1,114 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.ai import llm_client
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    """Answers chat completions, failing the first ``failures`` requests."""
+
+    failures: list[int] = []
+    requests = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests += 1
+        if self.failures:
+            status = self.failures.pop(0)
+            self._send(status, {"error": {"message": "stub failure", "type": "rate_limit"}}, {"Retry-After": "0"})
+            return
+        self._send(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps({"extractions": []})},
+            }],
+        })
+
+    def _send(self, status: int, payload: dict, headers: dict | None = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubOpenAI.requests = 0
+    monkeypatch.setattr(llm_client.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(llm_client.settings, "openai_base_url", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(llm_client.settings, "llm_backoff_base_seconds", 0.01)
+    llm_client.reset_llm_client()
+    yield StubOpenAI
+    server.shutdown()
+    llm_client.reset_llm_client()
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_retries_rate_limits(stub_server, monkeypatch):
+    stub_server.failures = [429, 503]
+    messages = [{"role": "user", "content": "hello"}]
+    acquired = []
+    acquire = llm_client.TokenBucket.acquire
+
+    async def counting_acquire(bucket, amount=1.0):
+        acquired.append(amount)
+        await acquire(bucket, amount)
+
+    monkeypatch.setattr(llm_client.TokenBucket, "acquire", counting_acquire)
+
+    response = await llm_client.chat_completion(model="gpt-4o", messages=messages)
+    assert json.loads(response.choices[0].message.content) == {"extractions": []}
+    assert stub_server.requests == 3
+    # Each attempt, retries included, takes a request and its tokens from the limiter
+    assert acquired == [1.0, llm_client.estimate_tokens(messages)] * 3
+
+    client = llm_client.get_llm_client()
+    await llm_client.chat_completion(model="gpt-4o", messages=messages)
+    assert llm_client.get_llm_client() is client
+
+    metrics = llm_client.get_metrics()
+    assert metrics["calls"] == 2
+    assert metrics["retries"] == 2
+    assert metrics["failures"] == 0
+    assert metrics["avg_latency_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_does_not_retry_client_errors(stub_server):
+    from openai import BadRequestError
+
+    stub_server.failures = [400]
+    with pytest.raises(BadRequestError):
+        await llm_client.chat_completion(model="gpt-4o", messages=[{"role": "user", "content": "x"}])
+    assert stub_server.requests == 1
+    assert llm_client.get_metrics()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_throttles():
+    import time
+
+    bucket = llm_client.TokenBucket(rate_per_minute=600, capacity=2)
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    # Two tokens are available immediately; the next two refill at 10 per second
+    assert time.monotonic() - started >= 0.15
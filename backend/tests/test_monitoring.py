@@ -0,0 +1,248 @@
+from datetime import date
+
+import pytest
+from httpx import AsyncClient
+
+
+async def _create_company(client: AsyncClient) -> dict:
+    fund = (await client.post("/api/portfolio/funds", json={
+        "name": "Monitoring Fund", "vintage_year": 2022, "strategy": "growth_equity",
+    })).json()
+    return (await client.post("/api/portfolio/companies", json={
+        "fund_id": fund["id"], "name": "MeterCo", "sector": "technology",
+        "geography": "North America", "investment_date": "2022-03-01",
+        "initial_investment": 20_000_000, "current_valuation": 30_000_000, "ownership_pct": 25,
+    })).json()
+
+
+@pytest.mark.asyncio
+async def test_create_metrics_batch(client: AsyncClient):
+    company = await _create_company(client)
+    rows = [
+        {"company_id": company["id"], "period_date": f"{2000 + i // 12}-{i % 12 + 1:02d}-01",
+         "metric_type": "revenue", "value": float(i)}
+        for i in range(1500)
+    ]
+    res = await client.post("/api/monitoring/metrics/batch", json=rows)
+    assert res.status_code == 201
+    created = res.json()
+    assert len(created) == 1500
+    assert [m["value"] for m in created] == [float(i) for i in range(1500)]
+    assert len({m["id"] for m in created}) == 1500
+    assert created[0]["source"] == "manual"
+
+    res = await client.post("/api/monitoring/metrics", json={
+        "company_id": company["id"], "period_date": "2024-12-31", "metric_type": "ebitda", "value": 5.0,
+    })
+    assert res.status_code == 201
+    assert res.json()["created_at"]
+
+    # (company, metric type, period) is unique; the failed insert leaves the session usable
+    res = await client.post("/api/monitoring/metrics", json={
+        "company_id": company["id"], "period_date": "2024-12-31", "metric_type": "ebitda", "value": 6.0,
+    })
+    assert res.status_code == 409
+    res = await client.get(f"/api/monitoring/metrics/{company['id']}", params={"metric_type": "ebitda"})
+    assert [m["value"] for m in res.json()["metrics"]] == [5.0]
+
+
+@pytest.mark.asyncio
+async def test_promote_validated_extractions(client: AsyncClient, tmp_path):
+    company = await _create_company(client)
+    statement = tmp_path / "statement.txt"
+    statement.write_text(
+        "USD millions      FY2023    FY2024\n"
+        "Revenue           40.0      50.0\n"
+        "EBITDA            10.0      12.5\n"
+        "Total assets      90.0     100.0\n"
+    )
+    with open(statement, "rb") as f:
+        doc = (await client.post(
+            "/api/documents/upload",
+            files={"file": ("statement.txt", f, "text/plain")},
+            data={"company_id": company["id"], "document_type": "financial_statement"},
+        )).json()
+    extractions = (await client.post(f"/api/documents/{doc['id']}/extract")).json()["extractions"]
+    by_key = {(e["field_name"], e["period"]): e for e in extractions}
+
+    await client.post("/api/monitoring/metrics", json={
+        "company_id": company["id"], "period_date": "2023-12-31", "metric_type": "ebitda", "value": 9.9,
+    })
+    for key in [("revenue", "FY2023"), ("revenue", "FY2024"), ("ebitda", "FY2023"), ("total_assets", "FY2024")]:
+        await client.patch(f"/api/documents/extractions/{by_key[key]['id']}", json={
+            "validated": True, "validated_by": "analyst",
+        })
+
+    res = await client.post("/api/monitoring/metrics/promote")
+    assert res.status_code == 200
+    assert res.json() == {"processed": 4, "inserted": 2, "updated": 0, "skipped": 1, "conflicts": 1}
+
+    # Nothing new to promote: the run is a no-op
+    res = await client.post("/api/monitoring/metrics/promote")
+    assert res.json()["processed"] == 0
+
+    # A corrected value is promoted again and updates the same metric
+    await client.patch(f"/api/documents/extractions/{by_key[('revenue', 'FY2024')]['id']}", json={
+        "validated": True, "validated_by": "analyst", "corrected_value": "51000000",
+    })
+    res = await client.post("/api/monitoring/metrics/promote")
+    assert res.json() == {"processed": 1, "inserted": 0, "updated": 1, "skipped": 0, "conflicts": 0}
+
+    series = (await client.get(
+        f"/api/monitoring/metrics/{company['id']}/timeseries", params={"metric_type": "revenue"},
+    )).json()["data_points"]
+    assert series == [
+        {"date": "2023-12-31", "value": 40_000_000.0, "source": "extracted"},
+        {"date": "2024-12-31", "value": 51_000_000.0, "source": "extracted"},
+    ]
+    ebitda = (await client.get(
+        f"/api/monitoring/metrics/{company['id']}/timeseries", params={"metric_type": "ebitda"},
+    )).json()["data_points"]
+    assert ebitda == [{"date": "2023-12-31", "value": 9.9, "source": "manual"}]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_csv_reports_row_errors_and_upserts(client: AsyncClient, monkeypatch):
+    from app.services import metric_import
+
+    monkeypatch.setattr(metric_import.settings, "metric_import_batch_rows", 3)
+    company = await _create_company(client)
+    cid = company["id"]
+    csv = (
+        "company_id,period_date,metric_type,value,currency,notes\n"
+        f"{cid},2024-01-31,revenue,100,,\n"
+        f"{cid},2024-02-29,revenue,110,usd,\n"
+        f"{cid},not-a-date,revenue,120,,\n"
+        f"{cid},2024-03-31,widgets,5,,\n"
+        f"missing-co,2024-03-31,revenue,5,,\n"
+        f"{cid},2024-03-31,revenue,abc,,\n"
+        f"{cid},2024-03-31,ebitda,30,EURO,\n"
+        f"{cid},2024-03-31,revenue,130,,late close\n"
+    )
+    res = await client.post("/api/monitoring/metrics/bulk", content=csv, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 200
+    report = res.json()
+    assert (report["rows"], report["inserted"], report["updated"], report["rejected"]) == (8, 3, 0, 5)
+    assert [(e["row"], e["field"]) for e in report["errors"]] == [
+        (3, "period_date"), (4, "metric_type"), (5, "company_id"), (6, "value"), (7, "currency"),
+    ]
+
+    # Re-sending a key updates the stored metric instead of duplicating it
+    jsonl = f'{{"company_id": "{cid}", "period_date": "2024-03-31", "metric_type": "revenue", "value": 135.5, "source": "reported"}}\n'
+    res = await client.post("/api/monitoring/metrics/bulk?format=jsonl", content=jsonl)
+    assert (res.json()["inserted"], res.json()["updated"]) == (0, 1)
+
+    series = (await client.get(
+        f"/api/monitoring/metrics/{cid}/timeseries", params={"metric_type": "revenue"},
+    )).json()["data_points"]
+    assert series == [
+        {"date": "2024-01-31", "value": 100.0, "source": "manual"},
+        {"date": "2024-02-29", "value": 110.0, "source": "manual"},
+        {"date": "2024-03-31", "value": 135.5, "source": "reported"},
+    ]
+
+    res = await client.post("/api/monitoring/metrics/bulk", content="a,b\n1,2\n", headers={"Content-Type": "text/csv"})
+    assert res.status_code == 400
+    res = await client.post("/api/monitoring/metrics/bulk", content="x", headers={"Content-Type": "text/plain"})
+    assert res.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_rejects_repeated_keys_in_favour_of_the_last(client: AsyncClient):
+    cid = (await _create_company(client))["id"]
+    csv = (
+        "company_id,period_date,metric_type,value\n"
+        f"{cid},2024-03-31,revenue,100\n"
+        f"{cid},2024-03-31,ebitda,20\n"
+        f"{cid},2024-03-31,revenue,105\n"
+        f"{cid},2024-03-31,revenue,110\n"
+    )
+    res = await client.post("/api/monitoring/metrics/bulk", content=csv, headers={"Content-Type": "text/csv"})
+    report = res.json()
+    assert (report["inserted"], report["updated"], report["rejected"], report["duplicates"]) == (2, 0, 2, 2)
+    assert report["errors"] == [
+        {"row": 1, "field": None, "message": "duplicate key; row 4 is imported instead"},
+        {"row": 3, "field": None, "message": "duplicate key; row 4 is imported instead"},
+    ]
+
+    series = (await client.get(
+        f"/api/monitoring/metrics/{cid}/timeseries", params={"metric_type": "revenue"},
+    )).json()["data_points"]
+    assert [p["value"] for p in series] == [110.0]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_parquet(client: AsyncClient):
+    pa = pytest.importorskip("pyarrow")
+    import io
+    import pyarrow.parquet as pq
+
+    company = await _create_company(client)
+    table = pa.table({
+        "company_id": [company["id"]] * 4,
+        "period_date": pa.array([date(2023, q * 3, 28) for q in range(1, 5)]),
+        "metric_type": ["arr"] * 4,
+        "value": [1.0, 2.0, 3.0, 4.0],
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    res = await client.post(
+        "/api/monitoring/metrics/bulk", content=buffer.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.parquet"},
+    )
+    assert res.json()["inserted"] == 4
+
+
+@pytest.mark.asyncio
+async def test_time_series_frame_resamples_many_companies(client: AsyncClient):
+    first = await _create_company(client)
+    second = await _create_company(client)
+    rows = []
+    for month, revenue in [(1, 10), (2, 20), (3, 30), (4, 40), (5, 50), (6, 60), (8, 80)]:
+        rows.append({"company_id": first["id"], "period_date": f"2024-{month:02d}-28", "metric_type": "revenue", "value": revenue})
+    rows += [
+        {"company_id": first["id"], "period_date": "2024-03-31", "metric_type": "ebitda", "value": 15},
+        {"company_id": first["id"], "period_date": "2024-06-30", "metric_type": "ebitda", "value": 30},
+        {"company_id": second["id"], "period_date": "2024-06-30", "metric_type": "revenue", "value": 5},
+    ]
+    await client.post("/api/monitoring/metrics/batch", json=rows)
+
+    res = await client.get("/api/monitoring/timeseries", params={
+        "metric_type": ["revenue", "ebitda"], "freq": "quarter", "agg": "sum", "margins": True, "growth": True,
+    })
+    assert res.status_code == 200
+    frame = res.json()
+    assert frame["dates"] == ["2024-03-31", "2024-06-30", "2024-09-30"]
+    series = {(s["company_id"], s["metric"]): s["values"] for s in frame["series"]}
+    assert series[(first["id"], "revenue")] == [60.0, 150.0, 80.0]
+    assert series[(first["id"], "revenue_growth")] == [None, 1.5, pytest.approx(-0.4666, abs=1e-3)]
+    assert series[(first["id"], "ebitda_margin")] == [0.25, 0.2, None]
+    assert series[(second["id"], "revenue")] == [None, 5.0, None]
+
+    res = await client.get("/api/monitoring/timeseries", params={
+        "metric_type": "revenue", "company_id": first["id"], "freq": "year", "agg": "last",
+    })
+    assert res.json()["dates"] == ["2024-12-31"]
+    assert res.json()["series"] == [{"company_id": first["id"], "metric": "revenue", "values": [80.0]}]
+
+    res = await client.get("/api/monitoring/timeseries", params={"metric_type": "revenue", "freq": "month", "agg": "avg"})
+    assert res.json()["dates"][-1] == "2024-08-31"
+    assert len(res.json()["dates"]) == 8
+
+
+@pytest.mark.asyncio
+async def test_create_metrics_reports_other_constraint_violations(db):
+    from sqlalchemy import text
+
+    from app.schemas.monitoring import MetricCreate
+    from app.services import monitoring as svc
+
+    await db.execute(text("PRAGMA foreign_keys = ON"))
+    try:
+        with pytest.raises(svc.InvalidMetric):
+            await svc.create_metrics(db, [MetricCreate(
+                company_id="missing-co", period_date=date(2024, 12, 31), metric_type="ebitda", value=1.0,
+            )])
+    finally:
+        await db.rollback()
+        await db.execute(text("PRAGMA foreign_keys = OFF"))
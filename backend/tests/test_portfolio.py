@@ -43,6 +43,33 @@ async def test_create_and_list_funds(client: AsyncClient):
     assert res.json()["aum"] == 600_000_000
 
 
+@pytest.mark.asyncio
+async def test_list_funds_cursor_pagination(client: AsyncClient):
+    for i in range(5):
+        await client.post("/api/portfolio/funds", json={
+            "name": f"Paged Fund {i}", "vintage_year": 2020, "strategy": "buyout",
+        })
+
+    first = (await client.get("/api/portfolio/funds", params={"limit": 2})).json()
+    assert first["total"] == 5
+    assert first["next_cursor"]
+
+    seen = [f["id"] for f in first["funds"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = (await client.get("/api/portfolio/funds", params={"limit": 2, "cursor": cursor})).json()
+        assert page["total"] is None
+        seen.extend(f["id"] for f in page["funds"])
+        cursor = page["next_cursor"]
+    assert len(seen) == len(set(seen)) == 5
+
+    counted = (await client.get("/api/portfolio/funds", params={"cursor": first["next_cursor"], "count": "exact"})).json()
+    assert counted["total"] == 5
+
+    res = await client.get("/api/portfolio/funds", params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_create_company(client: AsyncClient):
     # Create fund first
@@ -75,6 +102,29 @@ async def test_create_company(client: AsyncClient):
     assert res.json()["total"] >= 1
 
 
+@pytest.mark.asyncio
+async def test_fund_response_aggregates(client: AsyncClient):
+    fund_id = (await client.post("/api/portfolio/funds", json={
+        "name": "Aggregate Fund", "vintage_year": 2021, "strategy": "venture_capital",
+    })).json()["id"]
+    for name, value in (("One", 30_000_000), ("Two", 12_000_000)):
+        await client.post("/api/portfolio/companies", json={
+            "fund_id": fund_id, "name": name, "sector": "technology", "geography": "Asia",
+            "investment_date": "2021-05-01", "initial_investment": 10_000_000,
+            "current_valuation": value, "ownership_pct": 10.0,
+        })
+
+    fund = (await client.get(f"/api/portfolio/funds/{fund_id}")).json()
+    assert fund["company_count"] == 2
+    assert fund["total_invested"] == 20_000_000
+    assert fund["total_value"] == 42_000_000
+
+    empty_id = (await client.post("/api/portfolio/funds", json={
+        "name": "Empty Fund", "vintage_year": 2021, "strategy": "credit",
+    })).json()["id"]
+    assert (await client.delete(f"/api/portfolio/funds/{empty_id}")).status_code == 204
+
+
 @pytest.mark.asyncio
 async def test_portfolio_summary(client: AsyncClient):
     res = await client.get("/api/portfolio/summary")
@@ -84,6 +134,44 @@ async def test_portfolio_summary(client: AsyncClient):
     assert "gross_moic" in data
 
 
+@pytest.mark.asyncio
+async def test_portfolio_summary_rollup_tracks_updates(client: AsyncClient, monkeypatch):
+    from app.services import portfolio as portfolio_svc
+
+    fund_id = (await client.post("/api/portfolio/funds", json={
+        "name": "Rollup Fund", "vintage_year": 2022, "strategy": "buyout",
+    })).json()["id"]
+    base = {
+        "fund_id": fund_id, "investment_date": "2022-01-01", "ownership_pct": 20.0,
+        "initial_investment": 10_000_000,
+    }
+    await client.post("/api/portfolio/companies", json={
+        **base, "name": "A", "sector": "technology", "geography": "Europe", "current_valuation": 20_000_000,
+    })
+
+    monkeypatch.setattr(portfolio_svc.settings, "portfolio_rollup_enabled", True)
+    # First read builds the rollup from GROUP BY aggregates
+    res = await client.get("/api/portfolio/summary")
+    assert res.json()["total_nav"] == 20_000_000
+
+    company_id = (await client.post("/api/portfolio/companies", json={
+        **base, "name": "B", "sector": "healthcare", "geography": "Europe", "current_valuation": 5_000_000,
+    })).json()["id"]
+    await client.patch(f"/api/portfolio/companies/{company_id}", json={"status": "exited"})
+
+    summary = (await client.get("/api/portfolio/summary")).json()
+    assert summary["company_count"] == 2
+    assert summary["active_companies"] == 1
+    assert summary["total_invested"] == 20_000_000
+    assert summary["total_nav"] == 20_000_000
+    sectors = {s["sector"]: s for s in summary["sector_breakdown"]}
+    assert sectors["healthcare"]["value"] == 5_000_000
+
+    monkeypatch.setattr(portfolio_svc.settings, "portfolio_rollup_enabled", False)
+    aggregated = (await client.get("/api/portfolio/summary")).json()
+    assert aggregated == summary
+
+
 @pytest.mark.asyncio
 async def test_fund_not_found(client: AsyncClient):
     res = await client.get("/api/portfolio/funds/00000000-0000-0000-0000-000000000000")
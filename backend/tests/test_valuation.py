@@ -1,6 +1,24 @@
+import json
+from datetime import date
+
 import pytest
-from app.services.valuation_engine import run_dcf, run_comps, run_sensitivity
-from app.schemas.valuation import DCFInputs, CompsInputs, SensitivityInputs
+from httpx import AsyncClient
+
+from app.models.financial_metric import FinancialMetric, MetricType
+
+from app.services.valuation_engine import (
+    run_dcf,
+    run_dcf_batch,
+    run_dcf_grid,
+    run_comps,
+    run_sensitivity,
+    run_monte_carlo,
+    validate_monte_carlo,
+    apply_dcf_override,
+    get_latest_metrics,
+    get_latest_metrics_bulk,
+)
+from app.schemas.valuation import DCFInputs, CompsInputs, SensitivityInputs, MonteCarloInputs
 
 
 def test_dcf_basic():
@@ -40,6 +58,52 @@ def test_dcf_zero_revenue():
     assert result["enterprise_value"] == 0.0
 
 
+def test_dcf_batch_matches_scalar_baseline():
+    cases = [
+        DCFInputs(base_revenue=100_000_000, projection_years=5, net_debt=20_000_000),
+        DCFInputs(
+            base_revenue=40_000_000,
+            projection_years=3,
+            revenue_growth_rates=[0.20, 0.15],
+            ebitda_margins=[0.18],
+            discount_rate=0.12,
+        ),
+        DCFInputs(base_revenue=0, projection_years=7),
+    ]
+    batch = run_dcf_batch(cases)
+
+    # Expected values come from the original per-year scalar implementation
+    expected = [
+        {
+            "terminal_value": 280_631_367.5, "pv_terminal_value": 174_250_000.0, "pv_fcf_total": 63_750_000.0,
+            "enterprise_value": 238_000_000.0, "equity_value": 218_000_000.0, "implied_ev_ebitda": 8.65,
+        },
+        {
+            "terminal_value": 47_944_105.26, "pv_terminal_value": 34_125_667.13, "pv_fcf_total": 9_028_938.14,
+            "enterprise_value": 43_154_605.26, "equity_value": 43_154_605.26, "implied_ev_ebitda": 4.99,
+        },
+    ]
+    assert len(batch) == 3
+    for result, want in zip(batch, expected):
+        assert {k: result[k] for k in want} == want
+    assert batch[0]["projections"][-1] == {
+        "year": 5, "revenue": 161_051_000.0, "ebitda": 40_262_750.0, "ebitda_margin": 0.25,
+        "fcf": 20_534_002.5, "pv_fcf": 12_750_000.0, "discount_factor": 1.6105,
+    }
+    assert batch[1]["projections"][-1] == {
+        "year": 3, "revenue": 63_480_000.0, "ebitda": 11_426_400.0, "ebitda_margin": 0.18,
+        "fcf": 4_443_600.0, "pv_fcf": 3_162_866.71, "discount_factor": 1.4049,
+    }
+    assert batch[2]["enterprise_value"] == 0.0
+    assert [len(r["projections"]) for r in batch] == [5, 3, 7]
+
+
+def test_dcf_batch_without_projections():
+    result = run_dcf_batch([DCFInputs(base_revenue=50_000_000)], include_projections=False)[0]
+    assert "projections" not in result
+    assert result["enterprise_value"] > 0
+
+
 def test_comps():
     inputs = CompsInputs(
         comparable_companies=[
@@ -84,3 +148,218 @@ def test_sensitivity():
 
     # Higher discount rate should lower EV (first row entry > last row entry for same column)
     assert result["matrix"][0][2] > result["matrix"][-1][2]
+
+
+def test_dcf_grid_matches_full_recompute():
+    base = DCFInputs(
+        base_revenue=100_000_000,
+        revenue_growth_rates=[0.10, 0.10, 0.08, 0.08, 0.06],
+        ebitda_margins=[0.25, 0.26, 0.27, 0.28, 0.28],
+    )
+    rates = [0.09, 0.10, 0.11]
+    growths = [0.02, 0.025]
+    grid = run_dcf_grid(base, [("discount_rate", rates), ("terminal_growth_rate", growths)])
+
+    assert grid.shape == (3, 2)
+    for i, r in enumerate(rates):
+        for j, g in enumerate(growths):
+            expected = run_dcf(base.model_copy(update={"discount_rate": r, "terminal_growth_rate": g}))
+            assert round(float(grid[i, j]), 2) == expected["enterprise_value"]
+
+
+def test_sensitivity_recompute_cube():
+    base = DCFInputs(base_revenue=100_000_000)
+    result = run_sensitivity(
+        base_ev=0,
+        inputs=SensitivityInputs(
+            variable_1_range=[0.02, 0.08, 0.10],
+            variable_2_range=[0.02, 0.03],
+            variable_3="ebitda_margin",
+            variable_3_range=[0.20, 0.25, 0.30, 0.35],
+        ),
+        base_inputs=base,
+    )
+
+    assert result["method"] == "dcf_recompute"
+    assert len(result["matrix"]) == 3
+    assert len(result["matrix"][0]) == 2
+    assert len(result["matrix"][0][0]) == 4
+    # Discount rate at or below terminal growth has no finite value
+    assert result["matrix"][0][0][0] is None
+    # Higher margins raise EV
+    assert result["matrix"][1][0][3] > result["matrix"][1][0][0]
+
+
+async def _create_company(client: AsyncClient) -> dict:
+    fund = (await client.post("/api/portfolio/funds", json={
+        "name": "Valuation Fund", "vintage_year": 2024, "strategy": "buyout",
+    })).json()
+    return (await client.post("/api/portfolio/companies", json={
+        "fund_id": fund["id"], "name": "GridCo", "sector": "industrials",
+        "geography": "Europe", "investment_date": "2024-01-01",
+        "initial_investment": 10_000_000, "current_valuation": 12_000_000, "ownership_pct": 40,
+    })).json()
+
+
+@pytest.mark.asyncio
+async def test_sensitivity_from_base_valuation(client: AsyncClient):
+    company = await _create_company(client)
+    base = (await client.post("/api/valuation/run", json={
+        "company_id": company["id"], "valuation_date": "2024-06-30", "method": "dcf",
+        "inputs": {"base_revenue": 50_000_000},
+    })).json()
+
+    res = await client.post("/api/valuation/run", json={
+        "company_id": company["id"], "valuation_date": "2024-06-30", "method": "sensitivity",
+        "inputs": {
+            "base_valuation_id": base["id"],
+            "variable_1_range": [0.10],
+            "variable_2_range": [0.025],
+        },
+    })
+    assert res.status_code == 201
+    outputs = res.json()["outputs"]
+    assert outputs["matrix"] == [[base["enterprise_value"]]]
+
+
+def test_monte_carlo_validation():
+    inputs = MonteCarloInputs(distributions={"beta": {"kind": "normal", "std": 0.1}})
+    assert "Unsupported" in validate_monte_carlo(inputs)
+
+    inputs = MonteCarloInputs(distributions={"net_debt": {"kind": "uniform", "low": 0, "high": 1e6}})
+    assert "Unsupported" in validate_monte_carlo(inputs)
+
+    inputs = MonteCarloInputs(distributions={"discount_rate": {"kind": "uniform", "low": 0.08}})
+    assert "requires low and high" in validate_monte_carlo(inputs)
+
+
+@pytest.mark.asyncio
+async def test_monte_carlo_seeded_and_ordered():
+    inputs = MonteCarloInputs(
+        base_revenue=100_000_000,
+        exit_multiple=10.0,
+        n_paths=4_000,
+        chunk_size=1_000,
+        seed=42,
+        distributions={
+            "discount_rate": {"kind": "normal", "std": 0.01, "low": 0.05, "high": 0.20},
+            "ebitda_margin": {"kind": "triangular", "low": 0.15, "high": 0.35},
+            "exit_multiple": {"kind": "uniform", "low": 8.0, "high": 12.0},
+        },
+    )
+    first = await run_monte_carlo(inputs)
+    second = await run_monte_carlo(inputs)
+
+    assert first["percentiles"] == second["percentiles"]
+    assert first["valid_paths"] == 4_000
+    bands = list(first["percentiles"].values())
+    assert bands == sorted(bands)
+    assert sum(first["histogram"]["counts"]) == 4_000
+
+
+@pytest.mark.asyncio
+async def test_monte_carlo_stream(client: AsyncClient):
+    res = await client.post("/api/valuation/monte-carlo/stream", json={
+        "base_revenue": 50_000_000,
+        "n_paths": 3_000,
+        "chunk_size": 1_000,
+        "seed": 1,
+        "distributions": {"terminal_growth_rate": {"kind": "uniform", "low": 0.01, "high": 0.03}},
+    })
+    assert res.status_code == 200
+    updates = [json.loads(line) for line in res.text.splitlines()]
+    assert [u["chunk"] for u in updates] == [1, 2, 3]
+    assert updates[-1]["done"] and "histogram" in updates[-1]
+    assert updates[-1]["paths"] == 3_000
+
+    for spec in ({"low": 0.02, "high": 0.02}, {"low": 0.01, "high": 0.03, "mode": 0.05}):
+        res = await client.post("/api/valuation/monte-carlo/stream", json={
+            "base_revenue": 50_000_000,
+            "distributions": {"terminal_growth_rate": {"kind": "triangular", **spec}},
+        })
+        assert res.status_code == 422
+
+
+def test_dcf_override_reruns_downstream_terms_only():
+    inputs = DCFInputs(base_revenue=100_000_000, net_debt=10_000_000)
+    outputs = run_dcf(inputs)
+
+    equity_only = apply_dcf_override(inputs, outputs, "net_debt", 30_000_000)
+    assert equity_only["enterprise_value"] == outputs["enterprise_value"]
+    assert equity_only == run_dcf(inputs.model_copy(update={"net_debt": 30_000_000}))
+
+    # Overrides recompute from unrounded terms, so they match a plain run exactly
+    for field_name, value in [("discount_rate", 0.12), ("terminal_growth_rate", 0.031), ("tax_rate", 0.21)]:
+        overridden = apply_dcf_override(inputs, outputs, field_name, value)
+        assert overridden == run_dcf(inputs.model_copy(update={field_name: value}))
+
+    with pytest.raises(ValueError):
+        apply_dcf_override(inputs, outputs, "unknown_term", 1.0)
+
+
+@pytest.mark.asyncio
+async def test_pinned_output_survives_input_override(client: AsyncClient):
+    company = await _create_company(client)
+    valuation = (await client.post("/api/valuation/run", json={
+        "company_id": company["id"], "valuation_date": "2024-06-30", "method": "dcf",
+        "inputs": {"base_revenue": 50_000_000, "projection_years": 5},
+    })).json()
+    pinned = [("terminal_value", valuation["outputs"]["terminal_value"], 200_000_000), ("discount_rate", 0.10, 0.12)]
+    for field_name, original, value in pinned:
+        res = await client.post(f"/api/valuation/{valuation['id']}/overrides", json={
+            "field_name": field_name, "original_value": original, "override_value": value,
+            "reason": "Committee view", "created_by": "analyst",
+        })
+        assert res.status_code == 201
+
+    outputs = (await client.get(f"/api/valuation/{valuation['id']}")).json()["outputs"]
+    assert outputs["overrides"] == {"terminal_value": 200_000_000, "discount_rate": 0.12}
+    assert outputs["terminal_value"] == 200_000_000
+    assert outputs["pv_terminal_value"] == round(200_000_000 / 1.12 ** 5, 2)
+    assert outputs["enterprise_value"] == round(outputs["pv_fcf_total"] + outputs["pv_terminal_value"], 2)
+
+
+@pytest.mark.asyncio
+async def test_identical_rerun_returns_stored_valuation(client: AsyncClient):
+    company = await _create_company(client)
+    payload = {
+        "company_id": company["id"], "valuation_date": "2024-06-30", "method": "dcf",
+        "inputs": {"base_revenue": 50_000_000, "net_debt": 5_000_000},
+    }
+    first = (await client.post("/api/valuation/run", json=payload)).json()
+    second = (await client.post("/api/valuation/run", json=payload)).json()
+    assert second["id"] == first["id"]
+    assert first["input_hash"]
+
+    res = await client.post(f"/api/valuation/{first['id']}/overrides", json={
+        "field_name": "net_debt", "original_value": 5_000_000, "override_value": 15_000_000,
+        "reason": "Updated debt schedule", "created_by": "analyst",
+    })
+    assert res.status_code == 201
+    overridden = (await client.get(f"/api/valuation/{first['id']}")).json()
+    assert overridden["enterprise_value"] == first["enterprise_value"]
+    assert overridden["equity_value"] == round(first["enterprise_value"] - 15_000_000, 2)
+
+    # An overridden valuation is no longer reused for identical inputs
+    third = (await client.post("/api/valuation/run", json=payload)).json()
+    assert third["id"] != first["id"]
+    assert third["outputs"] == first["outputs"]
+
+
+@pytest.mark.asyncio
+async def test_latest_metrics_one_row_per_type(db):
+    db.add_all([
+        FinancialMetric(company_id="c1", period_date=date(2024, 3, 31), metric_type=MetricType.revenue, value=10.0),
+        FinancialMetric(company_id="c1", period_date=date(2024, 6, 30), metric_type=MetricType.revenue, value=12.0),
+        FinancialMetric(company_id="c1", period_date=date(2024, 3, 31), metric_type=MetricType.ebitda, value=3.0),
+        FinancialMetric(company_id="c2", period_date=date(2023, 12, 31), metric_type=MetricType.revenue, value=50.0),
+    ])
+    await db.flush()
+
+    latest = await get_latest_metrics(db, "c1")
+    assert latest == {MetricType.revenue: 12.0, MetricType.ebitda: 3.0}
+
+    bulk = await get_latest_metrics_bulk(db, ["c1", "c2", "missing"])
+    assert bulk["c2"] == {MetricType.revenue: 50.0}
+    assert bulk["c1"][MetricType.revenue] == 12.0
+    assert "missing" not in bulk
@@ -1,3 +1,5 @@
+import type { TimeSeriesFrame } from "./types";
+
 const BASE_URL = "/api";
 
 async function request<T>(path: string, options?: RequestInit): Promise<T> {
@@ -68,6 +70,25 @@ export const monitoring = {
   },
   getTimeSeries: (companyId: string, metricType: string) =>
     request<any>(`/monitoring/metrics/${companyId}/timeseries?metric_type=${metricType}`),
+  getTimeSeriesFrame: (params: {
+    metric_types: string[];
+    company_ids?: string[];
+    fund_id?: string;
+    freq?: "month" | "quarter" | "year";
+    agg?: "last" | "sum" | "avg";
+    growth?: boolean;
+    margins?: boolean;
+  }) => {
+    const qs = new URLSearchParams();
+    params.metric_types.forEach((m) => qs.append("metric_type", m));
+    params.company_ids?.forEach((c) => qs.append("company_id", c));
+    if (params.fund_id) qs.set("fund_id", params.fund_id);
+    if (params.freq) qs.set("freq", params.freq);
+    if (params.agg) qs.set("agg", params.agg);
+    if (params.growth) qs.set("growth", "true");
+    if (params.margins) qs.set("margins", "true");
+    return request<TimeSeriesFrame>(`/monitoring/timeseries?${qs}`);
+  },
   createScenario: (data: any) => request<any>("/monitoring/scenarios", { method: "POST", body: JSON.stringify(data) }),
   listScenarios: (companyId: string) => request<any>(`/monitoring/scenarios/${companyId}`),
 };
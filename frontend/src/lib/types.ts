@@ -45,12 +45,20 @@ export interface FinancialMetric {
   created_at: string;
 }
 
+export interface TimeSeriesFrame {
+  freq: "month" | "quarter" | "year";
+  agg: "last" | "sum" | "avg";
+  dates: string[];
+  series: Array<{ company_id: string; metric: string; values: Array<number | null> }>;
+}
+
 export interface Document {
   id: string;
   company_id: string | null;
   filename: string;
   file_type: string;
   file_size: number;
+  content_hash: string | null;
   document_type: string | null;
   processing_status: string;
   extracted_data: Record<string, any> | null;
@@ -69,9 +77,11 @@ export interface Extraction {
   confidence_score: number;
   extraction_method: string;
   page_number: number | null;
+  period: string | null;
   context_snippet: string | null;
   validated: boolean;
   validated_by: string | null;
+  promoted_at: string | null;
   created_at: string;
 }
 
@@ -145,5 +155,7 @@ export interface PortfolioSummary {
 
 export interface PaginatedResponse<T> {
   items: T[];
-  total: number;
+  total: number | null;
+  total_estimated: boolean;
+  next_cursor: string | null;
 }